@@ -1,7 +1,56 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
 from django.forms import ModelForm
-from .models import Block, ScoreOption, Participant, BlockScore
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from django.utils import timezone
+from .jobs import back_to_pending
+from .models import Block, ScoreOption, Participant, BlockScore, \
+    Competition, Job, ParticipantImport, RequestProfile, SlowQuery
+
+def estimated_count(model):
+    """
+    Row count of a table from the database statistics (pg_class on
+    PostgreSQL, sqlite_stat1 after ANALYZE on SQLite). None if unknown.
+    """
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    elif connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 only exists once ANALYZE has run
+        return None
+    if row is None:
+        return None
+    # sqlite_stat1.stat is "<rows> <rows per key>...", reltuples a number
+    return int(str(row[0]).split()[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for large tables: unfiltered changelists use the estimated
+    row count instead of a COUNT(*) over the whole table.
+    """
+    @cached_property
+    def count(self):
+        threshold = getattr(settings, 'IROCK_ADMIN_ESTIMATED_COUNT_OVER',
+                            10000)
+        if not self.object_list.query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate is not None and estimate > threshold:
+                return estimate
+        return super().count
+
 
 class ScoreOptionInline(admin.TabularInline):
     """
@@ -11,19 +60,36 @@ class ScoreOptionInline(admin.TabularInline):
     extra = 1
     fields = ('key', 'label', 'order', 'points')
 
+@admin.register(Competition)
+class CompetitionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'starts_at', 'freezes_at', 'ends_at', 'active',
+                    'results_published_at')
+    list_filter = ('active',)
+    readonly_fields = ('results_published_at', 'created_at')
+
 @admin.register(Block)
 class BlockAdmin(admin.ModelAdmin):
     list_display = ('lane', 'grade', 'color', 'wall', 'block_type', 
                     'active', 'created_at', 'distance')
     search_fields = ('lane', 'grade')
+    list_filter = ('competition', 'block_type', 'active')
+    list_select_related = ('competition',)
     inlines = [ScoreOptionInline]
 
 @admin.register(ScoreOption)
 class ScoreOptionAdmin(admin.ModelAdmin):
     list_display = ('block', 'key', 'label', 'order', 'points')
-    list_filter = ('block',)
+    # Filtering by block would render every block, filter by its fields
+    list_filter = ('block__competition', 'block__block_type', 'key')
+    autocomplete_fields = ('block',)
     # FOregin key lookup with "__"
     search_fields = ('key', 'label', 'block__lane')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # __str__ shows the block, also used by the autocomplete results
+        return super().get_queryset(request).select_related('block')
 
 class BlockScoreForm(ModelForm):
     """
@@ -38,34 +104,26 @@ class BlockScoreForm(ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Filter score_option based on block
+        # (the widget is an autocomplete, the queryset only validates the
+        # submitted option)
         if self.instance.block_id:
             self.fields['score_option'].queryset = ScoreOption.objects.filter(
                 block_id=self.instance.block_id
             )
-        else:
-            # If no block is selected, show all options (or could be empty)
-            self.fields['score_option'].queryset = ScoreOption.objects.all()
 
 @admin.register(BlockScore)
 class BlockScoreAdmin(admin.ModelAdmin):
     form = BlockScoreForm
     list_display = ('participant', 'block', 'score_option', 'created_at')
-    list_filter = ('block', 'created_at')
-    search_fields = ('participant__name', 'block__lane', 'score_option__label')
+    list_filter = ('competition', 'block__block_type', 'created_at')
+    list_select_related = ('participant', 'block', 'score_option__block')
+    autocomplete_fields = ('participant', 'block', 'score_option')
+    # Prefix lookups on the unique (indexed) participant columns
+    search_fields = ('^participant__username', '^participant__email',
+                     'block__lane', 'score_option__label')
     readonly_fields = ('created_at',)
-
-    def get_form(self, request, obj=None, **kwargs):
-        """Personalizar form para filtrar score_option."""
-        form = super().get_form(request, obj, **kwargs)
-        
-        # Filtrar score_option según el block
-        if obj and obj.block_id:
-            form.base_fields['score_option'].queryset = \
-            ScoreOption.objects.filter(
-                block_id=obj.block_id
-            )
-        
-        return form
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(Participant)
 class ParticipantAdmin(UserAdmin):
@@ -78,6 +136,8 @@ class ParticipantAdmin(UserAdmin):
     list_filter = ('cup', 'is_staff', 'is_active', 'registered_at')
     search_fields = ('email', 'username', 'first_name', 'last_name')
     readonly_fields = ('registered_at', 'score', 'distance_climbed')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     # Fields for editing an existing user
     fieldsets = (
@@ -100,4 +160,120 @@ class ParticipantAdmin(UserAdmin):
         }),
     )
     
-    ordering = ('email',)
\ No newline at end of file
+    ordering = ('email',)
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """
+    Rows written by the server itself, only viewed (and deleted) here.
+    """
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+def _ms(seconds):
+    return f'{seconds * 1000:.1f}'
+
+
+def _pre(text):
+    return format_html('<pre style="white-space: pre-wrap">{}</pre>', text)
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(ReadOnlyAdmin):
+    list_display = ('created_at', 'method', 'path', 'status', 'duration_ms',
+                    'sql_count', 'sql_ms', 'serializer_ms', 'user')
+    list_filter = ('method', 'status', 'view')
+    search_fields = ('path', 'user')
+    fields = ('created_at', 'method', 'path', 'view', 'user', 'status',
+              'duration_ms', 'sql_ms', 'serializer_ms', 'render_ms',
+              'sql_count', 'samples', 'profile', 'sql', 'stacks')
+    readonly_fields = fields
+
+    @admin.display(description='ms', ordering='duration')
+    def duration_ms(self, obj):
+        return _ms(obj.duration)
+
+    @admin.display(description='SQL ms', ordering='sql_time')
+    def sql_ms(self, obj):
+        return _ms(obj.sql_time)
+
+    @admin.display(description='serializers ms', ordering='serializer_time')
+    def serializer_ms(self, obj):
+        return _ms(obj.serializer_time)
+
+    @admin.display(description='render ms')
+    def render_ms(self, obj):
+        return _ms(obj.render_time)
+
+    @admin.display(description='perfil')
+    def profile(self, obj):
+        return _pre(obj.summary)
+
+    @admin.display(description='consultas')
+    def sql(self, obj):
+        return _pre('\n\n'.join(f"{_ms(query['time'])} ms  {query['sql']}"
+                                 for query in obj.queries))
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(ReadOnlyAdmin):
+    list_display = ('created_at', 'duration_ms', 'view', 'short_sql')
+    list_filter = ('view',)
+    search_fields = ('sql', 'path')
+    fields = ('created_at', 'path', 'view', 'duration_ms', 'query',
+              'query_plan')
+    readonly_fields = fields
+
+    @admin.display(description='ms', ordering='duration')
+    def duration_ms(self, obj):
+        return _ms(obj.duration)
+
+    @admin.display(description='SQL')
+    def short_sql(self, obj):
+        return obj.sql[:100]
+
+    @admin.display(description='SQL')
+    def query(self, obj):
+        return _pre(obj.sql)
+
+    @admin.display(description='plan')
+    def query_plan(self, obj):
+        return _pre(obj.plan)
+
+
+@admin.register(Job)
+class JobAdmin(ReadOnlyAdmin):
+    list_display = ('task', 'key', 'state', 'attempts', 'coalesced',
+                    'run_at', 'created_at')
+    list_filter = ('state', 'task')
+    search_fields = ('task', 'key')
+    fields = ('task', 'args', 'key', 'state', 'run_at', 'attempts',
+              'max_attempts', 'coalesced', 'created_at', 'started_at',
+              'error')
+    readonly_fields = fields
+    actions = ['retry']
+
+    @admin.display(description='último error')
+    def error(self, obj):
+        return _pre(obj.last_error)
+
+    @admin.action(description='Reintentar ahora los trabajos fallidos')
+    def retry(self, request, queryset):
+        failed = queryset.filter(state=Job.FAILED).values_list('id',
+                                                               flat=True)
+        for job_id in failed:
+            back_to_pending(job_id, attempts=0, run_at=timezone.now())
+        self.message_user(request, f'{len(failed)} trabajos reintentados')
+
+
+@admin.register(ParticipantImport)
+class ParticipantImportAdmin(ReadOnlyAdmin):
+    list_display = ('created_at', 'filename', 'created_by', 'state',
+                    'finished_at')
+    list_filter = ('state',)
+    # Not the CSV itself, it holds initial passwords until imported
+    fields = ('created_at', 'filename', 'created_by', 'activate', 'state',
+              'finished_at', 'report')
+    readonly_fields = fields
@@ -0,0 +1,139 @@
+"""
+Archival of finished competitions.
+A competition is streamed into a self-contained gzip'd JSON lines file
+(schedule, blocks with their score options, the participants involved, the
+scores and the ascension history) and then removed from the hot tables, so
+queries only pay for the competition being played.
+"""
+import gzip
+import json
+import os
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AscensionEvent, Block, BlockScore, Competition, \
+    LeaderboardCheckpoint, Participant, ScoreOption
+from .maintenance import subtract_scores
+from .ranking import board
+
+ARCHIVE_VERSION = 1
+CHUNK_SIZE = 2000
+
+
+def archive_path(competition, directory=None):
+    directory = directory or getattr(
+        settings, 'IROCK_ARCHIVE_DIR', os.path.join(settings.BASE_DIR,
+                                                    'archives')
+    )
+    return os.path.join(
+        directory, f'competition-{competition.pk}.jsonl.gz'
+    )
+
+
+def _rows(queryset, *fields):
+    return queryset.order_by('pk').values(*fields).iterator(
+        chunk_size=CHUNK_SIZE
+    )
+
+
+def write_archive(competition, path):
+    """
+    Stream a competition into `path`. Returns the number of records written
+    per type.
+    """
+    counts = {}
+    scores = BlockScore.objects.filter(competition=competition)
+    options = ScoreOption.objects.filter(block__competition=competition)
+    records = [
+        ('block', _rows(
+            Block.objects.filter(competition=competition),
+            'id', 'lane', 'grade', 'color', 'wall', 'distance', 'active',
+            'block_type', 'created_at'
+        )),
+        ('score_option', _rows(
+            options, 'id', 'block', 'key', 'label', 'points', 'order'
+        )),
+        ('participant', _rows(
+            Participant.objects.filter(
+                pk__in=scores.values('participant')
+            ),
+            'id', 'username', 'email', 'first_name', 'last_name', 'cup',
+            'gender', 'date_of_birth'
+        )),
+        ('score', _rows(
+            scores, 'id', 'participant', 'block', 'score_option',
+            'earned_points', 'created_at'
+        )),
+        ('event', _rows(
+            AscensionEvent.objects.filter(competition=competition),
+            'id', 'participant', 'block', 'kind', 'points', 'distance',
+            'created_at'
+        )),
+    ]
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    with gzip.open(f'{path}.tmp', 'wt', encoding='utf-8') as f:
+        header = {
+            'type': 'competition',
+            'archive_version': ARCHIVE_VERSION,
+            'archived_at': timezone.now(),
+            'id': competition.pk,
+            'name': competition.name,
+            'starts_at': competition.starts_at,
+            'freezes_at': competition.freezes_at,
+            'ends_at': competition.ends_at,
+        }
+        f.write(encoder.encode(header) + '\n')
+        for record_type, rows in records:
+            counts[record_type] = 0
+            for row in rows:
+                row['type'] = record_type
+                f.write(encoder.encode(row) + '\n')
+                counts[record_type] += 1
+    os.replace(f'{path}.tmp', path)
+    return counts
+
+
+def read_archive(path):
+    """
+    Iterate the records of an archive file.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+@transaction.atomic
+def purge_competition(competition):
+    """
+    Remove a competition from the hot tables with set-based statements,
+    subtracting its scores from the participant aggregates first.
+    """
+    scores = BlockScore.objects.filter(competition=competition)
+    subtract_scores(scores)
+    scores.delete()
+    Block.objects.filter(competition=competition).delete()
+    AscensionEvent.objects.filter(competition=competition).delete()
+    LeaderboardCheckpoint.objects.filter(competition=competition).delete()
+
+    competition.active = False
+    competition.archived_at = timezone.now()
+    competition.save(update_fields=['active', 'archived_at'])
+    # Participant aggregates were updated without signals
+    transaction.on_commit(board.invalidate)
+
+
+def archive_competition(competition, directory=None, purge=True):
+    """
+    Write the archive file of a competition and (optionally) purge it.
+    Returns (path, counts).
+    """
+    path = archive_path(competition, directory)
+    counts = write_archive(competition, path)
+    if purge:
+        purge_competition(competition)
+    return path, counts
@@ -0,0 +1,112 @@
+"""
+Batch requests: several API calls in one HTTP round trip.
+Each sub-request is resolved against the URLconf and dispatched to its view
+in-process, authenticated by its view with the caller's Authorization
+header, on the same thread and therefore the same database connection.
+With `atomic` they all run in one transaction: their writes are rolled
+back together if any sub-request fails. That is all it promises: reads
+served from the in-process caches (blocks, rank, leaderboard) don't go
+through the transaction, they aren't a consistent snapshot with the rest.
+A sub-request raising an error gets a 500 entry, the others still run.
+"""
+import asyncio
+import io
+import json
+import logging
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import Http404
+from django.urls import resolve
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+# Headers of the batch request a sub-request doesn't inherit (they describe
+# the batch body, not the sub-request's)
+_REQUEST_ONLY_META = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_CONTENT_TYPE',
+                      'HTTP_CONTENT_LENGTH', 'HTTP_ACCEPT_ENCODING',
+                      'wsgi.input')
+
+
+def _sub_request(request, method, path, body):
+    """
+    Django request for a sub-request, built from the batch request's
+    environment (the Authorization header included).
+    """
+    url = urlsplit(path)
+    payload = b'' if body is None else json.dumps(body).encode()
+    environ = {key: value for key, value in request.META.items()
+               if key not in _REQUEST_ONLY_META}
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+        'wsgi.url_scheme': request.scheme,
+    })
+    return WSGIRequest(environ)
+
+
+def _dispatch(request, method, path, body, excluded_views):
+    try:
+        match = resolve(urlsplit(path).path)
+    except Http404:
+        return {'status': 404, 'body': {'detail': 'No encontrado.'}}
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None or not issubclass(view_class, APIView) or \
+            issubclass(view_class, excluded_views):
+        return {'status': 400,
+                'body': {'detail': f'{path} no se puede usar en un batch.'}}
+
+    view = match.func
+    if asyncio.iscoroutinefunction(view):
+        # Async ViewSets (api/concurrency.py)
+        view = async_to_sync(view)
+    try:
+        response = view(_sub_request(request, method, path, body),
+                        *match.args, **match.kwargs)
+    except Exception:
+        logger.exception('Error in batch sub-request %s %s', method, path)
+        return {'status': 500,
+                'body': {'detail': 'Error interno del servidor.'}}
+    if isinstance(response, Response):
+        # Already Python data, no need to render and parse it again
+        data = response.data
+    else:
+        content = getattr(response, 'content', b'')
+        try:
+            data = json.loads(content) if content else None
+        except ValueError:
+            data = content.decode(errors='replace')
+    result = {'status': response.status_code, 'body': data}
+    if response.has_header('Location'):
+        result['headers'] = {'Location': response['Location']}
+    return result
+
+
+def run_batch(request, sub_requests, atomic=False, excluded_views=()):
+    """
+    Dispatch `sub_requests` (dicts with method, path and optional body) in
+    order, returns their results as dicts with status, body (and headers).
+    """
+    def run():
+        return [
+            _dispatch(request, item['method'], item['path'],
+                      item.get('body'), excluded_views)
+            for item in sub_requests
+        ]
+
+    if not atomic:
+        return run()
+    with transaction.atomic():
+        results = run()
+        if any(result['status'] >= 400 for result in results):
+            # All or nothing
+            transaction.set_rollback(True)
+    return results
@@ -0,0 +1,75 @@
+"""
+Per-worker cache of the block catalog (the /blocks/ list).
+Blocks and their score options are edited a handful of times per event but
+read on every screen, so the serialized catalog of the active competition
+is kept in memory. It is dropped by the Block/ScoreOption signals in this
+worker (after commit) and reloaded at most every IROCK_BLOCK_CATALOG_TTL
+seconds to pick up edits made through other workers.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import metrics
+from .models import Block
+from .phases import scope
+from .serializers import BlockSerializer
+
+
+class BlockCatalog:
+    """
+    Serialized blocks of the active competition, loaded lazily.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = None
+        self._valid = False
+        self._loaded_at = 0.0
+        # Bumped on every invalidation, a load that raced one stays stale
+        self._generation = 0
+
+    def invalidate(self):
+        # The old catalog is kept for refresh=False reads racing the reload
+        with self._lock:
+            self._valid = False
+            self._generation += 1
+
+    def stale(self):
+        """
+        Whether blocks() would query the database.
+        """
+        ttl = getattr(settings, 'IROCK_BLOCK_CATALOG_TTL', 10)
+        stale = not self._valid or time.monotonic() - self._loaded_at > ttl
+        if not stale:
+            metrics.cache('block_catalog', hit=True)
+        return stale
+
+    def load(self):
+        metrics.cache('block_catalog', hit=False)
+        generation = self._generation
+        queryset = scope(Block.objects.all()).prefetch_related(
+            'score_options'
+        ).order_by('id')
+        blocks = BlockSerializer(queryset, many=True).data
+        with self._lock:
+            self._blocks = blocks
+            self._valid = generation == self._generation
+            self._loaded_at = time.monotonic()
+
+    def blocks(self, lane=None, grade=None, refresh=True):
+        """
+        Serialized blocks, optionally filtered by lane and grade. With
+        refresh=False the cached catalog is used as is (no query).
+        """
+        if refresh and self.stale():
+            self.load()
+        blocks = self._blocks or []
+        if lane:
+            blocks = [block for block in blocks if block['lane'] == lane]
+        if grade:
+            blocks = [block for block in blocks if block['grade'] == grade]
+        return blocks
+
+
+catalog = BlockCatalog()
@@ -0,0 +1,173 @@
+"""
+Async views and CPU offloading for the ASGI serving mode.
+ViewSets using AsyncViewSetMixin can define actions as coroutines. Under
+ASGI (Uvicorn workers) they run on the worker's event loop: only the token
+lookup and database work hop to a thread, reads served from the in-process
+caches don't. Anything touching the database has to go through
+sync_to_async(). Sync actions of the same ViewSet keep working, they run in
+a thread.
+At most IROCK_HASHING_THREADS requests per process hash passwords at once
+(hashlib releases the GIL), so a burst of logins queues for a slot instead
+of taking all the worker's CPU. They hash in their own request thread: the
+authentication backend also queries the database, on that thread's
+connection. On top of that, at most IROCK_HASHING_SLOTS requests hash in
+the whole server: each slot is a lock file that every worker process tries
+(flock, released by the kernel if the process dies). A request that can't
+get both within IROCK_HASHING_WAIT seconds gets a 503 with Retry-After
+instead, so sync workers aren't all taken by hashing.
+Under WSGI everything still works: Django runs the async views with
+async_to_sync.
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.decorators import classonlymethod
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: only the per process limit
+    fcntl = None
+
+_hashing_slots = None
+_hashing_slots_lock = threading.Lock()
+
+
+def hashing_slots():
+    """
+    Semaphore of the threads allowed to hash passwords at once,
+    IROCK_HASHING_THREADS per process.
+    """
+    global _hashing_slots
+    with _hashing_slots_lock:
+        if _hashing_slots is None:
+            _hashing_slots = threading.BoundedSemaphore(
+                getattr(settings, 'IROCK_HASHING_THREADS', 2)
+            )
+        return _hashing_slots
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'El servidor está ocupado, intenta de nuevo en unos ' \
+                     'segundos.'
+    default_code = 'hashing_busy'
+
+    def __init__(self):
+        super().__init__()
+        # DRF's exception handler sends it as Retry-After
+        self.wait = getattr(settings, 'IROCK_HASHING_RETRY_AFTER', 2)
+
+
+def _lock_server_slot():
+    """
+    File descriptor holding a free server-wide slot, or None if all are
+    taken.
+    """
+    directory = settings.IROCK_HASHING_SLOTS_DIR
+    os.makedirs(directory, exist_ok=True)
+    for number in range(settings.IROCK_HASHING_SLOTS):
+        descriptor = os.open(os.path.join(directory, f'slot-{number}.lock'),
+                             os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return descriptor
+        except BlockingIOError:
+            os.close(descriptor)
+    return None
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Hold a hashing thread of the process and a server-wide hashing slot
+    while the block hashes. Raises HashingBusy, before anything is hashed,
+    if they aren't free within IROCK_HASHING_WAIT seconds.
+    """
+    deadline = time.monotonic() + getattr(settings, 'IROCK_HASHING_WAIT', 0.5)
+    slots = hashing_slots()
+    if not slots.acquire(timeout=max(0, deadline - time.monotonic())):
+        raise HashingBusy()
+    descriptor = None
+    try:
+        if fcntl is not None and getattr(settings, 'IROCK_HASHING_SLOTS',
+                                         None):
+            while (descriptor := _lock_server_slot()) is None:
+                if time.monotonic() >= deadline:
+                    raise HashingBusy()
+                time.sleep(0.02)
+        yield
+    finally:
+        if descriptor is not None:
+            # Closing releases the lock
+            os.close(descriptor)
+        slots.release()
+
+
+async def run_hashing(function, *args, **kwargs):
+    """
+    Await `function` (something that hashes passwords) in a thread once a
+    hashing slot is free. The event loop keeps serving while it waits.
+    """
+    def run():
+        with hashing_slot():
+            return function(*args, **kwargs)
+    return await sync_to_async(run)()
+
+
+class AsyncViewSetMixin:
+    """
+    Mixin for ViewSets (before the ViewSet class) whose actions can be
+    coroutines.
+    """
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+
+        # DRF's view calls self.dispatch(), which returns a coroutine here.
+        # Being a coroutine function, Django awaits this one.
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        # Keeps cls, actions, initkwargs and csrf_exempt (used by routers)
+        functools.update_wrapper(async_view, view)
+        return async_view
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        Same as APIView.dispatch() but awaiting the handler. Authentication
+        (a knox token lookup), permissions and throttling run in a thread.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(),
+                                  self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(
+                    request, *args, **kwargs
+                )
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args,
+                                               **kwargs)
+        return self.response
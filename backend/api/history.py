@@ -0,0 +1,136 @@
+"""
+Time-travel leaderboards built from the AscensionEvent stream.
+The standings of a competition at any moment are the sum of its events
+recorded up to it.
+To keep that cheap, a LeaderboardCheckpoint is stored every
+IROCK_CHECKPOINT_EVERY events and replays only start from the nearest one,
+so a historical query costs O(events since checkpoint).
+"""
+from django.conf import settings
+from django.db.models import Subquery
+from django.db.models.functions import Coalesce
+
+from .jobs import enqueue
+from .models import AscensionEvent, LeaderboardCheckpoint, Participant
+from .ranking import RANKED_FILTER, ranking_key
+
+
+def replay(competition_id, at=None):
+    """
+    Totals of every participant in a competition as of `at` (None means
+    now).
+
+    Returns (totals, last_event_id, last_event_at) where totals maps
+    participant id -> [score, distance].
+    """
+    checkpoints = LeaderboardCheckpoint.objects.filter(
+        competition_id=competition_id
+    )
+    events = AscensionEvent.objects.filter(
+        competition_id=competition_id
+    ).order_by('id')
+    if at is not None:
+        checkpoints = checkpoints.filter(created_at__lte=at)
+        events = events.filter(created_at__lte=at)
+
+    checkpoint = checkpoints.first()
+    if checkpoint is not None:
+        totals = checkpoint.totals()
+        last_event_id = checkpoint.last_event_id
+        last_event_at = checkpoint.created_at
+        events = events.filter(id__gt=last_event_id)
+    else:
+        totals, last_event_id, last_event_at = {}, 0, None
+
+    for event_id, participant_id, points, distance, created_at in \
+            events.values_list('id', 'participant_id', 'points', 'distance',
+                               'created_at').iterator():
+        entry = totals.setdefault(participant_id, [0, 0])
+        entry[0] += points
+        entry[1] += distance
+        last_event_id, last_event_at = event_id, created_at
+
+    return totals, last_event_id, last_event_at
+
+
+def create_checkpoint(competition_id):
+    """
+    Store the current totals of a competition as a new checkpoint (no-op if
+    nothing happened since the latest one).
+    """
+    totals, last_event_id, last_event_at = replay(competition_id)
+    if not last_event_id:
+        return None
+    checkpoint, _ = LeaderboardCheckpoint.objects.get_or_create(
+        last_event_id=last_event_id,
+        defaults={
+            'competition_id': competition_id,
+            'created_at': last_event_at,
+            'data': LeaderboardCheckpoint.encode(totals),
+        },
+    )
+    return checkpoint
+
+
+def maybe_checkpoint(event):
+    """
+    Called for every new event, checkpoints a competition every
+    IROCK_CHECKPOINT_EVERY of its events (counted since its latest
+    checkpoint, ids are shared by every competition). The checkpoint is a
+    background job, the ascension's request doesn't wait for it; if the
+    worker is behind, the pending one covers the next ones too.
+    """
+    every = getattr(settings, 'IROCK_CHECKPOINT_EVERY', 500)
+    if not every:
+        return
+    latest = LeaderboardCheckpoint.objects.filter(
+        competition_id=event.competition_id
+    ).order_by('-last_event_id').values('last_event_id')[:1]
+    since = AscensionEvent.objects.filter(
+        competition_id=event.competition_id,
+        id__gt=Coalesce(Subquery(latest), 0),
+    ).count()
+    # Every multiple, not only the first: a checkpoint still pending when
+    # more events arrive is asked for again
+    if since % every == 0:
+        enqueue(create_checkpoint, event.competition_id,
+                key=f'checkpoint:{event.competition_id}')
+
+
+def leaderboard_at(competition_id, at, cup=None, limit=None):
+    """
+    Leaderboard per cup of a competition as it was at `at`, using the
+    participants' current cup and username.
+    """
+    totals, _, _ = replay(competition_id, at)
+    participants = Participant.objects.filter(
+        registered_at__lte=at, **RANKED_FILTER
+    )
+    if cup:
+        participants = participants.filter(cup=cup)
+
+    boards = {
+        choice: [] for choice, _ in Participant.CUP_CHOICES
+        if not cup or choice == cup
+    }
+    for participant_id, participant_cup, username in \
+            participants.values_list('id', 'cup', 'username'):
+        score, distance = totals.get(participant_id, (0, 0))
+        boards.setdefault(participant_cup, []).append(
+            (ranking_key(participant_id, score, distance), username)
+        )
+
+    leaderboard = {}
+    for board_cup, entries in boards.items():
+        entries.sort()
+        leaderboard[board_cup] = [
+            {
+                'rank': position + 1,
+                'id': key[2],
+                'username': username,
+                'score': -key[0],
+                'distance_climbed': -key[1],
+            }
+            for position, (key, username) in enumerate(entries[:limit])
+        ]
+    return leaderboard
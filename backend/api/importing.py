@@ -0,0 +1,266 @@
+"""
+Bulk import of participants from the payment provider CSV.
+Rows are streamed and processed in batches: validated in Python with one
+query per batch for email/username conflicts, initial passwords hashed
+across a process pool and participants inserted with bulk_create.
+
+Expected columns (only email and username are required):
+    email,username,first_name,last_name,password,cup,gender,phone,
+    date_of_birth
+
+Initial passwords are hashed like any other password (Django's default
+hasher and iterations). The API doesn't import in the request: uploads are
+stored as a ParticipantImport and run_import() imports them in the job
+worker (api/jobs.py).
+"""
+import csv
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Participant, ParticipantImport
+from .ranking import board
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+
+
+def _choice(value, choices):
+    """
+    Match a CSV value against model choices by key or label
+    (case-insensitive). Returns the key or None.
+    """
+    value = value.strip().lower()
+    for key, label in choices:
+        if value in (key.lower(), label.lower()):
+            return key
+    return None
+
+
+def _parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(value)
+
+
+def clean_row(row):
+    """
+    Validate and normalize a CSV row, returns the participant fields.
+    Raises ValueError with a readable message.
+    """
+    row = {key.strip().lower(): (value or '').strip()
+           for key, value in row.items() if key}
+    email = Participant.objects.normalize_email(row.get('email', ''))
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError(f"email inválido '{email}'")
+    username = row.get('username', '')
+    if not username or len(username) > 25:
+        raise ValueError("username vacío o de más de 25 caracteres")
+
+    fields = {
+        'email': email,
+        'username': username,
+        'first_name': row.get('first_name', '')[:150],
+        'last_name': row.get('last_name', '')[:150],
+        'phone': row.get('phone', ''),
+        'password': row.get('password', ''),
+    }
+    if len(fields['phone']) > 15:
+        raise ValueError("teléfono de más de 15 caracteres")
+    if row.get('cup'):
+        fields['cup'] = _choice(row['cup'], Participant.CUP_CHOICES)
+        if fields['cup'] is None:
+            raise ValueError(f"categoría inválida '{row['cup']}'")
+    if row.get('gender'):
+        fields['gender'] = _choice(row['gender'], Participant.GENDER_CHOICES)
+        if fields['gender'] is None:
+            raise ValueError(f"género inválido '{row['gender']}'")
+    if row.get('date_of_birth'):
+        try:
+            fields['date_of_birth'] = _parse_date(row['date_of_birth'])
+        except ValueError:
+            raise ValueError(f"fecha inválida '{row['date_of_birth']}'")
+    return fields
+
+
+def hash_password(password):
+    """
+    Hash an initial password (unusable password if empty). Runs in the
+    process pool workers.
+    """
+    return make_password(password or None)
+
+
+class ParticipantImporter:
+    """
+    Streams CSV rows into Participant rows and collects a report.
+    """
+    def __init__(self, activate=False, workers=None, batch_size=BATCH_SIZE):
+        self.activate = activate
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.seen_emails = set()
+        self.seen_usernames = set()
+        self.report = {'rows': 0, 'created': 0, 'errors': []}
+
+    def _error(self, line, email, message):
+        self.report['errors'].append(
+            {'line': line, 'email': email, 'error': message}
+        )
+
+    def _conflicts(self, batch):
+        """
+        Drop rows whose email/username is already registered (one query
+        each for the whole batch).
+        """
+        emails = {fields['email'] for _, fields in batch}
+        usernames = {fields['username'] for _, fields in batch}
+        taken_emails = set(Participant.objects.filter(
+            email__in=emails
+        ).values_list('email', flat=True))
+        taken_usernames = set(Participant.objects.filter(
+            username__in=usernames
+        ).values_list('username', flat=True))
+        valid = []
+        for line, fields in batch:
+            if fields['email'] in taken_emails:
+                self._error(line, fields['email'], 'email ya registrado')
+            elif fields['username'] in taken_usernames:
+                self._error(line, fields['email'], 'username ya registrado')
+            else:
+                valid.append((line, fields))
+        return valid
+
+    def _validate(self, rows):
+        batch = []
+        for line, row in rows:
+            self.report['rows'] += 1
+            try:
+                fields = clean_row(row)
+            except ValueError as e:
+                self._error(line, (row.get('email') or '').strip(), str(e))
+                continue
+            if fields['email'] in self.seen_emails:
+                self._error(line, fields['email'], 'email repetido en el CSV')
+                continue
+            if fields['username'] in self.seen_usernames:
+                self._error(line, fields['email'],
+                            'username repetido en el CSV')
+                continue
+            self.seen_emails.add(fields['email'])
+            self.seen_usernames.add(fields['username'])
+            batch.append((line, fields))
+        return self._conflicts(batch)
+
+    def _insert(self, batch, hashes):
+        participants = []
+        for (_, fields), password in zip(batch, hashes):
+            fields = dict(fields, password=password,
+                          is_active=self.activate)
+            participants.append(Participant(**fields))
+        try:
+            with transaction.atomic():
+                Participant.objects.bulk_create(participants)
+        except IntegrityError:
+            # Someone registered meanwhile, re-check and retry once
+            keep = {line for line, _ in self._conflicts(batch)}
+            kept = [(entry, participant) for entry, participant
+                    in zip(batch, participants) if entry[0] in keep]
+            batch = [entry for entry, _ in kept]
+            participants = [participant for _, participant in kept]
+            try:
+                with transaction.atomic():
+                    Participant.objects.bulk_create(participants)
+            except IntegrityError:
+                # Still racing with registrations: row by row
+                participants = self._insert_each(batch, participants)
+        self.report['created'] += len(participants)
+
+    def _insert_each(self, batch, participants):
+        """
+        Insert one participant at a time, reporting the ones that conflict.
+        Returns the inserted ones.
+        """
+        inserted = []
+        for (line, fields), participant in zip(batch, participants):
+            try:
+                with transaction.atomic():
+                    participant.save(force_insert=True)
+            except IntegrityError:
+                self._error(line, fields['email'],
+                            'email o username ya registrado')
+            else:
+                inserted.append(participant)
+        return inserted
+
+    def run(self, lines):
+        """
+        Import a CSV given as an iterable of text lines.
+        """
+        start = time.perf_counter()
+        reader = enumerate(csv.DictReader(lines), start=2)
+        pool = ProcessPoolExecutor(self.workers) if self.workers > 1 \
+            else None
+        try:
+            while True:
+                rows = list(islice(reader, self.batch_size))
+                if not rows:
+                    break
+                batch = self._validate(rows)
+                passwords = [fields['password'] for _, fields in batch]
+                if pool is not None:
+                    hashes = list(pool.map(
+                        hash_password, passwords,
+                        chunksize=max(len(passwords) // self.workers, 1)
+                    ))
+                else:
+                    hashes = list(map(hash_password, passwords))
+                self._insert(batch, hashes)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if self.report['created'] and self.activate:
+            # bulk_create doesn't send signals
+            board.invalidate()
+        self.report['seconds'] = round(time.perf_counter() - start, 3)
+        return self.report
+
+
+def run_import(import_id):
+    """
+    Background job of an upload (ParticipantImport): import it and store
+    the report. The CSV, passwords included, is dropped afterwards.
+    """
+    upload = ParticipantImport.objects.get(id=import_id)
+    if upload.state != ParticipantImport.PENDING:
+        return
+    upload.state = ParticipantImport.RUNNING
+    upload.save(update_fields=['state'])
+    try:
+        upload.report = ParticipantImporter(activate=upload.activate).run(
+            upload.data.splitlines(keepends=True)
+        )
+        upload.state = ParticipantImport.DONE
+    except Exception:
+        # Not retried: the rows imported so far are committed, upload again
+        logger.exception('Error importing %s', upload)
+        upload.state = ParticipantImport.FAILED
+    upload.data = ''
+    upload.finished_at = timezone.now()
+    upload.save(update_fields=['state', 'report', 'data', 'finished_at'])
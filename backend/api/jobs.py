@@ -0,0 +1,201 @@
+"""
+Background jobs: work a request triggers but doesn't need to wait for
+(leaderboard checkpoints, publishing the final results) runs in a separate
+process, `manage.py run_jobs` (irock-jobs.service).
+Jobs are rows of the Job table, a function called by its dotted path with
+JSON arguments. enqueue() adds the row once the current transaction
+commits (right away outside of one), so a job never runs for data that got
+rolled back.
+- key: at most one pending job per key. Enqueueing it again while one is
+  pending merges into that one (keeping its arguments) instead of adding
+  another, so a job the worker hasn't got to yet runs once.
+- delay: the job runs that many seconds later, enqueues of the same key
+  meanwhile coalesce into the one run.
+- batch: with a key, the job runs right away once that many enqueues were
+  merged into it, before its delay. One rebuild per burst of 50 ascensions
+  (or at most 30 s late): enqueue(rebuild, key='rebuild', delay=30,
+  batch=50).
+A job raising an exception is retried up to IROCK_JOB_MAX_ATTEMPTS times,
+after IROCK_JOB_RETRY_DELAY seconds doubling every attempt, and then kept as
+failed with its traceback (visible in the admin). Done jobs are deleted.
+Jobs left running by a worker that died go back to pending after
+IROCK_JOB_TIMEOUT seconds.
+With IROCK_JOBS_EAGER (development) jobs run in the process that enqueues
+them, at commit, and no worker is needed.
+"""
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two looks for abandoned jobs
+REQUEUE_EVERY = 60
+
+
+def _task(function):
+    if isinstance(function, str):
+        return function
+    return f'{function.__module__}.{function.__qualname__}'
+
+
+def enqueue(function, *args, key=None, delay=0, batch=None):
+    """
+    Run `function(*args)` in the background once the current transaction
+    commits. `function` is a module level function or its dotted path,
+    `args` must be JSON serializable.
+    """
+    task = _task(function)
+    if getattr(settings, 'IROCK_JOBS_EAGER', False):
+        transaction.on_commit(lambda: _run_eager(task, args))
+    else:
+        transaction.on_commit(
+            lambda: _add(task, list(args), key, delay, batch)
+        )
+
+
+def _run_eager(task, args):
+    try:
+        import_string(task)(*args)
+    except Exception:
+        logger.exception('Job %s failed', task)
+
+
+def _merge(key, batch, now):
+    """
+    Merge an enqueue into the pending job of `key`, False if there is none.
+    """
+    changes = {'coalesced': F('coalesced') + 1}
+    if batch:
+        # Compares the count before this enqueue
+        changes['run_at'] = Case(
+            When(coalesced__gte=batch - 1, then=Value(now)),
+            default=F('run_at')
+        )
+    return bool(Job.objects.filter(key=key, state=Job.PENDING).update(
+        **changes
+    ))
+
+
+def _add(task, args, key, delay, batch):
+    now = timezone.now()
+    # A second round if another process added the pending job meanwhile
+    for _ in range(2):
+        if key is not None and _merge(key, batch, now):
+            return
+        try:
+            with transaction.atomic():
+                Job.objects.create(
+                    task=task, args=args, key=key,
+                    run_at=now + timedelta(seconds=delay),
+                    max_attempts=getattr(settings, 'IROCK_JOB_MAX_ATTEMPTS',
+                                         5)
+                )
+            return
+        except IntegrityError:
+            continue
+
+
+def back_to_pending(job_id, **changes):
+    """
+    Make a job pending again. If its key got a newer pending job meanwhile,
+    that one does the work: this one is deleted.
+    """
+    try:
+        with transaction.atomic():
+            Job.objects.filter(id=job_id).update(state=Job.PENDING,
+                                                 **changes)
+    except IntegrityError:
+        Job.objects.filter(id=job_id).delete()
+
+
+def requeue_stale():
+    """
+    Jobs running for longer than IROCK_JOB_TIMEOUT (their worker died) go
+    back to pending.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        state=Job.RUNNING,
+        started_at__lt=now - timedelta(
+            seconds=getattr(settings, 'IROCK_JOB_TIMEOUT', 600)
+        )
+    ).values_list('id', flat=True)
+    for job_id in stale:
+        back_to_pending(job_id, run_at=now)
+
+
+def claim():
+    """
+    Next due job, marked running, or None. The conditional UPDATE makes
+    exactly one worker win each job.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(state=Job.PENDING, run_at__lte=now)
+    for job in due[:10]:
+        claimed = Job.objects.filter(id=job.id, state=Job.PENDING).update(
+            state=Job.RUNNING, started_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            job.state, job.started_at = Job.RUNNING, now
+            job.attempts += 1
+            return job
+    return None
+
+
+def run(job):
+    """
+    Run a claimed job. Returns True if it succeeded.
+    """
+    try:
+        import_string(job.task)(*job.args)
+    except Exception:
+        logger.exception('Job %s failed (attempt %d of %d)', job,
+                         job.attempts, job.max_attempts)
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            Job.objects.filter(id=job.id).update(state=Job.FAILED,
+                                                 last_error=error)
+        else:
+            delay = getattr(settings, 'IROCK_JOB_RETRY_DELAY', 5) * \
+                2 ** (job.attempts - 1)
+            back_to_pending(job.id, last_error=error,
+                            run_at=timezone.now() + timedelta(seconds=delay))
+        return False
+    Job.objects.filter(id=job.id).delete()
+    return True
+
+
+def work(stopping, interval, once=False, report=None):
+    """
+    Worker loop: run due jobs one after the other, polling every `interval`
+    seconds when there are none, until `stopping()` (checked between jobs)
+    or, with `once`, until no job is due. `report(job, ok, seconds)` is
+    called after each job.
+    """
+    requeued_at = None
+    while not stopping():
+        close_old_connections()
+        if requeued_at is None or \
+                time.monotonic() - requeued_at >= REQUEUE_EVERY:
+            requeue_stale()
+            requeued_at = time.monotonic()
+        job = claim()
+        if job is None:
+            if once:
+                return
+            time.sleep(interval)
+            continue
+        start = time.perf_counter()
+        ok = run(job)
+        if report is not None:
+            report(job, ok, time.perf_counter() - start)
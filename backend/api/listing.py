@@ -0,0 +1,108 @@
+"""
+Lean read path for the list endpoints.
+Serializing a list with a ModelSerializer builds a model instance per row
+(plus the related ones) and runs every field's to_representation. For flat
+read-only output none of that is needed: LeanList reads the serializer's
+fields once, fetches exactly those columns (joins included) as tuples with
+values_list() and maps them to dicts with the same keys, order and values
+as serializer.data (see the parity tests in api/tests.py).
+"""
+from functools import lru_cache
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+
+# Fields whose to_representation() returns the database value unchanged,
+# they're copied as is. Any other field type goes through its own
+# to_representation() so the output stays identical.
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    PrimaryKeyRelatedField,
+)
+
+
+class LeanList:
+    """
+    values_list() based equivalent of `serializer_class(many=True).data`
+    for serializers made of plain fields, dotted sources and primary key
+    relations.
+    """
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.names, self.paths, self.fields = [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (serializers.BaseSerializer,
+                                  serializers.ManyRelatedField,
+                                  serializers.SerializerMethodField)) or \
+                    field.source == '*':
+                raise TypeError(
+                    f'{serializer_class.__name__}.{name} is not supported'
+                )
+            self.names.append(name)
+            # 'participant.username' -> 'participant__username', a foreign
+            # key name gives its id
+            self.paths.append('__'.join(field.source_attrs))
+            self.fields.append(field)
+
+    @staticmethod
+    def _converter(field):
+        """
+        Function mapping a database value to the field's representation,
+        None when it's the value itself.
+        """
+        if isinstance(field, PASSTHROUGH_FIELDS):
+            return None
+        if type(field) is serializers.DateTimeField and \
+                getattr(field, 'format', api_settings.DATETIME_FORMAT) \
+                == ISO_8601 and field.default_timezone() is not None:
+            # DateTimeField.to_representation() without looking up the
+            # current timezone for every row
+            field_timezone = getattr(field, 'timezone',
+                                     field.default_timezone())
+
+            def convert(value):
+                value = value.astimezone(field_timezone).isoformat()
+                if value.endswith('+00:00'):
+                    value = value[:-6] + 'Z'
+                return value
+            return convert
+        return field.to_representation
+
+    def values(self, queryset):
+        """
+        The queryset as tuples of the serialized columns (can be paginated
+        like the queryset itself).
+        """
+        return queryset.values_list(*self.paths)
+
+    def rows(self, tuples):
+        names = self.names
+        converted = [(index, self._converter(field))
+                     for index, field in enumerate(self.fields)
+                     if not isinstance(field, PASSTHROUGH_FIELDS)]
+        rows = []
+        for values in tuples:
+            if converted:
+                values = list(values)
+                for index, convert in converted:
+                    if values[index] is not None:
+                        values[index] = convert(values[index])
+            rows.append(dict(zip(names, values)))
+        return rows
+
+    def __call__(self, queryset):
+        return self.rows(self.values(queryset))
+
+
+@lru_cache(maxsize=None)
+def lean_list(serializer_class):
+    """
+    LeanList of a serializer class, built once per process.
+    """
+    return LeanList(serializer_class)
@@ -0,0 +1,163 @@
+"""
+Set-based maintenance operations on the competition tables.
+Per-row saves don't scale, so these work with set-based DELETE/UPDATE
+statements inside a single transaction.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.db.models import Count, F, IntegerField, OuterRef, Q, \
+    Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .catalog import catalog
+from .models import AscensionEvent, Block, BlockScore, \
+    LeaderboardCheckpoint, Participant, ScoreOption
+from .phases import scope
+from .ranking import board
+from .signals import block_changed
+
+
+def snapshot_database(directory=None):
+    """
+    Consistent copy of the SQLite database (VACUUM INTO), named like the
+    backups of tools/backup_db.py. Returns the path of the copy.
+    """
+    if connection.vendor != 'sqlite':
+        raise RuntimeError('El snapshot solo está soportado con SQLite')
+    directory = directory or os.path.join(settings.BASE_DIR, 'backups')
+    os.makedirs(directory, exist_ok=True)
+    timestamp = timezone.localtime().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(directory, f'db_backup_{timestamp}.sqlite3')
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM INTO %s', [path])
+    return path
+
+
+def subtract_scores(scores):
+    """
+    Take the points and distance of `scores` (a BlockScore queryset) off
+    their participants' aggregates, in one UPDATE. Returns the participants
+    updated.
+    """
+    totals = scores.filter(participant=OuterRef('pk')).order_by().values(
+        'participant'
+    ).annotate(
+        points=Sum('earned_points'), distance=Sum('block__distance')
+    )
+    return Participant.objects.filter(
+        pk__in=scores.values('participant')
+    ).update(
+        score=F('score') - Coalesce(Subquery(totals.values('points')), 0),
+        distance_climbed=Greatest(
+            F('distance_climbed') - Coalesce(
+                Subquery(totals.values('distance')), 0
+            ), 0
+        ),
+    )
+
+
+@contextmanager
+def catalog_signals_paused():
+    """
+    Disconnect the catalog's post_delete receivers of Block and ScoreOption
+    (api/signals.py), which queue one invalidation per deleted row. Callers
+    invalidate the catalog once themselves. The receivers are process-wide:
+    only for management commands and tools, not inside the web workers.
+    """
+    senders = (Block, ScoreOption)
+    for sender in senders:
+        post_delete.disconnect(block_changed, sender=sender)
+    try:
+        yield
+    finally:
+        for sender in senders:
+            post_delete.connect(block_changed, sender=sender)
+
+
+def reset_event(keep_blocks=False):
+    """
+    Delete every score (and block/score option unless `keep_blocks`) plus
+    the ascension history of the active competition (the unassigned rows
+    when none is configured), and take those scores off the participant
+    aggregates, in one transaction. Other competitions are left alone,
+    archive_competition still has them to save. Run by management
+    commands and tools only (see catalog_signals_paused()). Returns a list
+    of (step, rows, seconds).
+    """
+    steps = []
+
+    def run(name, operation):
+        start = time.perf_counter()
+        rows = operation()
+        steps.append((name, rows, time.perf_counter() - start))
+
+    def delete(queryset):
+        # Scores, events and checkpoints have no delete receivers nor
+        # cascades: one DELETE each. Blocks and options cascade to the
+        # (already deleted) scores, so Django's collector loads their rows
+        # first (hundreds, not the scores' hundreds of thousands)
+        return queryset.delete()[0]
+
+    with catalog_signals_paused(), transaction.atomic():
+        scores = scope(BlockScore.objects.all())
+        run('participants', lambda: subtract_scores(scores))
+        run('blockscores', lambda: delete(scores))
+        if not keep_blocks:
+            run('scoreoptions', lambda: delete(
+                scope(ScoreOption.objects.all(), 'block__competition')
+            ))
+            run('blocks', lambda: delete(scope(Block.objects.all())))
+        run('events', lambda: delete(scope(AscensionEvent.objects.all())))
+        run('checkpoints',
+            lambda: delete(scope(LeaderboardCheckpoint.objects.all())))
+        # Aggregates were updated (and blocks deleted) without signals
+        transaction.on_commit(board.invalidate)
+        transaction.on_commit(catalog.invalidate)
+    return steps
+
+
+def _total(queryset, field):
+    # Per participant sum of `field` of `queryset`, as a correlated subquery
+    return Coalesce(Subquery(
+        queryset.filter(participant=OuterRef('pk')).order_by().values(
+            'participant'
+        ).annotate(total=Sum(field)).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def audit_scores():
+    """
+    Check the denormalized participant aggregates in one query: score and
+    distance_climbed must be the sums of the participant's scores, and of
+    their ascension history, and a participant can't have two scores of
+    the same block (unique constraint). Returns a dict per participant
+    breaking any of them (empty list if all hold).
+    """
+    duplicates = BlockScore.objects.filter(
+        participant=OuterRef('pk')
+    ).order_by().values('block').annotate(rows=Count('id')).filter(
+        rows__gt=1
+    ).values('block')[:1]
+    return list(Participant.objects.annotate(
+        scores_points=_total(BlockScore.objects, 'earned_points'),
+        scores_distance=_total(BlockScore.objects, 'block__distance'),
+        history_points=_total(AscensionEvent.objects, 'points'),
+        history_distance=_total(AscensionEvent.objects, 'distance'),
+        duplicate_block=Subquery(duplicates),
+    ).filter(
+        ~Q(score=F('scores_points')) |
+        ~Q(distance_climbed=F('scores_distance')) |
+        ~Q(score=F('history_points')) |
+        ~Q(distance_climbed=F('history_distance')) |
+        Q(duplicate_block__isnull=False)
+    ).order_by('id').values(
+        'id', 'score', 'scores_points', 'history_points', 'distance_climbed',
+        'scores_distance', 'history_distance', 'duplicate_block'
+    ))
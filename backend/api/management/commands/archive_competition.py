@@ -0,0 +1,75 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.archiving import archive_competition
+from api.models import Competition
+
+
+class Command(BaseCommand):
+    """
+    Archive a finished competition into a compressed file and remove it from
+    the database tables.
+
+    Usage:
+        python manage.py archive_competition <id>
+        python manage.py archive_competition <id> --keep-data
+        python manage.py archive_competition <id> --output ~/archives
+    """
+    help = 'Archiva una competencia terminada y la elimina de las tablas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('competition_id', type=int)
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Directorio del archivo (default: IROCK_ARCHIVE_DIR)'
+        )
+        parser.add_argument(
+            '--keep-data',
+            action='store_true',
+            help='Solo escribir el archivo, sin eliminar los datos'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Archivar aunque la competencia no haya terminado'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            competition = Competition.objects.get(
+                pk=options['competition_id']
+            )
+        except Competition.DoesNotExist:
+            raise CommandError(
+                f"No existe la competencia {options['competition_id']}"
+            )
+        if competition.archived_at:
+            raise CommandError(f"{competition} ya fue archivada")
+        if competition.phase_at(timezone.now()) != Competition.ENDED \
+                and not options['force']:
+            raise CommandError(
+                f"{competition} no ha terminado (usa --force para archivarla)"
+            )
+
+        directory = options['output']
+        if directory:
+            directory = os.path.expanduser(directory)
+
+        start = time.perf_counter()
+        path, counts = archive_competition(
+            competition, directory, purge=not options['keep_data']
+        )
+        elapsed = time.perf_counter() - start
+
+        for record_type, count in counts.items():
+            self.stdout.write(f"  {record_type:<14} {count}")
+        size_kb = os.path.getsize(path) / 1024
+        self.stdout.write(self.style.SUCCESS(
+            f"{competition} archivada en {path} ({size_kb:.1f} KB) "
+            f"en {elapsed:.2f}s"
+        ))
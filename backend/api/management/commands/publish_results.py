@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.publishing import publish_results, results_root
+
+
+class Command(BaseCommand):
+    """
+    Publish the final results as static precompressed JSON files.
+
+    Usage:
+        python manage.py publish_results
+        python manage.py publish_results --keep 5
+    """
+    help = 'Publica los resultados finales como archivos JSON estáticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=3,
+            help='Número de versiones publicadas a mantener (default: 3)'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        manifest = publish_results(keep=options['keep'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Resultados publicados: versión {manifest['version']} "
+            f"({manifest['participants']} participantes, "
+            f"{len(manifest['files'])} archivos) en {elapsed:.2f}s"
+        ))
+        self.stdout.write(f"Directorio: {results_root()}")
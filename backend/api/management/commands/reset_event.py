@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.maintenance import reset_event, snapshot_database
+
+
+class Command(BaseCommand):
+    """
+    Reset the active competition's data to start over.
+    Deletes its scores, blocks and score options and takes its scores off
+    the participants' score/distance, in a single transaction. Other
+    competitions are not touched.
+
+    Usage:
+        python manage.py reset_event
+        python manage.py reset_event --snapshot --yes
+        python manage.py reset_event --keep-blocks
+    """
+    help = ('Elimina scores, bloques y opciones de la competencia activa, y '
+            'reinicia los puntajes')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-blocks',
+            action='store_true',
+            help='Solo eliminar scores, conservar bloques y opciones'
+        )
+        parser.add_argument(
+            '--snapshot',
+            action='store_true',
+            help='Copiar la base de datos a backups/ antes de eliminar'
+        )
+        parser.add_argument(
+            '--yes',
+            action='store_true',
+            help='No pedir confirmación'
+        )
+
+    def handle(self, *args, **options):
+        if not options['yes']:
+            confirm = input(
+                "Esta acción elimina TODOS los scores"
+                f"{'' if options['keep_blocks'] else ', bloques y opciones'}"
+                " de la competencia activa. Escribe 'SI' para confirmar: "
+            )
+            if confirm.strip().upper() != 'SI':
+                self.stdout.write('Operación cancelada')
+                return
+
+        if options['snapshot']:
+            start = time.perf_counter()
+            try:
+                path = snapshot_database()
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            self.stdout.write(
+                f"Snapshot: {path} ({time.perf_counter() - start:.3f}s)"
+            )
+
+        start = time.perf_counter()
+        steps = reset_event(keep_blocks=options['keep_blocks'])
+        total = time.perf_counter() - start
+
+        for name, rows, seconds in steps:
+            self.stdout.write(f"  {name:<14} {rows:>8}  {seconds:.3f}s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Reinicio completado en {total:.3f}s"
+        ))
@@ -0,0 +1,58 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.jobs import work
+
+
+class Command(BaseCommand):
+    """
+    Background job worker (see api/jobs.py). Runs until SIGTERM or Ctrl+C,
+    finishing the job in progress first.
+
+    Usage:
+        python manage.py run_jobs
+        python manage.py run_jobs --once
+    """
+    help = 'Ejecuta los trabajos en segundo plano'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Segundos entre consultas sin trabajos pendientes '
+                 '(default: IROCK_JOB_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Ejecutar los trabajos pendientes y terminar'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or getattr(
+            settings, 'IROCK_JOB_POLL_INTERVAL', 1
+        )
+        stop = []
+
+        def request_stop(signum, frame):
+            stop.append(signum)
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        def report(job, ok, seconds):
+            if ok:
+                self.stdout.write(f'{job} ({seconds:.2f}s)')
+            else:
+                self.stderr.write(self.style.ERROR(
+                    f'{job} falló, intento {job.attempts} de '
+                    f'{job.max_attempts} ({seconds:.2f}s)'
+                ))
+
+        self.stdout.write(f'Esperando trabajos (cada {interval:g}s)')
+        work(lambda: bool(stop), interval, once=options['once'],
+             report=report)
+        self.stdout.write('Worker detenido')
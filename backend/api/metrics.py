@@ -0,0 +1,285 @@
+"""
+In-app metrics, exposed in Prometheus text format at /metrics/ (staff only).
+Every worker process aggregates its samples in memory, a few dict updates
+per request, and dumps them to its own file in IROCK_METRICS_DIR at most
+every IROCK_METRICS_FLUSH_INTERVAL seconds (on the next request after that).
+A scrape merges the files of every worker, so it sees the whole server
+whichever worker answers it. Files of exited workers are kept (counters
+must not go back), the gunicorn master drops the ones of dead processes
+when it starts (see gunicorn_config.py).
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import suppress
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Latency buckets (seconds) of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                    10.0)
+
+# name: (type, help, buckets)
+METRICS = {
+    'irock_http_requests_total': (
+        'counter', 'Peticiones HTTP por vista, método y status.', None
+    ),
+    'irock_http_request_duration_seconds': (
+        'histogram', 'Duración de las peticiones HTTP por vista y método.',
+        DURATION_BUCKETS
+    ),
+    'irock_http_response_bytes_total': (
+        'counter', 'Bytes de respuesta enviados (ya comprimidos) por vista.',
+        None
+    ),
+    'irock_db_queries_total': (
+        'counter', 'Consultas SQL ejecutadas por vista.', None
+    ),
+    'irock_db_query_duration_seconds_total': (
+        'counter', 'Tiempo en consultas SQL por vista.', None
+    ),
+    'irock_cache_requests_total': (
+        'counter', 'Lecturas de las caches en memoria (ranking, catálogo de '
+        'bloques, competencia) que se sirvieron sin consultar la base de '
+        'datos (hit) o no (miss).', None
+    ),
+}
+
+
+# QueryTimer of the current request. A context variable and not a wrapper
+# installed per request: under ASGI the queries run in other threads, on
+# other connections, which inherit the request's context.
+_query_timer = ContextVar('irock_query_timer', default=None)
+
+
+class QueryTimer:
+    """
+    Count the queries run (on any connection) inside the `with` block and
+    their time. Queries slower than IROCK_SLOW_QUERY_MS are kept in `slow`
+    (sql, params, seconds, database alias) and, when `log` is set to a list,
+    every query is appended to it as {'sql': ..., 'time': seconds}.
+    """
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.log = None
+        self.slow = []
+        slow_ms = getattr(settings, 'IROCK_SLOW_QUERY_MS', None)
+        self.slow_after = None if slow_ms is None else slow_ms / 1000
+
+    @staticmethod
+    def current():
+        """
+        QueryTimer of the running `with` block, None outside any.
+        """
+        return _query_timer.get()
+
+    def __enter__(self):
+        self._token = _query_timer.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _query_timer.reset(self._token)
+
+
+def _time_query(execute, sql, params, many, context):
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        timer.time += elapsed
+        timer.count += 1
+        if timer.log is not None:
+            timer.log.append({'sql': sql, 'time': elapsed})
+        if timer.slow_after is not None and elapsed >= timer.slow_after \
+                and not many:
+            timer.slow.append((sql, params, elapsed,
+                               context['connection'].alias))
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"') \
+        .replace('\n', r'\n')
+
+
+def _labels(pairs, extra=''):
+    text = ','.join(f'{key}="{_escape(value)}"' for key, value in pairs)
+    if extra:
+        text = f'{text},{extra}' if text else extra
+    return f'{{{text}}}' if text else ''
+
+
+class Metrics:
+    """
+    Samples of this process plus the shared store.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (name, labels): value, labels are tuples of (key, value) pairs
+        self._counters = {}
+        # (name, labels): [count per bucket..., count over the last, sum]
+        self._histograms = {}
+        self._flushed_at = 0.0
+        # A forked worker (gunicorn preload) starts from zero, whatever the
+        # master recorded while warming up isn't its
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._flushed_at = 0.0
+
+    def _count(self, name, labels, amount=1):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _observe(self, name, labels, value):
+        key = (name, labels)
+        buckets = METRICS[name][2]
+        values = self._histograms.get(key)
+        if values is None:
+            values = self._histograms[key] = [0] * (len(buckets) + 2)
+        values[bisect.bisect_left(buckets, value)] += 1
+        values[-1] += value
+
+    def cache(self, cache, hit):
+        with self._lock:
+            self._count('irock_cache_requests_total',
+                        (('cache', cache), ('result', 'hit' if hit
+                                            else 'miss')))
+
+    def request(self, view, method, status, duration, size, queries,
+                query_time):
+        """
+        Record a finished request, all its series at once.
+        """
+        labels = (('view', view),)
+        with self._lock:
+            self._count('irock_http_requests_total',
+                        (('view', view), ('method', method),
+                         ('status', status)))
+            self._observe('irock_http_request_duration_seconds',
+                          (('view', view), ('method', method)), duration)
+            self._count('irock_http_response_bytes_total', labels, size)
+            if queries:
+                self._count('irock_db_queries_total', labels, queries)
+                self._count('irock_db_query_duration_seconds_total', labels,
+                            query_time)
+        if time.monotonic() - self._flushed_at > \
+                getattr(settings, 'IROCK_METRICS_FLUSH_INTERVAL', 1):
+            self.flush()
+
+    def _path(self, pid):
+        return os.path.join(settings.IROCK_METRICS_DIR, f'{pid}.json')
+
+    def flush(self):
+        """
+        Write this process' samples to its file in the shared store.
+        """
+        with self._lock:
+            self._flushed_at = time.monotonic()
+            data = {
+                'counters': [[name, labels, value] for (name, labels), value
+                             in self._counters.items()],
+                'histograms': [[name, labels, values]
+                               for (name, labels), values
+                               in self._histograms.items()],
+            }
+        os.makedirs(settings.IROCK_METRICS_DIR, exist_ok=True)
+        path = self._path(os.getpid())
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(data, file)
+        # Atomic, a scrape never reads a half written file
+        os.replace(f'{path}.tmp', path)
+
+    def collect(self):
+        """
+        Samples of every worker, merged: ({(name, labels): value},
+        {(name, labels): values}).
+        """
+        self.flush()
+        counters, histograms = {}, {}
+        for entry in os.scandir(settings.IROCK_METRICS_DIR):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                # Removed meanwhile
+                continue
+            for name, labels, value in data['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in data['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.get(key)
+                if merged is None:
+                    histograms[key] = values
+                else:
+                    histograms[key] = [a + b for a, b in zip(merged, values)]
+        return counters, histograms
+
+    def render(self):
+        """
+        Every worker's metrics in Prometheus text format (version 0.0.4).
+        """
+        counters, histograms = self.collect()
+        series = {}
+        for (name, labels), value in sorted(counters.items()):
+            series.setdefault(name, []).append(
+                f'{name}{_labels(labels)} {value}'
+            )
+        for (name, labels), values in sorted(histograms.items()):
+            lines = series.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(METRICS[name][2] + ('+Inf',), values):
+                cumulative += count
+                bucket = _labels(labels, f'le="{bound}"')
+                lines.append(f'{name}_bucket{bucket} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {values[-1]}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        output = []
+        for name, (kind, description, _) in METRICS.items():
+            if name not in series:
+                continue
+            output.append(f'# HELP {name} {description}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(series[name])
+        return '\n'.join(output) + '\n'
+
+    def remove_dead(self):
+        """
+        Drop the files of processes that no longer exist (server start).
+        """
+        with suppress(FileNotFoundError):
+            for entry in os.scandir(settings.IROCK_METRICS_DIR):
+                pid = entry.name.split('.')[0]
+                if not pid.isdigit():
+                    continue
+                try:
+                    os.kill(int(pid), 0)
+                except ProcessLookupError:
+                    os.remove(entry.path)
+                except PermissionError:
+                    # Alive, another user's
+                    pass
+
+
+metrics = Metrics()
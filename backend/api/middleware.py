@@ -0,0 +1,163 @@
+"""
+HTTP middleware of the API.
+"""
+import re
+import time
+
+import brotli
+
+from contextlib import nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, \
+    sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from . import profiling
+from .metrics import QueryTimer, metrics
+
+_accepts_br = re.compile(r'\bbr\b')
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+# Brotli quality for dynamic responses (11 is for static files, too slow)
+BROTLI_QUALITY = 4
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses of at least IROCK_COMPRESS_MIN_SIZE bytes with brotli
+    or gzip, whichever the client accepts (brotli preferred). Smaller
+    responses aren't worth the CPU, they fit in a packet anyway.
+    Streaming responses (file downloads) are left alone.
+    """
+    def process_response(self, request, response):
+        min_size = getattr(settings, 'IROCK_COMPRESS_MIN_SIZE', 1024)
+        if response.streaming or len(response.content) < min_size:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if _accepts_br.search(accept_encoding):
+            encoding = 'br'
+            content = brotli.compress(response.content,
+                                      quality=BROTLI_QUALITY)
+        elif _accepts_gzip.search(accept_encoding):
+            encoding = 'gzip'
+            # Random padding, like Django's GZipMiddleware (BREACH)
+            content = compress_string(response.content, max_random_bytes=100)
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response.headers['Content-Length'] = str(len(content))
+        response.headers['Content-Encoding'] = encoding
+        # A strong ETag no longer matches the encoded bytes
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+
+# Anything else is recorded as 'other' (the method is a label, unknown ones
+# would add series)
+_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE',
+                      'OPTIONS'))
+
+
+class MetricsMiddleware:
+    """
+    Record every request in api.metrics: latency, status, response bytes
+    and database queries, labeled with the view name. First in MIDDLEWARE,
+    so it times the whole stack and counts the compressed bytes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with QueryTimer() as queries:
+            response = self.get_response(request)
+        self.record(request, response, start, queries)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with QueryTimer() as queries:
+            response = await self.get_response(request)
+        self.record(request, response, start, queries)
+        return response
+
+    @staticmethod
+    def record(request, response, start, queries):
+        match = request.resolver_match
+        method = request.method if request.method in _METHODS else 'other'
+        metrics.request(
+            match.view_name if match else '<unmatched>', method,
+            str(response.status_code), time.perf_counter() - start,
+            0 if response.streaming else len(response.content),
+            queries.count, queries.time
+        )
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests that ask for it or are sampled and store the slow
+    queries of every request (api/profiling.py). Right after
+    MetricsMiddleware, whose QueryTimer it shares.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        current = QueryTimer.current()
+        with nullcontext(current) if current else QueryTimer() as queries:
+            sampler = profiling.start(request, profiling.requested(request))
+            if sampler is not None:
+                queries.log = []
+            start = time.perf_counter()
+            response = self.get_response(request)
+        if sampler is not None or queries.slow:
+            profiling.finish(request, response, time.perf_counter() - start,
+                             queries, sampler)
+        return response
+
+    async def __acall__(self, request):
+        current = QueryTimer.current()
+        with nullcontext(current) if current else QueryTimer() as queries:
+            # The token lookup can't run on the event loop, the sampler must
+            # start on it (it samples the thread that starts it)
+            requested = profiling.HEADER in request.META and \
+                await sync_to_async(profiling.requested)(request)
+            sampler = profiling.start(request, requested)
+            if sampler is not None:
+                queries.log = []
+            start = time.perf_counter()
+            response = await self.get_response(request)
+        if sampler is not None or queries.slow:
+            await sync_to_async(profiling.finish)(
+                request, response, time.perf_counter() - start, queries,
+                sampler
+            )
+        return response
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_events(apps, schema_editor):
+    """
+    Existing ascensions become CREATED events at their original time.
+    """
+    BlockScore = apps.get_model('api', 'BlockScore')
+    AscensionEvent = apps.get_model('api', 'AscensionEvent')
+    scores = BlockScore.objects.order_by('created_at', 'id').values_list(
+        'participant_id', 'block_id', 'earned_points', 'block__distance',
+        'created_at'
+    )
+    AscensionEvent.objects.bulk_create(
+        (AscensionEvent(participant_id=participant_id, block_id=block_id,
+                        kind=1, points=points, distance=distance,
+                        created_at=created_at)
+         for participant_id, block_id, points, distance, created_at in scores),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_alter_blockscore_score_option'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(unique=True)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'ordering': ['-last_event_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AscensionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Created'), (2, 'Updated'), (3, 'Deleted')])),
+                ('points', models.IntegerField(default=0)),
+                ('distance', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('block', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.block')),
+                ('participant', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_ascensionevent_leaderboardcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Competition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('starts_at', models.DateTimeField()),
+                ('freezes_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField()),
+                ('active', models.BooleanField(default=True)),
+                ('results_published_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-starts_at'],
+            },
+        ),
+    ]
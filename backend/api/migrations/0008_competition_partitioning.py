@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def assign_active_competition(apps, schema_editor):
+    """
+    Existing data belongs to the active competition, if one is configured.
+    """
+    Competition = apps.get_model('api', 'Competition')
+    competition = Competition.objects.filter(active=True).order_by(
+        '-starts_at'
+    ).first()
+    if competition is None:
+        return
+    for model in ('Block', 'BlockScore', 'AscensionEvent',
+                  'LeaderboardCheckpoint'):
+        apps.get_model('api', model).objects.filter(
+            competition__isnull=True
+        ).update(competition=competition)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_competition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ascensionevent',
+            name='competition',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.competition'),
+        ),
+        migrations.AddField(
+            model_name='block',
+            name='competition',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='blocks', to='api.competition'),
+        ),
+        migrations.AddField(
+            model_name='blockscore',
+            name='competition',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='scores', to='api.competition'),
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='leaderboardcheckpoint',
+            name='competition',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.competition'),
+        ),
+        migrations.AddIndex(
+            model_name='ascensionevent',
+            index=models.Index(fields=['competition', 'created_at'], name='api_ascensi_competi_c45b4d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blockscore',
+            index=models.Index(fields=['competition', 'participant'], name='api_blocksc_competi_f70e1d_idx'),
+        ),
+        migrations.RunPython(
+            assign_active_competition, migrations.RunPython.noop
+        ),
+    ]
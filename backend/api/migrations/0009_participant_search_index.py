@@ -0,0 +1,89 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:02
+
+from django.db import migrations
+
+# FTS5 index over the searchable participant columns (SQLite only). It is an
+# external content table: it stores only the index, the triggers keep it in
+# sync with every write, including bulk_create/update and other processes.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE api_participant_search USING fts5(
+        username, first_name, last_name, email,
+        content='api_participant', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2 tokenchars '_'",
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER api_participant_search_ai AFTER INSERT ON api_participant
+    BEGIN
+        INSERT INTO api_participant_search
+            (rowid, username, first_name, last_name, email)
+        VALUES
+            (new.id, new.username, new.first_name, new.last_name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER api_participant_search_ad AFTER DELETE ON api_participant
+    BEGIN
+        INSERT INTO api_participant_search
+            (api_participant_search, rowid, username, first_name, last_name,
+             email)
+        VALUES
+            ('delete', old.id, old.username, old.first_name, old.last_name,
+             old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER api_participant_search_au
+    AFTER UPDATE OF username, first_name, last_name, email ON api_participant
+    BEGIN
+        INSERT INTO api_participant_search
+            (api_participant_search, rowid, username, first_name, last_name,
+             email)
+        VALUES
+            ('delete', old.id, old.username, old.first_name, old.last_name,
+             old.email);
+        INSERT INTO api_participant_search
+            (rowid, username, first_name, last_name, email)
+        VALUES
+            (new.id, new.username, new.first_name, new.last_name, new.email);
+    END
+    """,
+    # Index the existing participants
+    "INSERT INTO api_participant_search(api_participant_search) "
+    "VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS api_participant_search_au',
+    'DROP TRIGGER IF EXISTS api_participant_search_ad',
+    'DROP TRIGGER IF EXISTS api_participant_search_ai',
+    'DROP TABLE IF EXISTS api_participant_search',
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Other databases fall back to prefix lookups (see api/search.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_competition_partitioning'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
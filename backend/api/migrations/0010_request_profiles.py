@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_participant_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view', models.CharField(blank=True, max_length=100)),
+                ('user', models.CharField(blank=True, max_length=150)),
+                ('status', models.PositiveSmallIntegerField()),
+                ('duration', models.FloatField()),
+                ('sql_time', models.FloatField()),
+                ('serializer_time', models.FloatField()),
+                ('render_time', models.FloatField()),
+                ('sql_count', models.PositiveIntegerField()),
+                ('samples', models.PositiveIntegerField()),
+                ('queries', models.JSONField(default=list)),
+                ('summary', models.TextField(blank=True)),
+                ('stacks', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('path', models.CharField(max_length=500)),
+                ('view', models.CharField(blank=True, max_length=100)),
+                ('duration', models.FloatField()),
+                ('sql', models.TextField()),
+                ('params', models.TextField(blank=True)),
+                ('plan', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+    ]
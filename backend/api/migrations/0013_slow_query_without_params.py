@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_participant_imports'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='slowquery',
+            name='params',
+        ),
+    ]
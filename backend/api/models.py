@@ -1,9 +1,75 @@
+import json
+import zlib
+
 from django.db import models
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
 
 
+class Competition(models.Model):
+    """
+    Represents a competition event and its schedule. The phase is derived
+    from the schedule: registration before `starts_at`, open until
+    `freezes_at` (optional), frozen until `ends_at` and ended afterwards.
+    Blocks and scores belong to a competition, the API only works with the
+    active one (rows without competition form the "unassigned" partition
+    used when no competition is configured).
+    """
+    # ------------------------------ Phases ------------------------------------
+    REGISTRATION = 'registration'
+    OPEN = 'open'
+    FROZEN = 'frozen'
+    ENDED = 'ended'
+
+    PHASES = [
+        (REGISTRATION, 'Registro'),
+        (OPEN, 'Abierta'),
+        (FROZEN, 'Congelada'),
+        (ENDED, 'Terminada'),
+    ]
+    # --------------------------------------------------------------------------
+    name = models.CharField(max_length=100)
+    starts_at = models.DateTimeField()
+    # Scores can't be submitted by participants after this moment (optional)
+    freezes_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField()
+    active = models.BooleanField(default=True)
+    # Set once the final results were published (see api.publishing)
+    results_published_at = models.DateTimeField(null=True, blank=True)
+    # Set once its data was moved out of the hot tables (see api.archiving)
+    archived_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-starts_at']
+
+    def clean(self):
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError(
+                "La fecha de fin debe ser posterior a la de inicio."
+            )
+        if self.freezes_at and not (
+            self.starts_at <= self.freezes_at <= self.ends_at
+        ):
+            raise ValidationError(
+                "La fecha de congelamiento debe estar entre inicio y fin."
+            )
+
+    def phase_at(self, moment):
+        if moment < self.starts_at:
+            return self.REGISTRATION
+        if moment >= self.ends_at:
+            return self.ENDED
+        if self.freezes_at and moment >= self.freezes_at:
+            return self.FROZEN
+        return self.OPEN
+
+    def __str__(self):
+        return f"{self.name} ({self.starts_at:%Y-%m-%d})"
+
+
 class Block(models.Model):
     """
     Represents a climbing problem (boulder or rute) where each block can define
@@ -27,6 +93,10 @@ class Block(models.Model):
     block_type = models.CharField(
         max_length=10, choices=BLOCK_TYPES, default=RUTA
     )
+    competition = models.ForeignKey(
+        Competition, null=True, blank=True, on_delete=models.PROTECT,
+        related_name='blocks'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -159,6 +229,11 @@ class BlockScore(models.Model):
     )
     score_option = models.ForeignKey(ScoreOption, on_delete=models.CASCADE)
     earned_points = models.IntegerField(default=0)
+    # Copied from the block so scores can be scoped without a join
+    competition = models.ForeignKey(
+        Competition, null=True, blank=True, on_delete=models.PROTECT,
+        related_name='scores'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -168,6 +243,9 @@ class BlockScore(models.Model):
                 fields=['participant', 'block'], name='unique_participant_block'
             )
         ]
+        indexes = [
+            models.Index(fields=['competition', 'participant']),
+        ]
 
     def clean(self):
         # This method is called to validate the model instance
@@ -196,6 +274,7 @@ class BlockScore(models.Model):
         # Auto-calculate earned_points from score_option
         if self.score_option:
             self.earned_points = self.score_option.points
+        self.competition_id = self.block.competition_id
         
         # full_clean() -> clean() -> save
         self.full_clean()
@@ -208,24 +287,265 @@ class BlockScore(models.Model):
             self.participant.score += points_difference
             
             # Update distance only if block changed
+            distance_difference = 0
             if old_block_distance != self.block.distance:
                 distance_difference = self.block.distance - old_block_distance
                 self.participant.distance_climbed += distance_difference
+            kind = AscensionEvent.UPDATED
         else:
             # New BlockScore, add points and distance
             self.participant.score += self.earned_points
             self.participant.distance_climbed += self.block.distance
+            points_difference = self.earned_points
+            distance_difference = self.block.distance
+            kind = AscensionEvent.CREATED
         
         self.participant.save(update_fields=['score', 'distance_climbed'])
+        AscensionEvent.record(
+            self, kind, points_difference, distance_difference
+        )
     
     def delete(self, *args, **kwargs):
         # Subtract earned_points and distance from participant before deleting
         self.participant.score -= self.earned_points
         self.participant.distance_climbed -= self.block.distance
         self.participant.save(update_fields=['score', 'distance_climbed'])
+        AscensionEvent.record(
+            self, AscensionEvent.DELETED, -self.earned_points,
+            -self.block.distance
+        )
         super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"{self.participant.email}- \
             {self.block.lane} -> {self.score_option.key}"
 
+
+class AscensionEvent(models.Model):
+    """
+    Append-only history of ascension changes. Every BlockScore create, edit
+    or delete appends one row holding only the deltas it applied to the
+    participant, so the standings at any moment can be rebuilt by summing
+    events (see LeaderboardCheckpoint).
+    Rows are never updated or deleted, and they keep plain ids (no FK
+    constraints) so history survives the deletion of blocks or participants.
+    """
+    CREATED = 1
+    UPDATED = 2
+    DELETED = 3
+
+    KIND_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+    ]
+
+    participant = models.ForeignKey(
+        Participant, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+'
+    )
+    block = models.ForeignKey(
+        Block, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+'
+    )
+    competition = models.ForeignKey(
+        Competition, null=True, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name='+'
+    )
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    # Deltas applied to the participant aggregates
+    points = models.IntegerField(default=0)
+    distance = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['competition', 'created_at']),
+        ]
+
+    @classmethod
+    def record(cls, block_score, kind, points, distance):
+        return cls.objects.create(
+            participant_id=block_score.participant_id,
+            block_id=block_score.block_id,
+            competition_id=block_score.competition_id,
+            kind=kind,
+            points=points,
+            distance=distance,
+        )
+
+    def __str__(self):
+        return f"{self.created_at} - {self.participant_id} \
+            {self.get_kind_display()} ({self.points:+d})"
+
+
+class LeaderboardCheckpoint(models.Model):
+    """
+    Snapshot of every participant's (score, distance) in a competition after
+    applying all its events up to `last_event_id`. Historical leaderboards start from the
+    nearest checkpoint and only replay the events recorded after it.
+    """
+    competition = models.ForeignKey(
+        Competition, null=True, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name='+'
+    )
+    last_event_id = models.BigIntegerField(unique=True)
+    created_at = models.DateTimeField(db_index=True)
+    # zlib-compressed JSON: [[participant_id, score, distance], ...]
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['-last_event_id']
+
+    @staticmethod
+    def encode(totals):
+        rows = [[pid, score, distance]
+                for pid, (score, distance) in sorted(totals.items())]
+        return zlib.compress(json.dumps(rows, separators=(',', ':')).encode())
+
+    def totals(self):
+        rows = json.loads(zlib.decompress(bytes(self.data)))
+        return {pid: [score, distance] for pid, score, distance in rows}
+
+    def __str__(self):
+        return f"Checkpoint @ {self.created_at} (event {self.last_event_id})"
+
+
+class RequestProfile(models.Model):
+    """
+    Profile of one API request (see api/profiling.py): its SQL with timings
+    and a sampled profile of where the rest of the time went. Only the
+    latest IROCK_PROFILE_KEEP are kept.
+    """
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view = models.CharField(max_length=100, blank=True)
+    user = models.CharField(max_length=150, blank=True)
+    status = models.PositiveSmallIntegerField()
+    # Seconds
+    duration = models.FloatField()
+    sql_time = models.FloatField()
+    serializer_time = models.FloatField()
+    render_time = models.FloatField()
+    sql_count = models.PositiveIntegerField()
+    samples = models.PositiveIntegerField()
+    # [{"sql": ..., "time": seconds}, ...] in execution order
+    queries = models.JSONField(default=list)
+    # Functions with the most samples (text table)
+    summary = models.TextField(blank=True)
+    # Collapsed stacks ("frame;frame;frame count" lines), flame graph input
+    stacks = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration * 1000:.0f} ms)"
+
+
+class SlowQuery(models.Model):
+    """
+    Query slower than IROCK_SLOW_QUERY_MS run by an API request, with its
+    plan. Only the latest IROCK_SLOW_QUERY_KEEP are kept.
+    """
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    path = models.CharField(max_length=500)
+    view = models.CharField(max_length=100, blank=True)
+    # Seconds
+    duration = models.FloatField()
+    # Without its parameters (they may hold personal data or passwords)
+    sql = models.TextField()
+    plan = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.duration * 1000:.0f} ms: {self.sql[:80]}"
+
+
+class Job(models.Model):
+    """
+    Background job run by `manage.py run_jobs` (see api/jobs.py): a
+    function called by its dotted path with JSON arguments. Done jobs are
+    deleted, failed ones are kept with their last error.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+
+    STATE_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    # At most one pending job per key, repeated enqueues merge into it
+    key = models.CharField(max_length=200, null=True, blank=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES,
+                             default=PENDING)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # Enqueues merged into this job
+    coalesced = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['state', 'run_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(state='pending'),
+                name='unique_pending_job_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task}{f' [{self.key}]' if self.key else ''}"
+
+
+class ParticipantImport(models.Model):
+    """
+    CSV of participants uploaded by staff, imported by a background job
+    (api.importing.run_import). The CSV is dropped once imported, the
+    report is kept.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATE_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    created_at = models.DateTimeField(default=timezone.now)
+    created_by = models.ForeignKey(
+        Participant, null=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    filename = models.CharField(max_length=255, blank=True)
+    activate = models.BooleanField(default=False)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES,
+                             default=PENDING)
+    # The uploaded CSV until it is imported
+    data = models.TextField(blank=True)
+    # ParticipantImporter's report: rows, created, errors, seconds
+    report = models.JSONField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.filename or 'CSV'} ({self.get_state_display()})"
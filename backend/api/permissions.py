@@ -1,4 +1,7 @@
 from rest_framework import permissions
+from rest_framework.exceptions import PermissionDenied
+from .models import Competition
+from .phases import phase_cache
 
 
 class IsStaffOrReadOnly(permissions.BasePermission):
@@ -58,3 +61,32 @@ class ReadOnlyPermission(permissions.BasePermission):
         # Only allow GET, HEAD, OPTIONS
         return request.method in permissions.SAFE_METHODS and \
                request.user and request.user.is_authenticated
+
+
+class CompetitionPhasePermission(permissions.BasePermission):
+    """
+    Permission to reject writes outside the competition phases where they are
+    allowed. Views declare `phase_actions = {action: (phases...)}`; staff
+    can always write (corrections after the competition).
+    Runs before serializer validation, and the phase comes from the
+    in-process cache, so out-of-phase traffic is shed without DB work.
+    """
+    messages = {
+        Competition.REGISTRATION: 'La competencia aún no ha comenzado.',
+        Competition.OPEN: 'La competencia está en curso.',
+        Competition.FROZEN: 'La competencia está congelada, '
+                            'ya no se aceptan cambios.',
+        Competition.ENDED: 'La competencia ha terminado.',
+    }
+
+    def has_permission(self, request, view):
+        allowed = getattr(view, 'phase_actions', {}).get(view.action)
+        if allowed is None:
+            return True
+        if request.user and request.user.is_staff:
+            return True
+        phase = phase_cache.phase()
+        if phase is None or phase in allowed:
+            return True
+        # Raised directly so anonymous callers get 403, not 401
+        raise PermissionDenied(self.messages[phase])
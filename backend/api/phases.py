@@ -0,0 +1,89 @@
+"""
+Per-worker cache of the current competition schedule.
+The phase only depends on the schedule and the clock, so once the active
+Competition is loaded, checking the phase costs no query. The cache is
+dropped by the Competition signals in this worker and reloaded at most every
+IROCK_PHASE_CACHE_TTL seconds to pick up edits made through other workers.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .jobs import enqueue
+from .metrics import metrics
+from .models import Competition
+
+_MISSING = object()
+
+
+class PhaseCache:
+    """
+    Active competition of this worker, loaded lazily.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._competition = _MISSING
+        self._loaded_at = 0.0
+        self._published = False
+
+    def invalidate(self):
+        with self._lock:
+            self._competition = _MISSING
+
+    def competition(self):
+        """
+        Active competition (most recent start), None if not configured.
+        """
+        ttl = getattr(settings, 'IROCK_PHASE_CACHE_TTL', 10)
+        hit = self._competition is not _MISSING and \
+            time.monotonic() - self._loaded_at <= ttl
+        metrics.cache('competition', hit=hit)
+        if not hit:
+            competition = Competition.objects.filter(active=True).first()
+            with self._lock:
+                self._competition = competition
+                self._loaded_at = time.monotonic()
+                self._published = bool(
+                    competition and competition.results_published_at
+                )
+        return self._competition
+
+    def phase(self):
+        """
+        Current phase, None when no competition is configured (no phase
+        rules are enforced then).
+        """
+        competition = self.competition()
+        if competition is None:
+            return None
+        phase = competition.phase_at(timezone.now())
+        if phase == Competition.ENDED and not self._published:
+            self._publish_results(competition)
+        return phase
+
+    def _publish_results(self, competition):
+        """
+        Publish the final results the first time any worker sees the
+        competition ended. The conditional UPDATE makes exactly one worker
+        win the claim, the files are written by a background job.
+        """
+        self._published = True
+        claimed = Competition.objects.filter(
+            pk=competition.pk, results_published_at__isnull=True
+        ).update(results_published_at=timezone.now())
+        if claimed:
+            # By path, publishing scopes its queries with this module
+            enqueue('api.publishing.publish_results', key='publish_results')
+
+
+phase_cache = PhaseCache()
+
+
+def scope(queryset, field='competition'):
+    """
+    Restrict a queryset to the rows of the active competition (the
+    unassigned rows when no competition is configured).
+    """
+    return queryset.filter(**{field: phase_cache.competition()})
@@ -0,0 +1,228 @@
+"""
+On-demand request profiling and slow-query log.
+A request is profiled when it carries the X-Irock-Profile header together
+with the token of a staff user (checked before profiling starts) or when
+picked at random with probability IROCK_PROFILE_SAMPLE_RATE. While it
+runs, a sampler thread records the request thread's stack every
+IROCK_PROFILE_INTERVAL seconds and every query is logged with its time.
+The result is stored as a RequestProfile (visible in the admin): SQL, time
+in serializers and renderers estimated from the samples, the functions with
+most samples and the collapsed stacks (flame graph input). At most one
+request per process is profiled at a time.
+Under ASGI only the event loop thread is sampled, the queries are complete.
+
+Independently, queries of any request slower than IROCK_SLOW_QUERY_MS are
+stored as SlowQuery rows with the database's plan for them (their
+parameters aren't stored).
+Both tables are ring buffers, only the latest rows are kept.
+"""
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from knox.auth import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import RequestProfile, SlowQuery
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'HTTP_X_IROCK_PROFILE'
+
+# Frames of these files count as serialization or rendering time
+SERIALIZER_FILES = ('rest_framework/serializers.py',
+                    'rest_framework/fields.py', 'rest_framework/relations.py',
+                    'api/serializers.py', 'api/listing.py')
+RENDERER_FILES = ('rest_framework/renderers.py', 'api/renderers.py')
+
+# Only these statements can be explained
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+# One profile at a time per process
+_profiling = threading.Lock()
+
+
+def _where(code):
+    # 'rest_framework/fields.py:to_representation:552'
+    parts = code.co_filename.replace('\\', '/').rsplit('/', 2)
+    return f"{'/'.join(parts[-2:])}:{code.co_name}:{code.co_firstlineno}"
+
+
+class Sampler:
+    """
+    Statistical profiler of one thread: a daemon thread takes its stack
+    every `interval` seconds.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='irock-profiler')
+
+    def _run(self):
+        me = sys._getframe()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not me:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            # Root first
+            self.stacks[tuple(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def share(self, files):
+        """
+        Fraction of the samples with a frame of `files` in their stack.
+        """
+        total = sum(self.stacks.values())
+        if not total:
+            return 0.0
+        hits = sum(count for stack, count in self.stacks.items()
+                   if any(code.co_filename.replace('\\', '/')
+                          .endswith(files) for code in stack))
+        return hits / total
+
+    def summary(self, limit=20):
+        """
+        Tables of the functions with most samples: running themselves (self)
+        and anywhere in the stack (cumulative).
+        """
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            if stack:
+                own[stack[-1]] += count
+            for code in set(stack):
+                total[code] += count
+        samples = sum(self.stacks.values()) or 1
+        lines = [f'{samples} muestras', '', 'propio']
+        lines.extend(f'{count / samples:>7.1%}  {_where(code)}'
+                     for code, count in own.most_common(limit))
+        lines += ['', 'acumulado']
+        lines.extend(f'{count / samples:>7.1%}  {_where(code)}'
+                     for code, count in total.most_common(limit))
+        return '\n'.join(lines)
+
+    def collapsed(self):
+        return '\n'.join(
+            f"{';'.join(_where(code) for code in stack)} {count}"
+            for stack, count in self.stacks.most_common()
+        )
+
+
+def explain(alias, sql, params):
+    """
+    The database's plan for a query, as text.
+    """
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return ''
+    connection = connections[alias]
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        rows = cursor.fetchall()
+    return '\n'.join(' | '.join(str(value) for value in row) for row in rows)
+
+
+def _trim(model, keep):
+    """
+    Delete all but the latest `keep` rows of `model` (ring buffer).
+    """
+    last = model.objects.order_by('-id').values_list('id', flat=True)[
+        keep:keep + 1
+    ]
+    if last:
+        model.objects.filter(id__lte=last[0]).delete()
+
+
+def save_slow_queries(request, slow):
+    view = _view(request)
+    SlowQuery.objects.bulk_create([
+        SlowQuery(path=request.get_full_path()[:500], view=view,
+                  duration=elapsed, sql=sql,
+                  plan=explain(alias, sql, params))
+        for sql, params, elapsed, alias in slow
+    ])
+    _trim(SlowQuery, getattr(settings, 'IROCK_SLOW_QUERY_KEEP', 500))
+
+
+def save_profile(request, response, duration, queries, sampler):
+    user = getattr(request, 'user', None)
+    RequestProfile.objects.create(
+        method=request.method[:10], path=request.get_full_path()[:500],
+        view=_view(request),
+        user=user.get_username() if user and user.is_authenticated else '',
+        status=response.status_code, duration=duration,
+        sql_time=sum(query['time'] for query in queries),
+        serializer_time=duration * sampler.share(SERIALIZER_FILES),
+        render_time=duration * sampler.share(RENDERER_FILES),
+        sql_count=len(queries), samples=sum(sampler.stacks.values()),
+        queries=queries, summary=sampler.summary(),
+        stacks=sampler.collapsed()
+    )
+    _trim(RequestProfile, getattr(settings, 'IROCK_PROFILE_KEEP', 200))
+
+
+def _view(request):
+    match = request.resolver_match
+    return match.view_name[:100] if match else ''
+
+
+def requested(request):
+    """
+    Whether `request` asks to be profiled: the X-Irock-Profile header with
+    the token of a staff user. The token is checked here, before the view
+    authenticates the request, so anonymous clients can't start a sampler.
+    """
+    if HEADER not in request.META:
+        return False
+    try:
+        auth = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return bool(auth and (auth[0].is_staff or auth[0].is_superuser))
+
+
+def start(request, requested=False):
+    """
+    Start profiling `request` if it asks for it (see requested()) or is
+    sampled. Returns the Sampler, None if the request isn't profiled.
+    """
+    rate = getattr(settings, 'IROCK_PROFILE_SAMPLE_RATE', 0)
+    if not (requested or (rate and random.random() < rate)):
+        return None
+    if not _profiling.acquire(blocking=False):
+        return None
+    return Sampler(getattr(settings, 'IROCK_PROFILE_INTERVAL', 0.002)).start()
+
+
+def finish(request, response, duration, queries, sampler):
+    """
+    Store the profile (if `sampler`) and the slow queries of `queries`
+    (a QueryTimer) of a finished request.
+    """
+    slow, queries.slow = queries.slow, []
+    log, queries.log = queries.log, None
+    try:
+        if sampler is not None:
+            sampler.stop()
+            _profiling.release()
+            save_profile(request, response, duration, log, sampler)
+        if slow:
+            save_slow_queries(request, slow)
+    except DatabaseError:
+        logger.exception('Error storing the profile of %s', request.path)
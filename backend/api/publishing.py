@@ -0,0 +1,156 @@
+"""
+Frozen final results published as static, precompressed JSON files.
+Once the competition is over results don't change anymore, so they are
+rendered once into MEDIA_ROOT/results/<version>/ (served directly by nginx,
+see nginx_irock.conf) together with .gz/.br variants, and post-event reads
+never reach Gunicorn.
+"""
+import gzip
+import json
+import os
+import shutil
+from collections import defaultdict
+
+import brotli
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import BlockScore, Participant
+from .phases import scope
+from .ranking import RANKED_FILTER, ranking_key
+
+RESULTS_DIR = 'results'
+
+
+def results_root():
+    return os.path.join(settings.MEDIA_ROOT, RESULTS_DIR)
+
+
+def _write(directory, name, payload):
+    """
+    Write name.json plus its precompressed variants, returns the file names.
+    """
+    raw = json.dumps(
+        payload, cls=DjangoJSONEncoder, ensure_ascii=False,
+        separators=(',', ':')
+    ).encode('utf-8')
+    path = os.path.join(directory, f'{name}.json')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    variants = {
+        '': raw,
+        '.gz': gzip.compress(raw, compresslevel=9, mtime=0),
+        '.br': brotli.compress(raw),
+    }
+    for suffix, content in variants.items():
+        # Replace atomically so readers never see a half-written file
+        with open(f'{path}{suffix}.tmp', 'wb') as f:
+            f.write(content)
+        os.replace(f'{path}{suffix}.tmp', f'{path}{suffix}')
+    return [f'{name}.json{suffix}' for suffix in variants]
+
+
+def render_results():
+    """
+    Build the leaderboards, participant result cards and category stats
+    from the database. Returns (leaderboards, cards, stats).
+    The files are public: participants only appear with their username and
+    ranking fields, genders only as counts per cup.
+    """
+    participants = list(
+        Participant.objects.filter(**RANKED_FILTER).values(
+            'id', 'username', 'cup', 'gender', 'score', 'distance_climbed'
+        )
+    )
+    participants.sort(key=lambda p: ranking_key(
+        p['id'], p['score'], p['distance_climbed']
+    ))
+
+    ascensions = defaultdict(list)
+    for row in scope(BlockScore.objects.filter(
+        participant__in=[p['id'] for p in participants]
+    )).order_by('created_at').values(
+        'participant_id', 'block__lane', 'block__grade', 'block__block_type',
+        'score_option__label', 'earned_points', 'created_at'
+    ):
+        ascensions[row['participant_id']].append({
+            'block_lane': row['block__lane'],
+            'grade': row['block__grade'],
+            'block_type': row['block__block_type'],
+            'score_option_label': row['score_option__label'],
+            'earned_points': row['earned_points'],
+            'created_at': row['created_at'],
+        })
+
+    leaderboards = {cup: [] for cup, _ in Participant.CUP_CHOICES}
+    genders = defaultdict(lambda: defaultdict(int))
+    for participant in participants:
+        gender = participant.pop('gender') or Participant.PREFER_NOT_TO_SAY
+        genders[participant['cup']][gender] += 1
+        board = leaderboards.setdefault(participant['cup'], [])
+        board.append(dict(participant, rank=len(board) + 1))
+
+    cards = {}
+    stats = {}
+    for cup, board in leaderboards.items():
+        for entry in board:
+            cards[entry['id']] = dict(
+                entry,
+                total_in_cup=len(board),
+                ascensions=ascensions.get(entry['id'], []),
+            )
+        scores = [entry['score'] for entry in board]
+        stats[cup] = {
+            'participants': len(board),
+            'by_gender': dict(genders[cup]),
+            'ascensions': sum(len(ascensions.get(entry['id'], []))
+                              for entry in board),
+            'max_score': max(scores, default=0),
+            'avg_score': round(sum(scores) / len(scores), 2) if scores else 0,
+            'total_distance': sum(e['distance_climbed'] for e in board),
+        }
+    return leaderboards, cards, stats
+
+
+def publish_results(keep=3):
+    """
+    Render the final results into a new version directory, point
+    latest.json to it and remove old versions (keeping `keep`).
+    Returns the manifest of the published version.
+    """
+    root = results_root()
+    version = timezone.now().strftime('%Y%m%d%H%M%S')
+    staging = os.path.join(root, f'.{version}.tmp')
+    shutil.rmtree(staging, ignore_errors=True)
+
+    leaderboards, cards, stats = render_results()
+    files = []
+    files += _write(staging, 'leaderboard', leaderboards)
+    for cup, board in leaderboards.items():
+        files += _write(staging, f'leaderboard-{cup}', board)
+    files += _write(staging, 'stats', stats)
+    for participant_id, card in cards.items():
+        files += _write(staging, f'participants/{participant_id}', card)
+
+    manifest = {
+        'version': version,
+        'published_at': timezone.now(),
+        'participants': len(cards),
+        'files': files,
+    }
+    _write(staging, 'manifest', manifest)
+
+    # Publish atomically: the version dir appears complete, then the pointer
+    target = os.path.join(root, version)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    _write(root, 'latest', {'version': version, 'path': f'{version}/'})
+
+    versions = sorted(
+        name for name in os.listdir(root)
+        if name.isdigit() and os.path.isdir(os.path.join(root, name))
+    )
+    for old in versions[:-keep] if keep else []:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return manifest
@@ -0,0 +1,288 @@
+"""
+In-process ranking for the iRock leaderboards.
+Each worker keeps, per cup, a sorted array of ranking keys so that the
+position of a participant (and the participants around them) can be answered
+with a bisect, without counting rows in the database on every page view.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Max
+
+from .metrics import metrics
+from .models import AscensionEvent, Participant
+
+# Participants that show up in the leaderboards (same rule as the frontend)
+RANKED_FILTER = {'is_active': True, 'is_staff': False, 'is_superuser': False}
+
+
+def ranking_key(participant_id, score, distance):
+    """
+    Sort key for a participant: more points first, then more distance
+    climbed, then oldest account (lowest id) to break ties.
+    """
+    return (-score, -distance, participant_id)
+
+
+class CupRanking:
+    """
+    Sorted array of ranking keys for a single cup.
+    Lookups are O(log n) with bisect; inserts/removals shift the array,
+    which is negligible for gym-sized events.
+    """
+    def __init__(self):
+        self._keys = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        bisect.insort(self._keys, key)
+
+    def remove(self, key):
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def position(self, key):
+        """
+        0-based position of key in the cup.
+        """
+        return bisect.bisect_left(self._keys, key)
+
+    def window(self, start, stop):
+        return self._keys[max(start, 0):stop]
+
+
+class RankingBoard:
+    """
+    Per-worker ranking of every cup.
+    Seeded from the database and kept up to date from model signals. The
+    writes made by other Gunicorn workers are picked up by tailing the
+    AscensionEvent stream, and a periodic consistency check against SQL
+    catches everything else (e.g. activations done in another worker).
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cups = {}
+        # participant id -> (cup, key, username)
+        self._entries = {}
+        self._seeded = False
+        self._checked_at = 0.0
+        self._tailed_at = 0.0
+        self._last_event_id = 0
+
+    # ------------------------------ Loading -----------------------------------
+    def _ranked_rows(self):
+        return Participant.objects.filter(**RANKED_FILTER).values_list(
+            'id', 'cup', 'score', 'distance_climbed', 'username'
+        )
+
+    def _latest_event_id(self):
+        return AscensionEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+    def _load(self, rows, last_event_id):
+        cups = {cup: CupRanking() for cup, _ in Participant.CUP_CHOICES}
+        entries = {}
+        for participant_id, cup, score, distance, username in rows:
+            key = ranking_key(participant_id, score, distance)
+            entries[participant_id] = (cup, key, username)
+            cups.setdefault(cup, CupRanking())._keys.append(key)
+        for ranking in cups.values():
+            ranking._keys.sort()
+        self._cups = cups
+        self._entries = entries
+        self._seeded = True
+        self._last_event_id = last_event_id
+        self._checked_at = self._tailed_at = time.monotonic()
+
+    def seed(self):
+        """
+        (Re)build the whole ranking from the database.
+        """
+        last_event_id = self._latest_event_id()
+        rows = list(self._ranked_rows())
+        with self._lock:
+            self._load(rows, last_event_id)
+
+    def invalidate(self):
+        """
+        Force a reseed on next access (used after bulk updates that
+        bypass model signals).
+        """
+        with self._lock:
+            self._seeded = False
+
+    def verify(self):
+        """
+        Consistency check against SQL. Rebuilds the ranking if it drifted
+        and returns the number of participants that were out of sync.
+        """
+        last_event_id = self._latest_event_id()
+        rows = list(self._ranked_rows())
+        with self._lock:
+            expected = {
+                row[0]: (row[1], ranking_key(row[0], row[2], row[3]), row[4])
+                for row in rows
+            }
+            drift = len(expected.keys() ^ self._entries.keys()) + sum(
+                1 for participant_id, entry in expected.items()
+                if self._entries.get(participant_id, entry) != entry
+            )
+            if drift or not self._seeded:
+                self._load(rows, last_event_id)
+            else:
+                self._last_event_id = max(self._last_event_id, last_event_id)
+                self._checked_at = self._tailed_at = time.monotonic()
+        return drift
+
+    def tail(self):
+        """
+        Apply the ascension events recorded since the last look (by any
+        worker) by reloading the participants they touched.
+        """
+        events = list(AscensionEvent.objects.filter(
+            id__gt=self._last_event_id
+        ).values_list('id', 'participant_id'))
+        if events:
+            touched = {participant_id for _, participant_id in events}
+            participants = Participant.objects.filter(
+                id__in=touched
+            ).only(
+                'id', 'cup', 'score', 'distance_climbed', 'username',
+                *RANKED_FILTER
+            )
+            with self._lock:
+                for participant in participants:
+                    touched.discard(participant.id)
+                    self.update(participant)
+                for participant_id in touched:
+                    self.discard(participant_id)
+                self._last_event_id = max(
+                    self._last_event_id, events[-1][0]
+                )
+        self._tailed_at = time.monotonic()
+
+    def _pending(self):
+        """
+        Refresh the next query needs: 'seed', 'verify', 'tail' or None.
+        """
+        check_interval = getattr(settings, 'IROCK_RANKING_CHECK_INTERVAL', 30)
+        tail_interval = getattr(settings, 'IROCK_RANKING_TAIL_INTERVAL', 2)
+        now = time.monotonic()
+        if not self._seeded:
+            return 'seed'
+        if now - self._checked_at > check_interval:
+            return 'verify'
+        if now - self._tailed_at > tail_interval:
+            return 'tail'
+        return None
+
+    def stale(self):
+        """
+        Whether ensure_fresh() would query the database (async views call it
+        through sync_to_async() only then).
+        """
+        if self._pending() is None:
+            metrics.cache('ranking', hit=True)
+            return False
+        return True
+
+    def ensure_fresh(self):
+        pending = self._pending()
+        metrics.cache('ranking', hit=pending is None)
+        if pending is not None:
+            getattr(self, pending)()
+
+    # ------------------------------ Updates -----------------------------------
+    def discard(self, participant_id):
+        with self._lock:
+            entry = self._entries.pop(participant_id, None)
+            if entry is not None:
+                self._cups[entry[0]].remove(entry[1])
+
+    def update(self, participant):
+        """
+        Apply the current state of a participant instance.
+        """
+        if not self._seeded:
+            return
+        with self._lock:
+            self.discard(participant.id)
+            if all(getattr(participant, field) == value
+                   for field, value in RANKED_FILTER.items()):
+                key = ranking_key(
+                    participant.id, participant.score,
+                    participant.distance_climbed
+                )
+                self._entries[participant.id] = (
+                    participant.cup, key, participant.username
+                )
+                self._cups.setdefault(
+                    participant.cup, CupRanking()
+                ).add(key)
+
+    # ------------------------------ Queries -----------------------------------
+    def _describe(self, position, key):
+        participant_id = key[2]
+        return {
+            'rank': position + 1,
+            'id': participant_id,
+            'username': self._entries[participant_id][2],
+            'score': -key[0],
+            'distance_climbed': -key[1],
+        }
+
+    def standing(self, participant_id, radius=0, refresh=True):
+        """
+        Position of a participant in their cup, optionally with the
+        `radius` participants above and below. None if not ranked.
+        With refresh=False the ranking is used as is (no query).
+        """
+        if refresh:
+            self.ensure_fresh()
+        with self._lock:
+            entry = self._entries.get(participant_id)
+            if entry is None:
+                return None
+            cup, key, _ = entry
+            ranking = self._cups[cup]
+            position = ranking.position(key)
+            start = max(position - radius, 0)
+            neighbours = [
+                self._describe(start + offset, other)
+                for offset, other in enumerate(
+                    ranking.window(start, position + radius + 1)
+                )
+            ]
+            standing = self._describe(position, key)
+            standing.update({
+                'cup': cup,
+                'total': len(ranking),
+                'neighbours': neighbours,
+            })
+            return standing
+
+    def leaderboard(self, cup=None, limit=None, refresh=True):
+        """
+        Current leaderboard per cup (or only `cup`), top `limit` entries.
+        With refresh=False the ranking is used as is (no query).
+        """
+        if refresh:
+            self.ensure_fresh()
+        with self._lock:
+            return {
+                ranking_cup: [
+                    self._describe(position, key)
+                    for position, key in enumerate(
+                        ranking.window(0, limit if limit else len(ranking))
+                    )
+                ]
+                for ranking_cup, ranking in self._cups.items()
+                if not cup or ranking_cup == cup
+            }
+
+
+board = RankingBoard()
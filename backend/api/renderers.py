@@ -0,0 +1,67 @@
+"""
+Response renderers.
+FastJSONRenderer produces the same JSON as DRF's JSONRenderer (compact,
+UTF-8) with orjson, several times faster on large lists. MessagePackRenderer
+serves the same data as application/msgpack to clients that ask for it in
+Accept.
+"""
+import msgpack
+import orjson
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Types orjson doesn't know (Decimal, lazy strings, querysets...) and
+    # datetimes ('Z' suffix, milliseconds) are converted like DRF's encoder
+    # does
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on top of orjson.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        # The browsable API and '; indent=N' media types ask for indentation
+        if self.get_indent(accepted_media_type or '',
+                           renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=option)
+
+
+class PrometheusRenderer(BaseRenderer):
+    """
+    Renders text already in Prometheus exposition format (/metrics/).
+    """
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        # Errors (401, 403) come as dicts
+        return '\n'.join(f'# {key}: {value}'
+                         for key, value in (data or {}).items()).encode()
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders the response data as MessagePack.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default)
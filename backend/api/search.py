@@ -0,0 +1,71 @@
+"""
+Participant search for the staff pages (judges looking up a climber).
+On SQLite the query runs against the FTS5 index created by migration 0009
+(prefix match on username, names and email, ignoring case and accents);
+other databases fall back to istartswith lookups. A number also matches the
+participant id (the bib number).
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'api_participant_search'
+SEARCH_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+# Characters that are syntax in an FTS5 query
+_TOKEN_RE = re.compile(r'[^\w]+')
+_fts_table = None
+
+
+def tokens(q):
+    """
+    Search terms of a query string, FTS syntax removed.
+    """
+    return [token for token in _TOKEN_RE.split(q.lower()) if token]
+
+
+def _fts_available():
+    global _fts_table
+    if connection.vendor != 'sqlite':
+        return False
+    if _fts_table is None:
+        with connection.cursor() as cursor:
+            _fts_table = SEARCH_TABLE in \
+                connection.introspection.table_names(cursor)
+    return _fts_table
+
+
+def search_participants(queryset, q):
+    """
+    Filter a Participant queryset to the rows matching `q`. Every term has
+    to match the start of a word in one of SEARCH_FIELDS. Exact id matches
+    are ordered first.
+    """
+    terms = tokens(q)
+    if not terms:
+        return queryset.none()
+
+    if _fts_available():
+        match = ' '.join(f'"{term}"*' for term in terms)
+        condition = Q(id__in=RawSQL(
+            f'SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s', [match]
+        ))
+    else:
+        condition = Q()
+        for term in terms:
+            term_condition = Q()
+            for field in SEARCH_FIELDS:
+                term_condition |= Q(**{f'{field}__istartswith': term})
+            condition &= term_condition
+
+    bib = q.strip()
+    if bib.isdigit():
+        condition |= Q(id=int(bib))
+        return queryset.filter(condition).annotate(
+            bib_match=Case(When(id=int(bib), then=Value(0)),
+                           default=Value(1), output_field=IntegerField())
+        ).order_by('bib_match', 'username')
+    return queryset.filter(condition).order_by('username')
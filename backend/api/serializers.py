@@ -1,6 +1,10 @@
 from rest_framework import serializers
-from .models import Block, ScoreOption, Participant, BlockScore
+from django.conf import settings
+from django.db import transaction
+from .models import Block, ScoreOption, Participant, BlockScore, \
+    Competition
 from django.contrib.auth import get_user_model
+from .phases import scope
 
 """
 Serializers for the iRock climbing competition models.
@@ -25,12 +29,26 @@ class ScoreOptionSerializer(serializers.ModelSerializer):
         ]
 
 
+class BlockScoreOptionSerializer(ScoreOptionSerializer):
+    """
+    Serializer for ScoreOptions nested in a block write. The block comes
+    from the parent, and 'id' (optional) identifies an existing option to
+    update.
+    """
+    id = serializers.IntegerField(required=False)
+
+    class Meta(ScoreOptionSerializer.Meta):
+        read_only_fields = ['block']
+
+
 class BlockSerializer(serializers.ModelSerializer):
     """
     Serializer for Block model including nested ScoreOptions.
+    Writing `score_options` replaces the whole option set of the block in
+    the same transaction as the block itself.
     """
     # Score options related to this block, a block has many score options
-    score_options = ScoreOptionSerializer(many=True, read_only=True)
+    score_options = BlockScoreOptionSerializer(many=True, required=False)
     
     class Meta:
         model = Block
@@ -48,6 +66,122 @@ class BlockSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at']
 
+    def validate_score_options(self, value):
+        """
+        Keys must be unique within the block. Options updated by id keep
+        their current key when they don't send one, new ones need it.
+        """
+        existing = {} if self.instance is None else dict(
+            self.instance.score_options.values_list('id', 'key')
+        )
+        keys = []
+        for option in value:
+            key = option.get('key', existing.get(option.get('id')))
+            if key is None:
+                raise serializers.ValidationError(
+                    "Las opciones nuevas requieren 'key'."
+                )
+            keys.append(key)
+        if len(keys) != len(set(keys)):
+            raise serializers.ValidationError(
+                "Las opciones de score no pueden repetir 'key'."
+            )
+        return value
+
+    def validate(self, data):
+        """
+        Options with ascensions can't be dropped nor change their points by
+        an update: the scores would change without adjusting the
+        participants.
+        """
+        if self.instance is not None and 'score_options' in data:
+            options = {option['id']: option for option in data['score_options']
+                       if 'id' in option}
+            scored = self.instance.score_options.filter(
+                blockscore__isnull=False
+            ).distinct()
+            dropped = sorted(option.key for option in scored
+                             if option.id not in options)
+            if dropped:
+                raise serializers.ValidationError({'score_options': [
+                    'Hay ascensos registrados con las opciones '
+                    f"{', '.join(dropped)}, no se pueden eliminar."
+                ]})
+            repriced = sorted(
+                option.key for option in scored
+                if options[option.id].get('points', option.points)
+                != option.points
+            )
+            if repriced:
+                raise serializers.ValidationError({'score_options': [
+                    'Hay ascensos registrados con las opciones '
+                    f"{', '.join(repriced)}, no se pueden cambiar sus "
+                    'puntos.'
+                ]})
+        return data
+
+    @transaction.atomic
+    def create(self, validated_data):
+        options = validated_data.pop('score_options', [])
+        block = super().create(validated_data)
+        ScoreOption.objects.bulk_create([
+            ScoreOption(block=block, **self._option_fields(option))
+            for option in options
+        ])
+        return block
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        options = validated_data.pop('score_options', None)
+        block = super().update(instance, validated_data)
+        if options is not None:
+            self._replace_options(block, options)
+        return block
+
+    @staticmethod
+    def _option_fields(option):
+        return {field: option[field] for field in
+                ('key', 'label', 'order', 'points') if field in option}
+
+    def _replace_options(self, block, options):
+        """
+        Make the block's options match `options`: options with a known id
+        are updated, the rest created, and the missing ones deleted (one
+        statement each, two for the update when keys change).
+        """
+        existing = {option.id: option for option in block.score_options.all()}
+        keys = {option.id: option.key for option in existing.values()}
+        to_update, to_create = [], []
+        for option in options:
+            fields = self._option_fields(option)
+            current = existing.get(option.get('id'))
+            if current is None:
+                to_create.append(ScoreOption(block=block, **fields))
+                continue
+            for field, value in fields.items():
+                setattr(current, field, value)
+            to_update.append(current)
+
+        kept = {option.id for option in to_update}
+        block.score_options.exclude(id__in=kept).delete()
+        # Keys moving between options (a swap) would break the (block, key)
+        # unique constraint halfway: those get a temporary key first
+        renamed = [option for option in to_update
+                   if option.key != keys[option.id]]
+        if renamed:
+            ScoreOption.objects.bulk_update([
+                ScoreOption(id=option.id, key=f'--{option.id}')
+                for option in renamed
+            ], ['key'])
+        if to_update:
+            ScoreOption.objects.bulk_update(
+                to_update, ['key', 'label', 'order', 'points']
+            )
+        ScoreOption.objects.bulk_create(to_create)
+        # Drop the prefetched/cached options so the response is fresh
+        if hasattr(block, '_prefetched_objects_cache'):
+            block._prefetched_objects_cache.pop('score_options', None)
+
 
 class ParticipantSerializer(serializers.ModelSerializer):
     """
@@ -115,7 +249,68 @@ class ParticipantSerializer(serializers.ModelSerializer):
         return instance
 
 
-class BlockScoreSerializer(serializers.ModelSerializer):
+class ParticipantBulkFilterSerializer(serializers.Serializer):
+    """
+    Filter to select participants for a bulk change.
+    """
+    cup = serializers.ChoiceField(
+        choices=Participant.CUP_CHOICES, required=False
+    )
+    gender = serializers.ChoiceField(
+        choices=Participant.GENDER_CHOICES, required=False
+    )
+    is_active = serializers.BooleanField(required=False)
+    is_staff = serializers.BooleanField(required=False)
+
+    def validate(self, data):
+        # An empty filter would select every participant
+        if not data:
+            raise serializers.ValidationError(
+                'Indica al menos un criterio en el filtro.'
+            )
+        return data
+
+
+class ParticipantBulkSerializer(serializers.Serializer):
+    """
+    Serializer for bulk changes on participants, selected either by a list
+    of ids or by a filter.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    filter = ParticipantBulkFilterSerializer(required=False)
+    # Target cup (only for bulk cup change)
+    cup = serializers.ChoiceField(
+        choices=Participant.CUP_CHOICES, required=False
+    )
+
+    def validate(self, data):
+        if ('ids' in data) == ('filter' in data):
+            raise serializers.ValidationError(
+                "Indica 'ids' o 'filter' (solo uno)."
+            )
+        return data
+
+
+class ActiveCompetitionScoreMixin:
+    """
+    Blocks and score options of a written score must belong to the active
+    competition: ids of other competitions fail validation.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        if 'block' in fields and not fields['block'].read_only:
+            fields['block'].queryset = scope(Block.objects.all())
+        if 'score_option' in fields and not fields['score_option'].read_only:
+            fields['score_option'].queryset = scope(
+                ScoreOption.objects.all(), 'block__competition'
+            )
+        return fields
+
+
+class BlockScoreSerializer(ActiveCompetitionScoreMixin,
+                           serializers.ModelSerializer):
     """
     Srializer for BlockScore, this serializer filters the socre_option
     for the block
@@ -162,7 +357,8 @@ class BlockScoreSerializer(serializers.ModelSerializer):
         return data
 
 
-class BlockScoreCreateSerializer(serializers.ModelSerializer):
+class BlockScoreCreateSerializer(ActiveCompetitionScoreMixin,
+                                 serializers.ModelSerializer):
     """
     Simple serializer for creating BlockScore with IDs
     """
@@ -205,3 +401,50 @@ class LoginSerializer(serializers.Serializer):
         ret = super().to_representation(instance)
         ret.pop('password', None)
         return ret
+
+
+class CompetitionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for Competition schedule.
+    """
+    class Meta:
+        model = Competition
+        fields = [
+            'id',
+            'name',
+            'starts_at',
+            'freezes_at',
+            'ends_at',
+        ]
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    """
+    One sub-request of a batch.
+    """
+    method = serializers.ChoiceField(
+        choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'], default='GET'
+    )
+    # Path of the endpoint (e.g. '/blocks/3/' or '/blockscores/?block=3')
+    path = serializers.RegexField(r'^/', max_length=500)
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    """
+    Serializer for batch requests.
+    """
+    requests = serializers.ListField(
+        child=BatchRequestSerializer(), allow_empty=False
+    )
+    # Run all sub-requests in one transaction (writes rolled back together
+    # if any sub-request fails)
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        limit = getattr(settings, 'IROCK_BATCH_MAX_REQUESTS', 20)
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f'Máximo {limit} peticiones por batch.'
+            )
+        return value
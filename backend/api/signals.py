@@ -0,0 +1,56 @@
+"""
+Signal handlers that keep the in-process caches in sync with model writes.
+NOTE: queryset.update()/delete() do not send these signals, code doing bulk
+writes has to invalidate the caches itself.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import catalog
+from .history import maybe_checkpoint
+from .models import AscensionEvent, Block, BlockScore, Competition, \
+    Participant, ScoreOption
+from .phases import phase_cache
+from .ranking import board
+
+
+@receiver(post_save, sender=Participant)
+def participant_saved(sender, instance, **kwargs):
+    board.update(instance)
+
+
+@receiver(post_delete, sender=Participant)
+def participant_deleted(sender, instance, **kwargs):
+    board.discard(instance.id)
+
+
+# NOTE: no post_delete receiver for BlockScore on purpose. BlockScore.delete()
+# saves the participant (handled above), and a delete listener would force
+# Django to load every row on queryset deletes instead of a single DELETE.
+@receiver(post_save, sender=BlockScore)
+def blockscore_changed(sender, instance, **kwargs):
+    # BlockScore.save() already adjusted the participant aggregates
+    if BlockScore.participant.is_cached(instance):
+        board.update(instance.participant)
+
+
+@receiver(post_save, sender=AscensionEvent)
+def ascension_recorded(sender, instance, created, **kwargs):
+    if created:
+        maybe_checkpoint(instance)
+
+
+@receiver(post_save, sender=Competition)
+@receiver(post_delete, sender=Competition)
+def competition_changed(sender, instance, **kwargs):
+    phase_cache.invalidate()
+
+
+@receiver(post_save, sender=Block)
+@receiver(post_delete, sender=Block)
+@receiver(post_save, sender=ScoreOption)
+@receiver(post_delete, sender=ScoreOption)
+def block_changed(sender, instance, **kwargs):
+    # After commit, so a reload can't cache the state mid-transaction
+    transaction.on_commit(catalog.invalidate)
@@ -1,3 +1,409 @@
-from django.test import TestCase
+import datetime
+import signal
+from io import StringIO
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .jobs import _add, enqueue
+from .listing import LeanList
+from .models import Block, BlockScore, Job, Participant, ScoreOption
+from .ranking import RANKED_FILTER, RankingBoard, board
+from .serializers import BlockScoreSerializer, ParticipantSerializer
+from .throttling import ClientThrottle, EmailThrottle
+
+
+# Arguments of the record_job() runs
+CALLS = []
+
+
+def record_job(value):
+    CALLS.append(value)
+
+
+def failing_job():
+    raise RuntimeError('falla')
+
+
+def superseded_job():
+    # A newer job of the same key is enqueued while this one runs
+    _add('api.tests.record_job', ['nuevo'], 'superseded', 0, None)
+    raise RuntimeError('falla')
+
+
+class LeanListParityTests(TestCase):
+    """
+    The lean list path must return exactly what the serializers return.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = Participant.objects.create_superuser(
+            'staff@irock.mx', 'x', username='staff', is_active=True
+        )
+        blocks = [
+            Block.objects.create(lane='Línea 1', grade='5.10a', distance=12),
+            Block.objects.create(lane='Línea 2', block_type=Block.BOULDER),
+        ]
+        participants = [
+            Participant.objects.create_user(
+                'ana@irock.mx', 'x', username='ana', first_name='Ána',
+                last_name='Pérez', cup=Participant.AVANZADO, gender='F',
+                date_of_birth=datetime.date(2001, 2, 3), is_active=True
+            ),
+            # Empty/null fields
+            Participant.objects.create_user('beto@irock.mx', 'x',
+                                            username='beto'),
+        ]
+        for block in blocks:
+            options = [
+                ScoreOption.objects.create(block=block, key=key, label=key,
+                                           points=points)
+                for key, points in (('flash', 100), ('mas', 0))
+            ]
+            for participant, option in zip(participants, options):
+                BlockScore.objects.create(participant=participant,
+                                          block=block, score_option=option)
+
+    def assertParity(self, serializer_class, queryset):
+        expected = serializer_class(queryset, many=True).data
+        lean = LeanList(serializer_class)(queryset)
+        self.assertEqual(len(expected), len(lean))
+        for expected_row, lean_row in zip(expected, lean):
+            # Same keys in the same order and same values (and types)
+            self.assertEqual(list(expected_row.items()),
+                             list(lean_row.items()))
+            for key, value in expected_row.items():
+                self.assertIs(type(value), type(lean_row[key]), key)
+
+    def test_participants(self):
+        self.assertParity(ParticipantSerializer,
+                          Participant.objects.order_by('id'))
+
+    def test_block_scores(self):
+        self.assertParity(BlockScoreSerializer,
+                          BlockScore.objects.order_by('id'))
+
+    def test_list_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        response = client.get('/blockscores/')
+        self.assertEqual(
+            response.json(),
+            BlockScoreSerializer(BlockScore.objects.all(), many=True).data
+        )
+        response = client.get('/participants/', {'ordering': 'id',
+                                                  'page_size': 2})
+        self.assertEqual(response.json()['count'], 3)
+        self.assertEqual(
+            response.json()['results'],
+            ParticipantSerializer(Participant.objects.order_by('id')[:2],
+                                  many=True).data
+        )
+
+
+class RankingBoardTests(TestCase):
+    """
+    The in-process board, kept up to date by the model signals, must rank
+    like the database.
+    """
+    def setUp(self):
+        self.block = Block.objects.create(lane='Línea 1', distance=10)
+        self.other_block = Block.objects.create(lane='Línea 2', distance=4)
+        self.flash, self.mas = (
+            ScoreOption.objects.create(block=self.block, key=key, label=key,
+                                       points=points)
+            for key, points in (('flash', 100), ('mas', 25))
+        )
+        self.other_flash = ScoreOption.objects.create(
+            block=self.other_block, key='flash', label='flash', points=100
+        )
+        cups = [Participant.PRINCIPIANTE, Participant.PRINCIPIANTE,
+                Participant.PRINCIPIANTE, Participant.AVANZADO]
+        self.participants = [
+            Participant.objects.create_user(
+                f'p{number}@irock.mx', None, username=f'p{number}', cup=cup,
+                is_active=True
+            )
+            for number, cup in enumerate(cups)
+        ]
+        board.seed()
+        # The board is per process, don't leak this test's state
+        self.addCleanup(board.invalidate)
+
+    def climb(self, participant, option):
+        return BlockScore.objects.create(participant=participant,
+                                         block=option.block,
+                                         score_option=option)
+
+    def assertMatchesDatabase(self, ranking=board):
+        expected = {cup: [] for cup, _ in Participant.CUP_CHOICES}
+        for participant in Participant.objects.filter(
+                **RANKED_FILTER).order_by('-score', '-distance_climbed', 'id'):
+            entries = expected[participant.cup]
+            entries.append({
+                'rank': len(entries) + 1,
+                'id': participant.id,
+                'username': participant.username,
+                'score': participant.score,
+                'distance_climbed': participant.distance_climbed,
+            })
+        self.assertEqual(ranking.leaderboard(refresh=False), expected)
+        for entries in expected.values():
+            for entry in entries:
+                standing = ranking.standing(entry['id'], refresh=False)
+                self.assertEqual(standing['rank'], entry['rank'])
+                self.assertEqual(standing['total'], len(entries))
+        # Nothing for the consistency check to repair
+        self.assertEqual(ranking.verify(), 0)
+
+    def test_scores(self):
+        first, second, third, _ = self.participants
+        self.climb(first, self.mas)
+        # Same points as `first`, more distance
+        self.climb(second, self.other_flash)
+        # Same points and distance as `second`, higher id
+        late = Participant.objects.create_user(
+            'late@irock.mx', None, username='late', is_active=True,
+            cup=Participant.PRINCIPIANTE
+        )
+        self.climb(late, self.other_flash)
+        self.climb(third, self.flash)
+        self.assertMatchesDatabase()
+
+    def test_other_workers_writes(self):
+        # Another worker's board only sees these writes through the events
+        other = RankingBoard()
+        other.seed()
+        for participant, option in zip(self.participants,
+                                       (self.flash, self.mas, self.flash)):
+            self.climb(participant, option)
+        other.tail()
+        self.assertMatchesDatabase(other)
+
+    def test_deletes(self):
+        first, second, third, fourth = self.participants
+        scores = [self.climb(participant, self.flash)
+                  for participant in self.participants]
+        self.climb(second, self.other_flash)
+        scores[1].delete()
+        third.delete()
+        fourth.is_active = False
+        fourth.save()
+        self.assertMatchesDatabase()
+        self.assertIsNone(board.standing(third.id, refresh=False))
+        self.assertIsNone(board.standing(fourth.id, refresh=False))
+
+    def test_cup_changes(self):
+        first, second, third, fourth = self.participants
+        for participant in self.participants:
+            self.climb(participant, self.mas)
+        self.climb(third, self.other_flash)
+        third.cup = Participant.AVANZADO
+        third.save()
+        fourth.cup = Participant.KIDS
+        fourth.save()
+        self.assertMatchesDatabase()
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'irock-throttle-tests',
+        },
+    },
+    IROCK_THROTTLE_RATES={'login': (2, 60), 'login_email': (1, 60)},
+)
+class TokenBucketThrottleTests(TestCase):
+    """
+    Buckets empty after the burst and refill at burst/period tokens per
+    second, on a stubbed clock.
+    """
+    view = SimpleNamespace(throttle_scopes={'login': 'login'}, action='login')
+
+    def setUp(self):
+        self.now = 1000.0
+        # The buckets would outlive the test otherwise
+        caches['throttle'].clear()
+        self.addCleanup(caches['throttle'].clear)
+
+    def request(self, address='10.0.0.1', user=None, email=None):
+        return SimpleNamespace(
+            META={'HTTP_X_FORWARDED_FOR': address, 'REMOTE_ADDR': '127.0.0.1'},
+            user=user or AnonymousUser(), data={'email': email}
+        )
+
+    def throttle(self, throttle_class=ClientThrottle):
+        throttle = throttle_class()
+        throttle.timer = lambda: self.now
+        return throttle
+
+    def allowed(self, request, throttle_class=ClientThrottle):
+        return self.throttle(throttle_class).allow_request(request, self.view)
+
+    def test_exhaustion_and_refill(self):
+        request = self.request()
+        self.assertTrue(self.allowed(request))
+        self.assertTrue(self.allowed(request))
+        throttle = self.throttle()
+        self.assertFalse(throttle.allow_request(request, self.view))
+        # A token every 30 seconds
+        self.assertEqual(throttle.wait(), 30)
+        self.now += 20
+        throttle = self.throttle()
+        self.assertFalse(throttle.allow_request(request, self.view))
+        self.assertAlmostEqual(throttle.wait(), 10)
+        self.now += 10
+        self.assertTrue(self.allowed(request))
+        self.assertFalse(self.allowed(request))
+        # Never more than the burst, however long the client waited
+        self.now += 3600
+        self.assertTrue(self.allowed(request))
+        self.assertTrue(self.allowed(request))
+        self.assertFalse(self.allowed(request))
+
+    def test_bucket_per_client(self):
+        for _ in range(2):
+            self.assertTrue(self.allowed(self.request()))
+        self.assertFalse(self.allowed(self.request()))
+        self.assertTrue(self.allowed(self.request('10.0.0.2')))
+
+    def test_bucket_per_email(self):
+        self.assertTrue(self.allowed(self.request(email='Ana@irock.mx '),
+                                     EmailThrottle))
+        # Same email from another address, normalized
+        self.assertFalse(self.allowed(
+            self.request('10.0.0.2', email='ana@irock.mx'), EmailThrottle
+        ))
+        self.assertTrue(self.allowed(self.request(email='beto@irock.mx'),
+                                     EmailThrottle))
+        # Nothing to key on, left to validation
+        for _ in range(3):
+            self.assertTrue(self.allowed(self.request(), EmailThrottle))
+
+    def test_staff_and_other_actions(self):
+        staff = SimpleNamespace(is_staff=True)
+        for _ in range(5):
+            self.assertTrue(self.allowed(self.request(user=staff)))
+        view = SimpleNamespace(throttle_scopes={'login': 'login'},
+                               action='list')
+        for _ in range(5):
+            self.assertTrue(self.throttle().allow_request(self.request(),
+                                                          view))
+
+    def test_login_endpoint(self):
+        client = APIClient()
+        data = {'email': 'nadie@irock.mx', 'password': 'x'}
+        self.assertEqual(client.post('/login/', data).status_code, 401)
+        response = client.post('/login/', data)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+
+
+@override_settings(IROCK_JOBS_EAGER=False, IROCK_JOB_MAX_ATTEMPTS=3,
+                   IROCK_JOB_RETRY_DELAY=60)
+class JobTests(TestCase):
+    """
+    Coalescing, batches and retries of the background jobs, run by the
+    worker with --once.
+    """
+    def setUp(self):
+        CALLS.clear()
+        # run_jobs installs its own handlers
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+
+    def enqueue(self, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(*args, **kwargs)
+
+    def run_jobs(self):
+        call_command('run_jobs', once=True, stdout=StringIO(),
+                     stderr=StringIO())
+
+    def run_failing_jobs(self):
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.run_jobs()
+
+    def assertRunsAt(self, job, seconds):
+        # `seconds` from when it was last updated, a moment ago
+        job.refresh_from_db()
+        before = timezone.now()
+        self.assertLessEqual(job.run_at,
+                             before + datetime.timedelta(seconds=seconds))
+        self.assertGreater(job.run_at, before + datetime.timedelta(
+            seconds=seconds - 5
+        ))
+
+    def test_coalescing(self):
+        for value in ('primero', 'segundo', 'tercero'):
+            self.enqueue(record_job, value, key='rebuild')
+        job = Job.objects.get()
+        self.assertEqual(job.task, 'api.tests.record_job')
+        self.assertEqual(job.args, ['primero'])
+        self.assertEqual(job.coalesced, 2)
+        self.run_jobs()
+        self.assertEqual(CALLS, ['primero'])
+        self.assertFalse(Job.objects.exists())
+        # A new pending job once that one ran
+        self.enqueue(record_job, 'cuarto', key='rebuild')
+        self.run_jobs()
+        self.assertEqual(CALLS, ['primero', 'cuarto'])
+
+    def test_batch_runs_early(self):
+        for value in range(3):
+            self.enqueue(record_job, value, key='rebuild', delay=3600,
+                         batch=3)
+        self.run_jobs()
+        self.assertEqual(CALLS, [])
+        self.assertRunsAt(Job.objects.get(), 3600)
+        # The third merged enqueue makes it due
+        self.enqueue(record_job, 3, key='rebuild', delay=3600, batch=3)
+        self.run_jobs()
+        self.assertEqual(CALLS, [0])
+        self.assertFalse(Job.objects.exists())
+
+    def test_retry_then_failure(self):
+        self.enqueue(failing_job)
+        job = Job.objects.get()
+        self.assertEqual(job.max_attempts, 3)
+        for attempt, delay in ((1, 60), (2, 120)):
+            self.run_failing_jobs()
+            job.refresh_from_db()
+            self.assertEqual(job.state, Job.PENDING)
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn('RuntimeError: falla', job.last_error)
+            # Backoff doubles every attempt
+            self.assertRunsAt(job, delay)
+            # Not due yet
+            self.run_jobs()
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.run_failing_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertIn('RuntimeError: falla', job.last_error)
+        # Failed jobs aren't run again
+        self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 3)
+
+    def test_retry_superseded(self):
+        self.enqueue(superseded_job, key='superseded')
+        failed = Job.objects.get()
+        # Its retry would clash with the newer pending job: deleted, the
+        # newer one runs
+        self.run_failing_jobs()
+        self.assertFalse(Job.objects.filter(id=failed.id).exists())
+        self.assertEqual(CALLS, ['nuevo'])
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,85 @@
+"""
+Token bucket throttling of the anonymous endpoints that hash passwords
+(login and registration), so a broken client retrying in a loop or a flood
+can't keep the workers hashing.
+Views declare `throttle_scopes = {action: scope}`; the bucket sizes come
+from IROCK_THROTTLE_RATES. Every client address has a bucket per scope, and
+every email one per '<scope>_email'. A request takes a token, tokens come
+back at a steady rate, and a client with an empty bucket gets a 429 with
+Retry-After, before the request body is validated or anything is hashed.
+The buckets live in the 'throttle' cache, shared by every worker process.
+Reads and writes of a bucket aren't atomic: two workers answering the same
+client at once may both take its last token, a limit rather than an exact
+count.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class, subclasses give the scope's suffix and the client key.
+    """
+    suffix = ''
+    timer = time.time
+
+    def get_key(self, request):
+        """
+        Key of the client's bucket, None to not throttle the request.
+        """
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scopes', {}).get(view.action)
+        if scope is None or (request.user and request.user.is_staff):
+            return True
+        scope += self.suffix
+        rate = getattr(settings, 'IROCK_THROTTLE_RATES', {}).get(scope)
+        key = self.get_key(request)
+        if rate is None or key is None:
+            return True
+        burst, period = rate
+        cache = caches['throttle']
+        key = f'throttle:{scope}:{key}'
+        now = self.timer()
+        tokens, updated = cache.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * burst / period)
+        if tokens < 1:
+            self.delay = (1 - tokens) * period / burst
+            return False
+        # Gone once it would be full again
+        cache.set(key, (tokens - 1, now), period)
+        return True
+
+    def wait(self):
+        return self.delay
+
+
+class ClientThrottle(TokenBucketThrottle):
+    """
+    Bucket per client address (X-Forwarded-For set by nginx, see
+    NUM_PROXIES).
+    """
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class EmailThrottle(TokenBucketThrottle):
+    """
+    Bucket per email of the request body, whatever the client address.
+    """
+    suffix = '_email'
+
+    def get_key(self, request):
+        try:
+            email = request.data.get('email')
+        except AttributeError:
+            # Not a JSON object, validation rejects it
+            return None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import LoginViewSet, ParticipantViewSet, BlockViewSet, \
-    BlockScoreViewSet, ScoreOptionViewSet
+    BlockScoreViewSet, ScoreOptionViewSet, MeViewSet, \
+    LeaderboardViewSet, CompetitionViewSet, BatchViewSet, MetricsViewSet
 
 # ALL backend endpoints here
 router = DefaultRouter()
@@ -10,5 +11,10 @@ router.register(r'blocks', BlockViewSet, basename='block')
 router.register(r'blockscores', BlockScoreViewSet, basename='blockscore')
 router.register(r'scoreoptions', ScoreOptionViewSet, basename='scoreoption')
 router.register(r'login', LoginViewSet, basename='login')
+router.register(r'me', MeViewSet, basename='me')
+router.register(r'leaderboard', LeaderboardViewSet, basename='leaderboard')
+router.register(r'competition', CompetitionViewSet, basename='competition')
+router.register(r'batch', BatchViewSet, basename='batch')
+router.register(r'metrics', MetricsViewSet, basename='metrics')
 
 urlpatterns = router.urls
@@ -1,20 +1,72 @@
+import io
+
 from django.shortcuts import render
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
-from .models import Block, BlockScore, Participant, ScoreOption
+from .models import Block, BlockScore, Participant, ParticipantImport, \
+    ScoreOption
 from .serializers import BlockSerializer, BlockScoreSerializer, \
     LoginSerializer, ParticipantSerializer, BlockScoreCreateSerializer, \
-    ScoreOptionSerializer
+    ScoreOptionSerializer, CompetitionSerializer, ParticipantBulkSerializer, \
+    BatchSerializer
+from .models import Competition
+from .phases import phase_cache, scope
+from .ranking import board
 from .permissions import IsOwnerOrStaff, IsStaffOrCreateOnly, \
-    ReadOnlyPermission, IsStaffOrReadOnly
+    ReadOnlyPermission, IsStaffOrReadOnly, CompetitionPhasePermission
 from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.parsers import MultiPartParser
+from rest_framework.pagination import PageNumberPagination
 from knox.models import AuthToken
 from django.contrib.auth import authenticate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .history import leaderboard_at
+from .importing import run_import
+from .jobs import enqueue
+from .search import search_participants
+from .listing import lean_list
+from .batching import run_batch
+from .catalog import catalog
+from .concurrency import AsyncViewSetMixin, hashing_slot, run_hashing
+from .metrics import metrics
+from .throttling import ClientThrottle, EmailThrottle
+from .renderers import PrometheusRenderer
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, Q
+
+class ParticipantPagination(PageNumberPagination):
+    """
+    Opt-in paging: lists are only paged when 'page_size' is sent, so
+    existing clients keep getting the full array.
+    """
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
 
 class ParticipantViewSet(viewsets.ModelViewSet):
     queryset = Participant.objects.all()
     serializer_class = ParticipantSerializer
-    permission_classes = [IsStaffOrCreateOnly]
+    permission_classes = [IsStaffOrCreateOnly, CompetitionPhasePermission]
+    # Registration closes once the competition is frozen
+    phase_actions = {
+        'create': (Competition.REGISTRATION, Competition.OPEN),
+    }
+    # Anonymous registration hashes the password
+    throttle_classes = [ClientThrottle, EmailThrottle]
+    throttle_scopes = {'create': 'register'}
+    pagination_class = ParticipantPagination
+    # Columns staff tables can sort by ('ordering', '-' for descending)
+    ordering_fields = ('id', 'username', 'email', 'first_name', 'last_name',
+                       'cup', 'gender', 'age', 'score', 'distance_climbed',
+                       'is_active', 'registered_at')
+    # Exact-match filters staff tables can send
+    filter_fields = ('cup', 'gender', 'is_active', 'is_staff')
+    SEARCH_LIMIT = 20
 
     def get_queryset(self):
         """
@@ -27,17 +79,101 @@ class ParticipantViewSet(viewsets.ModelViewSet):
         # Regular users can only see their own data
         return Participant.objects.filter(id=user.id)
 
-    def list(self, request, *args, **kwargs):
+    def perform_create(self, serializer):
+        # Hashes the password: waits for a hashing slot (503 if none frees up)
+        with hashing_slot():
+            serializer.save()
+
+    def _table_queryset(self, request):
         """
-        List participants with optional filtering by cup category.
-        Staff can filter, regular users only see themselves.
+        Apply the staff table parameters: exact filters (filter_fields),
+        'q' search, and 'ordering'.
         """
-        cup = request.query_params.get('cup')
         queryset = self.get_queryset()
-        if cup and (request.user.is_staff or request.user.is_superuser):
-            queryset = queryset.filter(cup=cup)
+        params = request.query_params
+        for field in self.filter_fields:
+            value = params.get(field)
+            if not value:
+                continue
+            if field.startswith('is_'):
+                value = value.lower() in ('1', 'true')
+            queryset = queryset.filter(**{field: value})
+        if params.get('q'):
+            queryset = search_participants(queryset, params['q'])
+        ordering = [
+            field for field in params.get('ordering', '').split(',')
+            if field.lstrip('-') in self.ordering_fields
+        ]
+        if ordering:
+            queryset = queryset.order_by(*ordering, 'id')
+        elif not queryset.ordered:
+            # Stable pages
+            queryset = queryset.order_by('id')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        List participants. Staff can filter (cup, gender, is_active,
+        is_staff), search ('q'), sort ('ordering') and page ('page',
+        'page_size'), regular users only see themselves.
+        """
+        if not (request.user.is_staff or request.user.is_superuser):
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            return Response(serializer.data)
+        # Rows are read as tuples, no model instance per participant
+        lean = lean_list(self.get_serializer_class())
+        rows = lean.values(self._table_queryset(request))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(lean.rows(page))
+        return Response(lean.rows(rows))
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Quick lookup by username, name, email or id ('q'), staff only.
+        Returns at most 'limit' participants.
+        """
+        if not (request.user.is_staff or request.user.is_superuser):
+            raise PermissionDenied('Solo el staff puede buscar participantes')
+        q = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', self.SEARCH_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit debe ser un entero'}, status=400)
+        if limit < 1:
+            return Response({'error': 'limit debe ser un entero positivo'},
+                            status=400)
+        limit = min(limit, 100)
+        queryset = search_participants(self.get_queryset(), q)[:limit]
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Participant counts (staff excluded) per cup and gender, staff only.
+        Replaces downloading the whole list to count it in the browser.
+        """
+        if not (request.user.is_staff or request.user.is_superuser):
+            raise PermissionDenied('Solo el staff puede ver las estadísticas')
+        rows = Participant.objects.filter(
+            is_staff=False, is_superuser=False
+        ).values('cup').annotate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            male=Count('id', filter=Q(gender=Participant.MALE)),
+            female=Count('id', filter=Q(gender=Participant.FEMALE)),
+        ).order_by()
+        empty = {'total': 0, 'active': 0, 'male': 0, 'female': 0}
+        cups = {cup: dict(empty) for cup, _ in Participant.CUP_CHOICES}
+        totals = dict(empty)
+        for row in rows:
+            cup = cups.setdefault(row.pop('cup'), dict(empty))
+            for key, value in row.items():
+                cup[key] += value
+                totals[key] += value
+        return Response({'cups': cups, 'totals': totals})
     
     def retrieve(self, request, *args, **kwargs):
         """
@@ -120,26 +256,156 @@ class ParticipantViewSet(viewsets.ModelViewSet):
                 status=403
             )
         return super().destroy(request, *args, **kwargs)
-    
-class BlockViewSet(viewsets.ModelViewSet):
+
+    def _bulk_selection(self, request):
+        """
+        Participants selected by a bulk request (ids or filter), the
+        validated data and the ids of the selected accounts left out.
+        Only staff can do bulk changes, and they never apply to the caller
+        nor, unless the filter targets them explicitly ('is_staff'), to
+        staff and superusers: a bulk deactivation can't lock the admins out.
+        """
+        if not (request.user.is_staff or request.user.is_superuser):
+            raise PermissionDenied('Solo el staff puede hacer cambios masivos')
+        serializer = ParticipantBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        protected = Q(id=request.user.id)
+        if 'ids' in data:
+            queryset = Participant.objects.filter(id__in=data['ids'])
+        else:
+            queryset = Participant.objects.filter(**data['filter'])
+        if 'is_staff' not in data.get('filter', {}):
+            protected |= Q(is_staff=True) | Q(is_superuser=True)
+        skipped = sorted(queryset.filter(protected).values_list('id',
+                                                                flat=True))
+        return queryset.exclude(id__in=skipped), data, skipped
+
+    def _bulk_update(self, queryset, skipped, **changes):
+        """
+        Apply `changes` to the selected participants with a single UPDATE.
+        """
+        matched = queryset.count()
+        # Skip rows already in the target state
+        updated = queryset.exclude(**changes).update(**changes)
+        if updated:
+            # queryset.update() doesn't send signals
+            board.invalidate()
+        return Response({'matched': matched, 'updated': updated,
+                         'skipped': skipped})
+
+    @action(detail=False, methods=['post'], url_path='bulk-activate')
+    def bulk_activate(self, request):
+        """
+        Activate participants by ids or filter (staff only).
+        """
+        queryset, _, skipped = self._bulk_selection(request)
+        return self._bulk_update(queryset, skipped, is_active=True)
+
+    @action(detail=False, methods=['post'], url_path='bulk-deactivate')
+    def bulk_deactivate(self, request):
+        """
+        Deactivate participants by ids or filter (staff only).
+        """
+        queryset, _, skipped = self._bulk_selection(request)
+        return self._bulk_update(queryset, skipped, is_active=False)
+
+    @action(detail=False, methods=['post'], url_path='bulk-change-cup')
+    def bulk_change_cup(self, request):
+        """
+        Move participants to the cup given in 'cup', by ids or filter
+        (staff only).
+        """
+        queryset, data, skipped = self._bulk_selection(request)
+        if 'cup' not in data:
+            return Response(
+                {'error': "Indica la categoría destino en 'cup'"}, status=400
+            )
+        return self._bulk_update(queryset, skipped, cup=data['cup'])
+
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        """
+        Import participants from a CSV upload ('file'), staff only.
+        Set 'activate' to create them already active (fee paid).
+        Hashing thousands of passwords takes longer than a request may, so
+        the import runs as a background job: answers 202 with the import,
+        whose state and report GET /participants/import/<id>/ returns.
+        """
+        if not (request.user.is_staff or request.user.is_superuser):
+            raise PermissionDenied('Solo el staff puede importar participantes')
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': "Falta el archivo 'file'"}, status=400)
+        try:
+            data = upload.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return Response({'error': 'El archivo debe estar en UTF-8'},
+                            status=400)
+        activate = request.data.get('activate', '').lower() in \
+            ('1', 'true', 'si', 'yes')
+        with transaction.atomic():
+            record = ParticipantImport.objects.create(
+                created_by=request.user, filename=upload.name[:255],
+                activate=activate, data=data
+            )
+            enqueue(run_import, record.id)
+        return Response(self._import_status(record), status=202)
+
+    @action(detail=False, methods=['get'],
+            url_path=r'import/(?P<import_id>\d+)')
+    def import_status(self, request, import_id):
+        """
+        State and report of a CSV import, staff only.
+        """
+        if not (request.user.is_staff or request.user.is_superuser):
+            raise PermissionDenied('Solo el staff puede importar participantes')
+        record = ParticipantImport.objects.filter(id=import_id).first()
+        if record is None:
+            return Response({'error': 'Importación no encontrada'},
+                            status=404)
+        return Response(self._import_status(record))
+
+    @staticmethod
+    def _import_status(record):
+        return {
+            'id': record.id,
+            'filename': record.filename,
+            'state': record.state,
+            'created_at': record.created_at,
+            'finished_at': record.finished_at,
+            'report': record.report,
+        }
+
+class BlockViewSet(AsyncViewSetMixin, viewsets.ModelViewSet):
     queryset = Block.objects.all()
     serializer_class = BlockSerializer
     permission_classes = [IsStaffOrReadOnly]
 
-    def list(self, request, *args, **kwargs):
+    def get_queryset(self):
+        """
+        Only blocks of the active competition.
+        """
+        return scope(Block.objects.all())
+
+    def perform_create(self, serializer):
+        # New blocks belong to the active competition
+        serializer.save(competition=phase_cache.competition())
+
+    async def list(self, request, *args, **kwargs):
         """
         List blocks with optional filtering by lane or grade.
         All authenticated users can read (GET only).
+        Served from the in-process block catalog.
         """
-        lane = request.query_params.get('lane')
-        grade = request.query_params.get('grade')
-        queryset = self.get_queryset()
-        if lane:
-            queryset = queryset.filter(lane=lane)
-        if grade:
-            queryset = queryset.filter(grade=grade)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        if catalog.stale():
+            await sync_to_async(catalog.load)()
+        return Response(catalog.blocks(
+            lane=request.query_params.get('lane'),
+            grade=request.query_params.get('grade'),
+            refresh=False,
+        ))
     
     # To do: Implement retrieve, create, update, destroy if needed for future
     # versions. iRock v1.0 only requires listing blocks, and all blocks will
@@ -148,7 +414,12 @@ class BlockViewSet(viewsets.ModelViewSet):
 class BlockScoreViewSet(viewsets.ModelViewSet):
     queryset = BlockScore.objects.all()
     serializer_class = BlockScoreSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, CompetitionPhasePermission]
+    # Participants can only log ascensions while the competition is open
+    phase_actions = {
+        action: (Competition.OPEN,)
+        for action in ('create', 'update', 'partial_update', 'destroy')
+    }
 
     def get_queryset(self):
         """
@@ -156,10 +427,12 @@ class BlockScoreViewSet(viewsets.ModelViewSet):
         Regular users can only see their own scores.
         """
         user = self.request.user
+        # Only scores of the active competition
+        queryset = scope(BlockScore.objects.all())
         if user.is_staff or user.is_superuser:
-            return BlockScore.objects.all()
+            return queryset
         # Regular users can only see their own scores
-        return BlockScore.objects.filter(participant=user)
+        return queryset.filter(participant=user)
 
     def get_serializer_class(self):
         """
@@ -199,8 +472,9 @@ class BlockScoreViewSet(viewsets.ModelViewSet):
         if block_id:
             queryset = queryset.filter(block_id=block_id)
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        # Same output as BlockScoreSerializer, read with a single joined
+        # values_list() instead of instances and related lookups
+        return Response(lean_list(self.get_serializer_class())(queryset))
     
     def update(self, request, *args, **kwargs):
         """
@@ -235,23 +509,27 @@ class BlockScoreViewSet(viewsets.ModelViewSet):
             )
         return super().destroy(request, *args, **kwargs)
 
-class LoginViewSet(viewsets.ViewSet):
+class LoginViewSet(AsyncViewSetMixin, viewsets.ViewSet):
     """
     ViewSet to handle user login and return auth token.
     """
     # Allow any user (authenticated or not) to access this view
     permission_classes = []
+    throttle_classes = [ClientThrottle, EmailThrottle]
+    throttle_scopes = {'create': 'login'}
     serializer_class = LoginSerializer
 
-    def create(self, request):
+    async def create(self, request):
         serializer_class = self.serializer_class(data=request.data)
         serializer_class.is_valid(raise_exception=True)
         email = serializer_class.validated_data['email']
         password = serializer_class.validated_data['password']
-        user = authenticate(request, username=email, password=password)
+        # Password hashing waits for a hashing slot (503 if none frees up)
+        user = await run_hashing(authenticate, request, username=email,
+                                 password=password)
         if user is not None:
             # Generate token
-            token = AuthToken.objects.create(user)[1]
+            token = (await sync_to_async(AuthToken.objects.create)(user))[1]
             return Response(
                 {
                     'token': token,
@@ -279,6 +557,12 @@ class ScoreOptionViewSet(viewsets.ModelViewSet):
     serializer_class = ScoreOptionSerializer
     permission_classes = [IsStaffOrReadOnly]
 
+    def get_queryset(self):
+        """
+        Only score options of blocks in the active competition.
+        """
+        return scope(ScoreOption.objects.all(), 'block__competition')
+
     def list(self, request, *args, **kwargs):
         """
         List score options with optional filtering by block.
@@ -289,5 +573,148 @@ class ScoreOptionViewSet(viewsets.ModelViewSet):
         if block_id:
             queryset = queryset.filter(block_id=block_id)
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        # Same output as ScoreOptionSerializer, read with values_list()
+        # instead of instances
+        return Response(lean_list(self.get_serializer_class())(queryset))
+
+class MeViewSet(AsyncViewSetMixin, viewsets.ViewSet):
+    """
+    ViewSet for data about the authenticated participant.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['get'])
+    async def rank(self, request):
+        """
+        Position of the user in their cup and the participants around them
+        (?neighbours=N, default 5). Served from the in-process ranking.
+        """
+        try:
+            radius = int(request.query_params.get('neighbours', 5))
+        except ValueError:
+            radius = 5
+        radius = min(max(radius, 0), 25)
+        if board.stale():
+            await sync_to_async(board.ensure_fresh)()
+        standing = board.standing(request.user.id, radius=radius,
+                                  refresh=False)
+        if standing is None:
+            return Response(
+                {'error': 'No apareces en el ranking'}, status=404
+            )
+        return Response(standing)
+
+
+class LeaderboardViewSet(AsyncViewSetMixin, viewsets.ViewSet):
+    """
+    ViewSet for the per-cup leaderboards.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def list(self, request):
+        """
+        Leaderboard per cup with optional filtering by cup and top N
+        (?cup=kids&limit=5). With ?at=<ISO timestamp> the standings at that
+        moment are rebuilt from the ascension history, otherwise the current
+        ones come from the in-process ranking.
+        """
+        cup = request.query_params.get('cup')
+        try:
+            limit = int(request.query_params.get('limit', 0)) or None
+        except ValueError:
+            limit = None
+        if limit is not None and limit < 0:
+            # A negative slice would drop the last entries instead
+            return Response({'error': 'limit debe ser un entero positivo'},
+                            status=400)
+
+        at = request.query_params.get('at')
+        if at:
+            try:
+                at = parse_datetime(at)
+            except ValueError:
+                at = None
+            if at is None:
+                return Response(
+                    {'error': 'Fecha inválida, usa formato ISO 8601'},
+                    status=400
+                )
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+            competition = await sync_to_async(phase_cache.competition)()
+            leaderboard = await sync_to_async(leaderboard_at)(
+                competition.id if competition else None, at,
+                cup=cup, limit=limit
+            )
+        else:
+            if board.stale():
+                await sync_to_async(board.ensure_fresh)()
+            leaderboard = board.leaderboard(cup=cup, limit=limit,
+                                            refresh=False)
+
+        return Response({
+            'at': at.isoformat() if at else None,
+            'leaderboard': leaderboard,
+        })
+
+
+class CompetitionViewSet(viewsets.ViewSet):
+    """
+    ViewSet to retrieve the current competition and its phase.
+    """
+    permission_classes = []
+
+    def list(self, request):
+        """
+        Current competition, phase and server time (for the countdown).
+        Served from the in-process phase cache.
+        """
+        competition = phase_cache.competition()
+        if competition is None:
+            return Response(
+                {'error': 'No hay competencia configurada'}, status=404
+            )
+        data = CompetitionSerializer(competition).data
+        data['phase'] = phase_cache.phase()
+        data['now'] = timezone.now()
+        return Response(data)
+
+
+class BatchViewSet(viewsets.ViewSet):
+    """
+    ViewSet to run several API requests in one round trip.
+    """
+    # Each sub-request is checked by its own view
+    permission_classes = []
+
+    def create(self, request):
+        """
+        Run the sub-requests in 'requests' (method, path, body) in order
+        as the caller and return their status and body in the same order.
+        With 'atomic' they share one transaction.
+        """
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        responses = run_batch(request, data['requests'], data['atomic'],
+                              excluded_views=(BatchViewSet, LoginViewSet))
+        return Response({'responses': responses})
+
+
+class MetricsViewSet(viewsets.ViewSet):
+    """
+    ViewSet exposing the server metrics to Prometheus, staff only.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [PrometheusRenderer]
+
+    def list(self, request):
+        """
+        Metrics of every worker (api/metrics.py) in Prometheus text format.
+        Scrape with the token of a staff user in the Authorization header.
+        """
+        if not (request.user.is_staff or request.user.is_superuser):
+            raise PermissionDenied('Solo el staff puede ver las métricas')
+        return Response(metrics.render(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
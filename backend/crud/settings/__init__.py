@@ -0,0 +1,28 @@
+"""
+Settings profiles, selected with the IROCK_SETTINGS environment variable:
+- dev (default): everything, with DEBUG
+- prod: everything, without DEBUG and with WhiteNoise serving the static
+  files. Used for the admin process, migrations and collectstatic (and
+  automatically on Azure, where WEBSITE_HOSTNAME is set)
+- api: the API workers. Only the apps and middleware token authenticated
+  JSON requests need, the admin is served by a separate `prod` process
+Each profile can also be used directly as DJANGO_SETTINGS_MODULE
+(crud.settings.api).
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILE = os.environ.get('IROCK_SETTINGS') or \
+    ('prod' if os.environ.get('WEBSITE_HOSTNAME') else 'dev')
+
+if PROFILE == 'dev':
+    from .dev import *  # noqa: F401,F403
+elif PROFILE == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif PROFILE == 'api':
+    from .api import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f"IROCK_SETTINGS={PROFILE!r}, debe ser 'dev', 'prod' o 'api'"
+    )
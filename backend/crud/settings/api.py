@@ -0,0 +1,48 @@
+"""
+API-only settings for the API workers.
+Requests authenticate with knox tokens in the Authorization header, so
+sessions, messages, CSRF (only enforced by DRF for session authentication)
+and clickjacking protection (JSON isn't framed) are dead weight on every
+request, and the admin, static files and browsable API aren't served here.
+crud/urls.py only routes /admin/ when the admin is installed.
+"""
+from .prod import *  # noqa: F401,F403
+from .prod import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'api',
+    'rest_framework',
+    'knox',
+    'corsheaders',
+]
+
+MIDDLEWARE = [
+    # First, times the whole stack
+    'api.middleware.MetricsMiddleware',
+    # Profiles requests on demand, shares MetricsMiddleware's query timer
+    'api.middleware.ProfilingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    # Before anything that reads or changes the response body
+    'api.middleware.CompressionMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {},
+    },
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': [
+        renderer for renderer in REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']
+        if renderer != 'rest_framework.renderers.BrowsableAPIRenderer'
+    ],
+}
@@ -0,0 +1,282 @@
+"""
+Django settings for crud project, shared by every profile (see
+crud/settings/__init__.py).
+
+Generated by 'django-admin startproject' using Django 5.2.8.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.2/ref/settings/
+"""
+
+import tempfile
+from pathlib import Path
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'django-insecure-9y1n)917dcps&6-v^uimnvd$(+^7ri%nfsh-+_m(c_!ah863&7'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = ['*']  # Permite conexiones desde cualquier host
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'api',
+    'rest_framework',
+    'knox',
+    "corsheaders",
+]
+
+MIDDLEWARE = [
+    # First, times the whole stack
+    'api.middleware.MetricsMiddleware',
+    # Profiles requests on demand, shares MetricsMiddleware's query timer
+    'api.middleware.ProfilingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    # Before anything that reads or changes the response body
+    'api.middleware.CompressionMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    "corsheaders.middleware.CorsMiddleware",
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'crud.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'crud.wsgi.application'
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': ('knox.auth.TokenAuthentication',),
+    # orjson based JSON (same output as DRF's), MessagePack for clients
+    # sending 'Accept: application/msgpack'
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Behind nginx (nginx_irock.conf): the client address is the last one
+    # nginx appends to X-Forwarded-For (throttling keys)
+    'NUM_PROXIES': 1,
+}
+
+# Database
+# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Throttling state (api/throttling.py), shared by every worker process
+    # of the server. Point it at memcached or Redis when running on several
+    # machines.
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(tempfile.gettempdir()) / 'irock-throttle',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.2/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.2/howto/static-files/
+
+# This could also be important for deployment file, but is okay
+STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Media files
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Conf to allow connections from different origins
+CORS_ALLOW_ALL_ORIGINS = True  # Allows all origins
+CORS_ALLOW_CREDENTIALS = True  # cookies and authentication hdrs
+
+# Permitted headers
+CORS_ALLOW_HEADERS = [
+    'accept',
+    'accept-encoding',
+    'authorization',
+    'content-type',
+    'dnt',
+    'origin',
+    'user-agent',
+    'x-csrftoken',
+    'x-irock-profile',
+    'x-requested-with',
+]
+
+# Allowed HTTP methods
+CORS_ALLOW_METHODS = [
+    'DELETE',
+    'GET',
+    'OPTIONS',
+    'PATCH',
+    'POST',
+    'PUT',
+]
+
+AUTH_USER_MODEL = 'api.Participant'  # Custom user model
+
+AUTHENTICATION_BACKENDS = [
+    'api.auth_backend.EmailBackend',  # Custom email backend withemail login
+]
+
+# Seconds between consistency checks of the in-process ranking against the DB
+# (also how long other workers' writes can take to show up in /me/rank/)
+IROCK_RANKING_CHECK_INTERVAL = 30
+# Seconds between polls of the ascension event stream for other workers' writes
+IROCK_RANKING_TAIL_INTERVAL = 2
+# Ascension events between two leaderboard checkpoints (time-travel queries
+# replay at most this many events)
+IROCK_CHECKPOINT_EVERY = 500
+# Seconds a worker trusts its cached competition schedule (edits made through
+# other workers take up to this long to apply)
+IROCK_PHASE_CACHE_TTL = 10
+# Where `manage.py archive_competition` writes finished competitions
+IROCK_ARCHIVE_DIR = BASE_DIR / 'archives'
+# Admin changelists of tables larger than this show the row count estimated
+# from the database statistics instead of running COUNT(*)
+IROCK_ADMIN_ESTIMATED_COUNT_OVER = 10000
+# Responses smaller than this (bytes) are sent uncompressed
+IROCK_COMPRESS_MIN_SIZE = 1024
+# Maximum sub-requests in one POST /batch/
+IROCK_BATCH_MAX_REQUESTS = 20
+# Threads per worker process hashing passwords at once (logins). Extra logins
+# wait for a free slot instead of taking the worker's CPU from other requests
+IROCK_HASHING_THREADS = 2
+# Requests hashing passwords at once in the whole server (logins and
+# registrations, every worker process), keep it below the gunicorn workers so
+# a login flood leaves workers for scoring and the leaderboard. None disables
+# the server-wide limit
+IROCK_HASHING_SLOTS = 2
+# Lock files of the server-wide hashing slots
+IROCK_HASHING_SLOTS_DIR = Path(tempfile.gettempdir()) / 'irock-hashing'
+# Seconds a login or registration waits for a hashing slot before getting a
+# 503 (with Retry-After: IROCK_HASHING_RETRY_AFTER seconds)
+IROCK_HASHING_WAIT = 0.5
+IROCK_HASHING_RETRY_AFTER = 2
+# Seconds a worker trusts its cached block catalog (block edits made through
+# other workers take up to this long to show up in /blocks/)
+IROCK_BLOCK_CATALOG_TTL = 10
+# Shared store of the metrics of every worker process (/metrics/), one file
+# per process
+IROCK_METRICS_DIR = Path(tempfile.gettempdir()) / 'irock-metrics'
+# Seconds between two dumps of a worker's metrics to the shared store
+IROCK_METRICS_FLUSH_INTERVAL = 1
+# Fraction of requests profiled at random (api/profiling.py), besides staff
+# requests sending the X-Irock-Profile header. 0 disables sampling
+IROCK_PROFILE_SAMPLE_RATE = 0
+# Seconds between two stack samples of a profiled request
+IROCK_PROFILE_INTERVAL = 0.002
+# Request profiles kept (the oldest are deleted)
+IROCK_PROFILE_KEEP = 200
+# Queries slower than this (milliseconds) are stored with their plan, None
+# disables the slow query log
+IROCK_SLOW_QUERY_MS = 200
+# Slow queries kept (the oldest are deleted)
+IROCK_SLOW_QUERY_KEEP = 500
+# Token buckets of the anonymous endpoints (api/throttling.py), per client
+# address and per email: scope: (burst, seconds to refill it). A gym's wifi
+# puts every climber behind one address, keep the per address ones generous.
+# Staff is never throttled
+IROCK_THROTTLE_RATES = {
+    'login': (100, 60),
+    'login_email': (10, 60),
+    'register': (60, 60),
+    'register_email': (5, 60),
+}
+# Background jobs (api/jobs.py, run by `manage.py run_jobs`). Eager runs them
+# at commit in the process enqueueing them, without a worker
+IROCK_JOBS_EAGER = False
+# Seconds the worker waits between polls when no job is due
+IROCK_JOB_POLL_INTERVAL = 1
+# Runs of a failing job before it is kept as failed, and seconds before its
+# first retry (doubling every attempt)
+IROCK_JOB_MAX_ATTEMPTS = 5
+IROCK_JOB_RETRY_DELAY = 5
+# Seconds after which a running job is considered abandoned (its worker
+# died) and runs again
+IROCK_JOB_TIMEOUT = 600
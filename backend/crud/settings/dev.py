@@ -0,0 +1,9 @@
+"""
+Development settings.
+"""
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+# Background jobs run at commit, no `manage.py run_jobs` needed
+IROCK_JOBS_EAGER = True
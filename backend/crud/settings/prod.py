@@ -0,0 +1,33 @@
+"""
+Production settings (admin process and management commands).
+"""
+from .base import *  # noqa: F401,F403
+from .base import MIDDLEWARE
+
+DEBUG = False
+
+# Security settings
+# True if HTTPS ---------------------------------------------
+SECURE_SSL_REDIRECT = False
+SESSION_COOKIE_SECURE = False
+CSRF_COOKIE_SECURE = False
+# -----------------------------------------------------------
+SECURE_CONTENT_TYPE_NOSNIFF = True
+X_FRAME_OPTIONS = 'DENY'
+
+# WhiteNoise for the static files, right after SecurityMiddleware
+_security = MIDDLEWARE.index('django.middleware.security.SecurityMiddleware')
+MIDDLEWARE = [
+    *MIDDLEWARE[:_security + 1],
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    *MIDDLEWARE[_security + 1:],
+]
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
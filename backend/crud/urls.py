@@ -1,8 +1,12 @@
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('', include('api.urls')),
     path('api/auth/', include('knox.urls')),
 ]
+
+# Not installed in the API-only profile (crud/settings/api.py)
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -11,9 +11,7 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-settings_module = 'crud.deployment' if os.environ.get('WEBSITE_HOSTNAME') else 'crud.settings'
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
-
-# os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crud.settings')
+# The profile is picked by crud/settings/__init__.py (IROCK_SETTINGS)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crud.settings')
 
 application = get_wsgi_application()
@@ -1,15 +1,36 @@
 # Gunicorn configuration file
+import gc
 import multiprocessing
+import os
+import sys
+import time
 
 # Server socket
 bind = "127.0.0.1:8000"
 backlog = 2048
 
+# Serving mode (IROCK_SERVER_MODE):
+# - 'sync' (default): WSGI, one request at a time per worker
+# - 'asgi': Uvicorn workers running crud.asgi. Async views (blocks,
+#   leaderboard, me, login) run on each worker's event loop and password
+#   hashing in a bounded thread pool, so slow logins don't starve reads
+server_mode = os.environ.get('IROCK_SERVER_MODE', 'sync')
+
 # Worker processes
 workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = 'sync'
+if server_mode == 'asgi':
+    wsgi_app = 'crud.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'crud.wsgi:application'
+    worker_class = 'sync'
 worker_connections = 1000
 timeout = 30
+
+# Warm start (IROCK_PRELOAD, on unless '0'): Django is imported and the
+# caches are filled once in the master, then the workers are forked from it
+# and share those pages (copy-on-write) instead of each one starting cold
+preload_app = os.environ.get('IROCK_PRELOAD', '1') != '0'
 keepalive = 2
 
 # Logging
@@ -30,3 +51,78 @@ tmp_upload_dir = None
 # SSL
 keyfile = None
 certfile = None
+
+
+def process_memory(pid='self'):
+    """
+    (RSS, PSS) of a process in bytes. PSS splits the pages shared with
+    other processes among them, it's the memory a worker really costs.
+    """
+    sizes = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as file:
+            for line in file:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    sizes[key] = int(value.split()[0]) * 1024
+    except OSError:
+        # Not Linux
+        return None, None
+    return sizes.get('Rss'), sizes.get('Pss')
+
+
+def warm_caches():
+    """
+    Fill the in-process caches read on every screen.
+    """
+    from api.catalog import catalog
+    from api.phases import phase_cache
+    from api.ranking import board
+    phase_cache.competition()
+    board.ensure_fresh()
+    if catalog.stale():
+        catalog.load()
+
+
+# Server hooks
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+    from api.metrics import metrics
+    # Metrics of the previous run's workers
+    metrics.remove_dead()
+    start = time.monotonic()
+    warm_caches()
+    # The workers must open their own connections
+    connections.close_all()
+    # Move everything alive now out of the collector's reach: collections
+    # in the workers would otherwise touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+    rss, _ = process_memory()
+    server.log.info('Caches cargadas en %.0f ms, %d objetos congelados, '
+                    'RSS del master %s MB',
+                    (time.monotonic() - start) * 1000, gc.get_freeze_count(),
+                    rss and rss // 2 ** 20)
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+
+def post_worker_init(worker):
+    # Ranking, catalog and competition served warm from the first request
+    # (with preload_app they come from the master and just get refreshed)
+    warm_caches()
+    rss, pss = process_memory()
+    worker.log.info('Worker %s listo en %.0f ms, RSS %s MB, PSS %s MB',
+                    worker.pid, (time.monotonic() - worker.forked_at) * 1000,
+                    rss and rss // 2 ** 20, pss and pss // 2 ** 20)
+
+
+def worker_exit(server, worker):
+    # Last samples of the worker into the shared metrics store
+    metrics = sys.modules.get('api.metrics')
+    if metrics is not None:
+        metrics.metrics.flush()
@@ -6,13 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    # Determine settings module based on environment
-    # This was intended to allow deployment settings when on Azure env but
-    # unfortunately Azure is expensive hehe :P 
-    # But do not hurt to have this check here, also it could be useful
-    # in the future.
-    settings_module = 'crud.deployment' if os.environ.get('WEBSITE_HOSTNAME') else 'crud.settings'
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    # The settings profile (dev, prod or api) is picked from the environment
+    # by crud/settings/__init__.py
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crud.settings')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
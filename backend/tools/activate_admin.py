@@ -32,17 +32,27 @@ django.setup()
 
 from api.models import Participant
 
+def set_admin_status(username, is_active):
+    """
+    Set is_active of a specific admin with a single UPDATE
+    (only that column is written).
+    """
+    admins = Participant.objects.filter(username=username, is_staff=True)
+    email = admins.values_list('email', flat=True).first()
+    if email is None:
+        print(f"Error: No se encontró admin con username '{username}'")
+        return False
+    admins.update(is_active=is_active)
+    return email
+
+
 def activate_admin(username):
     """Activate a specific admin"""
     try:
-        admin = Participant.objects.get(username=username, is_staff=True)
-        admin.is_active = True
-        admin.save()
-        print(f"Admin '{username}' ({admin.email}) activado exitosamente")
-        return True
-    except Participant.DoesNotExist:
-        print(f"Error: No se encontró admin con username '{username}'")
-        return False
+        email = set_admin_status(username, True)
+        if email:
+            print(f"Admin '{username}' ({email}) activado exitosamente")
+        return bool(email)
     except Exception as e:
         print(f"Error al activar admin '{username}': {e}")
         return False
@@ -51,24 +61,31 @@ def activate_admin(username):
 def deactivate_admin(username):
     """Deactivate a specific admin"""
     try:
-        admin = Participant.objects.get(username=username, is_staff=True)
-        admin.is_active = False
-        admin.save()
-        print(f"Admin '{username}' ({admin.email}) desactivado exitosamente")
-        return True
-    except Participant.DoesNotExist:
-        print(f"Error: No se encontró admin con username '{username}'")
-        return False
+        email = set_admin_status(username, False)
+        if email:
+            print(f"Admin '{username}' ({email}) desactivado exitosamente")
+        return bool(email)
     except Exception as e:
         print(f"Error al desactivar admin '{username}': {e}")
         return False
 
 
+def set_all_admins_status(is_active):
+    """
+    Set is_active of all admins with a single UPDATE.
+    Returns (admins before the change, number of admins changed).
+    """
+    admins = Participant.objects.filter(is_staff=True).order_by('username')
+    before = list(admins.values_list('username', 'email', 'is_active'))
+    changed = admins.exclude(is_active=is_active).update(is_active=is_active)
+    return before, changed
+
+
 def activate_all_admins():
     """Activate all admins"""
     try:
-        admins = Participant.objects.filter(is_staff=True)
-        count = admins.count()
+        before, activated = set_all_admins_status(True)
+        count = len(before)
         
         if count == 0:
             print("No se encontraron usuarios admin")
@@ -77,16 +94,9 @@ def activate_all_admins():
         print(f"Activando {count} admin(s)...")
         print("-" * 60)
         
-        activated = 0
-        for admin in admins:
-            old_status = admin.is_active
-            admin.is_active = True
-            admin.save()
-            
+        for username, email, old_status in before:
             status_text = "ya estaba activo" if old_status else "ACTIVADO"
-            print(f"  {admin.username:20s} ({admin.email:30s}) - {status_text}")
-            if not old_status:
-                activated += 1
+            print(f"  {username:20s} ({email:30s}) - {status_text}")
         
         print("-" * 60)
         print(f"Proceso completado: {activated} admin(s) activado(s), \
@@ -100,8 +110,8 @@ def activate_all_admins():
 def deactivate_all_admins():
     """Desactiva todos los admins"""
     try:
-        admins = Participant.objects.filter(is_staff=True)
-        count = admins.count()
+        before, deactivated = set_all_admins_status(False)
+        count = len(before)
         
         if count == 0:
             print("No se encontraron usuarios admin")
@@ -110,17 +120,10 @@ def deactivate_all_admins():
         print(f"ADVERTENCIA: Desactivando {count} admin(s)...")
         print("-" * 50)
         
-        deactivated = 0
-        for admin in admins:
-            old_status = admin.is_active
-            admin.is_active = False
-            admin.save()
-            
+        for username, email, old_status in before:
             status_text = "ya estaba inactivo" if not old_status \
                                                else "DESACTIVADO"
-            print(f"  {admin.username:20s} ({admin.email:30s}) - {status_text}")
-            if old_status:
-                deactivated += 1
+            print(f"  {username:20s} ({email:30s}) - {status_text}")
         
         print("-" * 50)
         print(f"Proceso completado: {deactivated} admin(s) desactivado(s), \
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the response renderers and compression on realistic payloads.
+A throwaway test database (the real one is not touched) is filled with
+blocks, score options, participants and scores, and the /blocks/ and
+/blockscores/ list payloads are built with the API serializers. Each
+renderer is timed on them (best of --repeat runs), then the JSON is
+compressed like CompressionMiddleware does.
+
+Usage:
+    python bench_renderers.py
+    python bench_renderers.py --scores 50000 --repeat 10
+"""
+import os
+import sys
+import time
+import argparse
+
+import brotli
+
+# Setup Django
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+# Configure Django settings before importing models
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crud.settings')
+
+import django
+django.setup()
+
+from django.db import connection
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from api.middleware import BROTLI_QUALITY
+from api.models import Block, BlockScore, Participant, ScoreOption
+from api.renderers import FastJSONRenderer, MessagePackRenderer
+from api.serializers import BlockScoreSerializer, BlockSerializer
+
+OPTIONS = [('flash', 'Flash', 100), ('segundo', 'Segundo intento', 75),
+           ('tercero', 'Tercer intento', 50), ('mas', 'Más intentos', 25)]
+
+
+def populate(blocks, participants, scores):
+    """
+    Fill the test database (bulk_create, no signals).
+    """
+    Block.objects.bulk_create([
+        Block(lane=f'Línea {i}', grade=f'5.{10 + i % 4}a', color='Rojo',
+              wall=f'Muro {i % 5}', distance=12 + i % 8,
+              block_type=Block.RUTA if i % 2 else Block.BOULDER)
+        for i in range(blocks)
+    ])
+    block_ids = list(Block.objects.values_list('id', flat=True))
+    ScoreOption.objects.bulk_create([
+        ScoreOption(block_id=block_id, key=key, label=label, points=points,
+                    order=order)
+        for block_id in block_ids
+        for order, (key, label, points) in enumerate(OPTIONS)
+    ])
+    options = {}
+    for option_id, block_id, points in ScoreOption.objects.values_list(
+            'id', 'block_id', 'points'):
+        options.setdefault(block_id, []).append((option_id, points))
+    Participant.objects.bulk_create([
+        Participant(email=f'escalador{i}@example.com',
+                    username=f'escalador{i}', first_name='Nombre',
+                    last_name='Apellido', is_active=True)
+        for i in range(participants)
+    ])
+    participant_ids = list(Participant.objects.values_list('id', flat=True))
+    rows = []
+    for i in range(min(scores, len(participant_ids) * len(block_ids))):
+        participant_id = participant_ids[i % len(participant_ids)]
+        block_id = block_ids[i // len(participant_ids)]
+        option_id, points = options[block_id][i % len(OPTIONS)]
+        rows.append(BlockScore(participant_id=participant_id,
+                               block_id=block_id, score_option_id=option_id,
+                               earned_points=points))
+    BlockScore.objects.bulk_create(rows, batch_size=2000)
+
+
+def payloads():
+    blocks = Block.objects.prefetch_related('score_options')
+    scores = BlockScore.objects.select_related(
+        'participant', 'block', 'score_option'
+    )
+    return {
+        '/blocks/': BlockSerializer(blocks, many=True).data,
+        '/blockscores/': BlockScoreSerializer(scores, many=True).data,
+    }
+
+
+def best_of(repeat, function, *args):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark de renderers y compresión de respuestas',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--blocks', type=int, default=200)
+    parser.add_argument('--participants', type=int, default=1000)
+    parser.add_argument('--scores', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    renderers = [
+        ('DRF JSONRenderer', JSONRenderer()),
+        ('FastJSONRenderer', FastJSONRenderer()),
+        ('MessagePackRenderer', MessagePackRenderer()),
+    ]
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        populate(args.blocks, args.participants, args.scores)
+        for url, data in payloads().items():
+            print(f'\n{url} ({len(data)} elementos)')
+            print(f"  {'':<24}{'ms':>10}{'bytes':>12}")
+            raw = None
+            for name, renderer in renderers:
+                seconds, content = best_of(args.repeat, renderer.render, data)
+                print(f'  {name:<24}{seconds * 1000:>10.1f}'
+                      f'{len(content):>12,}')
+                if raw is None:
+                    raw = content
+            seconds, content = best_of(args.repeat, compress_string, raw)
+            print(f"  {'+ gzip':<24}{seconds * 1000:>10.1f}"
+                  f'{len(content):>12,}')
+            seconds, content = best_of(
+                args.repeat,
+                lambda: brotli.compress(raw, quality=BROTLI_QUALITY)
+            )
+            print(f"  {'+ brotli':<24}{seconds * 1000:>10.1f}"
+                  f'{len(content):>12,}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
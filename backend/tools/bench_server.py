@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the serving modes (IROCK_SERVER_MODE=sync vs asgi).
+A throwaway SQLite database is created in a temporary directory (the real
+one is not touched) and filled with blocks, participants, scores and login
+tokens. Gunicorn is started with gunicorn_config.py in each mode on that
+database, and --clients concurrent clients hit it with the usual event
+traffic: leaderboard, /blocks/ and /me/rank/ reads plus a share of logins
+(password hashing). Latency percentiles are reported per mode and per kind
+of request.
+
+Requires httpx (pip install httpx), only for this script.
+
+Usage:
+    python bench_server.py
+    python bench_server.py --clients 500 --requests 10 --logins 0.05
+    python bench_server.py --modes asgi --workers 3
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+# Setup Django
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+# Settings of the benchmark database, written to the temporary directory
+SETTINGS_MODULE = 'bench_server_settings'
+SETTINGS = """from crud.settings import *  # noqa
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+DATABASES['default']['NAME'] = {database!r}
+# Throttling state and hashing slots of this server only
+CACHES['throttle']['LOCATION'] = {throttle!r}
+IROCK_HASHING_SLOTS_DIR = {slots!r}
+"""
+PASSWORD = 'escalar-2024'
+
+
+def prepare(directory, blocks, participants, scores, tokens, settings=''):
+    """
+    Create and fill the benchmark database, returns the login tokens.
+    `settings` is appended to the benchmark settings module.
+    """
+    with open(os.path.join(directory, f'{SETTINGS_MODULE}.py'), 'w') as file:
+        file.write(SETTINGS.format(
+            database=os.path.join(directory, 'db.sqlite3'),
+            throttle=os.path.join(directory, 'throttle'),
+            slots=os.path.join(directory, 'hashing'),
+        ) + settings)
+    sys.path.insert(0, directory)
+    os.environ['DJANGO_SETTINGS_MODULE'] = SETTINGS_MODULE
+
+    import django
+    django.setup()
+
+    from django.contrib.auth.hashers import make_password
+    from django.core.management import call_command
+    from knox.models import AuthToken
+
+    from api.models import Participant
+    from bench_renderers import populate
+
+    call_command('migrate', verbosity=0)
+    populate(blocks, participants, scores)
+    # One hash for everyone, hashing it per participant takes minutes
+    Participant.objects.update(password=make_password(PASSWORD))
+    users = Participant.objects.order_by('id')[:tokens]
+    return [AuthToken.objects.create(user)[1] for user in users]
+
+
+def start_server(mode, port, workers, directory, **environ):
+    """
+    Start gunicorn on the benchmark database, returns once it answers.
+    `environ` is added to its environment.
+    """
+    environ = dict(
+        os.environ,
+        **environ,
+        IROCK_SERVER_MODE=mode,
+        DJANGO_SETTINGS_MODULE=SETTINGS_MODULE,
+        PYTHONPATH=os.pathsep.join([directory, BACKEND_DIR]),
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn_config.py',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+         '--pid', os.path.join(directory, 'gunicorn.pid'),
+         '--access-logfile', os.devnull, '--error-logfile', '-',
+         '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=environ
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'gunicorn ({mode}) terminó con código '
+                               f'{server.returncode}')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/competition/',
+                                   timeout=1)
+            return server
+        except urllib.error.HTTPError:
+            # Any HTTP answer means the workers are up
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError(f'gunicorn ({mode}) no respondió en 30 s')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def load(port, clients, requests, logins, tokens, emails):
+    import httpx
+
+    latencies, errors = {}, 0
+    # A connection per request: sync workers don't keep connections alive
+    # and reusing Uvicorn's ones races its keep-alive timeout
+    limits = httpx.Limits(max_connections=clients,
+                          max_keepalive_connections=0)
+
+    async def client(http, number):
+        nonlocal errors
+        headers = {'Authorization': f'Token {tokens[number % len(tokens)]}'}
+        # Every client its own address for the login throttling (the server
+        # trusts X-Forwarded-For, it runs behind nginx in production)
+        address = {'X-Forwarded-For': f'10.0.{number // 256}.{number % 256}'}
+        for _ in range(requests):
+            if random.random() < logins:
+                kind, method, url = 'login', 'POST', '/login/'
+                kwargs = {'json': {'email': random.choice(emails),
+                                   'password': PASSWORD},
+                          'headers': address}
+            else:
+                kind, url = random.choice([
+                    ('leaderboard', '/leaderboard/?limit=20'),
+                    ('blocks', '/blocks/'),
+                    ('rank', '/me/rank/'),
+                ])
+                method, kwargs = 'GET', {'headers': headers}
+            start = time.perf_counter()
+            try:
+                response = await http.request(method, url, **kwargs)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.setdefault(kind, []).append(
+                time.perf_counter() - start
+            )
+            errors += failed
+
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}',
+                                 limits=limits, timeout=120) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http, number)
+                               for number in range(clients)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def report(mode, latencies, errors, elapsed):
+    total = sum(len(values) for values in latencies.values())
+    print(f'\n{mode}: {total} peticiones en {elapsed:.1f} s '
+          f'({total / elapsed:.0f}/s), {errors} errores')
+    print(f"  {'':<14}{'n':>7}{'p50 ms':>10}{'p99 ms':>10}")
+    everything = [value for values in latencies.values() for value in values]
+    for kind, values in sorted(latencies.items()) + [('total', everything)]:
+        print(f'  {kind:<14}{len(values):>7}'
+              f'{percentile(values, 0.5) * 1000:>10.0f}'
+              f'{percentile(values, 0.99) * 1000:>10.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark de los modos de servidor (sync y asgi)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--modes', nargs='+', default=['sync', 'asgi'],
+                        choices=['sync', 'asgi'])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=10,
+                        help='peticiones por cliente')
+    parser.add_argument('--logins', type=float, default=0.02,
+                        help='fracción de peticiones que son logins')
+    parser.add_argument('--blocks', type=int, default=60)
+    parser.add_argument('--participants', type=int, default=500)
+    parser.add_argument('--scores', type=int, default=10000)
+    args = parser.parse_args()
+
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        parser.error('se necesita httpx: pip install httpx')
+
+    directory = tempfile.mkdtemp(prefix='irock-bench-')
+    try:
+        tokens = prepare(directory, args.blocks, args.participants,
+                         args.scores, tokens=min(args.clients, 200))
+        emails = [f'escalador{i}@example.com'
+                  for i in range(args.participants)]
+        for mode in args.modes:
+            server = start_server(mode, args.port, args.workers, directory)
+            try:
+                report(mode, *asyncio.run(load(
+                    args.port, args.clients, args.requests, args.logins,
+                    tokens, emails
+                )))
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
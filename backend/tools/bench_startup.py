@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the gunicorn warm start (IROCK_PRELOAD, see gunicorn_config.py).
+On a throwaway database (like bench_server.py) gunicorn is started with and
+without preload_app, and for each one reports:
+- time from launching gunicorn to the first answered request (what a
+  `Restart=always` restart costs) and the latency of the first requests,
+  which hit the in-process caches cold or warm
+- RSS and PSS of the master and every worker (PSS counts the pages shared
+  with the master only partially, it's what each worker really adds)
+
+Linux only (memory is read from /proc).
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --workers 5 --modes sync asgi
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import urllib.request
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_server import prepare, start_server  # noqa: E402
+from gunicorn_config import process_memory  # noqa: E402
+
+URLS = ['/blocks/', '/leaderboard/?limit=20', '/me/rank/']
+
+
+def workers_of(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as file:
+                # The parent pid comes after the (name) and the state
+                parent = int(file.read().rpartition(')')[2].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if parent == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def get(port, url, token):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}{url}',
+        headers={'Authorization': f'Token {token}'}
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def megabytes(size):
+    return f'{size / 2 ** 20:.1f}' if size is not None else '?'
+
+
+def run(mode, preload, args, directory, token):
+    label = f"{mode}, preload {'sí' if preload else 'no'}"
+    start = time.perf_counter()
+    server = start_server(mode, args.port, args.workers, directory,
+                          IROCK_PRELOAD='1' if preload else '0')
+    try:
+        first = get(args.port, URLS[0], token)
+        ready = time.perf_counter() - start
+        latencies = [first] + [get(args.port, url, token)
+                               for url in URLS[1:]]
+        # Every worker finished booting (and warming its caches)
+        deadline = time.monotonic() + 30
+        while len(workers_of(server.pid)) < args.workers and \
+                time.monotonic() < deadline:
+            time.sleep(0.1)
+        time.sleep(args.settle)
+
+        print(f'\n{label}')
+        print(f'  primera respuesta a los {ready * 1000:.0f} ms de arrancar')
+        for url, seconds in zip(URLS, latencies):
+            print(f'  primer {url:<24}{seconds * 1000:>8.1f} ms')
+        print(f"  {'':<10}{'pid':>8}{'RSS MB':>10}{'PSS MB':>10}")
+        rss, pss = process_memory(server.pid)
+        print(f"  {'master':<10}{server.pid:>8}{megabytes(rss):>10}"
+              f'{megabytes(pss):>10}')
+        total_pss = pss or 0
+        for pid in workers_of(server.pid):
+            rss, pss = process_memory(pid)
+            total_pss += pss or 0
+            print(f"  {'worker':<10}{pid:>8}{megabytes(rss):>10}"
+                  f'{megabytes(pss):>10}')
+        print(f'  PSS total {megabytes(total_pss)} MB')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark del arranque de gunicorn con y sin preload',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--modes', nargs='+', default=['sync'],
+                        choices=['sync', 'asgi'])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--settle', type=float, default=2,
+                        help='segundos de espera antes de medir memoria')
+    parser.add_argument('--blocks', type=int, default=60)
+    parser.add_argument('--participants', type=int, default=500)
+    parser.add_argument('--scores', type=int, default=10000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='irock-bench-')
+    try:
+        token = prepare(directory, args.blocks, args.participants,
+                        args.scores, tokens=1)[0]
+        for mode in args.modes:
+            for preload in (False, True):
+                run(mode, preload, args, directory, token)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark suite of the API hot paths, to catch performance
+regressions.
+A throwaway test database (the real one is not touched) is filled with a
+fixed-size fixture (like bench_renderers.py) and every benchmark is run
+for a number of rounds, spread over PASSES passes over the suite: setup
+outside the clock, then the timed call, then a rollback so every round
+sees the same data. Covered:
+- BlockScore.save() (new and edited ascension) and delete()
+- the many=True path of every model serializer
+- the list of every viewset through the whole stack (URLs, middleware,
+  rendering), as staff and as a participant
+- login (password hashing included)
+- tools/load_blocks.py on a generated CSV
+
+`run` prints min/median/mean of every benchmark and with --save stores
+them as a JSON baseline. `compare` runs the suite (or reads a saved run)
+and compares the minimum times with a baseline (like pytest-benchmark: the
+fastest round is the one least disturbed by the rest of the machine, the
+median moves with the load): it exits with status 1 when a hot path
+(marked * in the listing) is slower than the baseline by more than
+--threshold, other slowdowns are only reported.
+Baselines are only comparable on the same machine.
+
+Usage:
+    python bench_suite.py run --save
+    python bench_suite.py run --filter serializer
+    python bench_suite.py compare
+    python bench_suite.py compare --threshold 0.3 --baseline old.json
+    python bench_suite.py compare --current new.json
+"""
+import io
+import os
+import csv
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from datetime import timedelta
+
+# Setup Django
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+# Configure Django settings before importing models
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crud.settings')
+
+import django
+django.setup()
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import serializers
+from api.catalog import catalog
+from api.models import Block, BlockScore, Competition, Participant, \
+    ScoreOption
+from api.phases import phase_cache
+from api.ranking import board
+from bench_renderers import populate
+
+DEFAULT_BASELINE = os.path.join(SCRIPT_DIR, 'benchmarks', 'baseline.json')
+
+# Fixture size, fixed so results are comparable
+FIXTURE = {'blocks': 60, 'participants': 500, 'scores': 10000}
+PASSWORD = 'escalar-2024'
+
+# Timing per benchmark and pass: at least MIN_ROUNDS rounds and TIME_BUDGET
+# seconds, at most MAX_ROUNDS rounds (after one warmup round)
+MIN_ROUNDS = 5
+MAX_ROUNDS = 200
+TIME_BUDGET = 1.0
+# Passes over the whole suite. The rounds of a benchmark are spread over
+# them, so a slow spell of the machine only hits some of its rounds
+PASSES = 3
+
+BENCHMARKS = []
+
+
+def benchmark(name, hot=False, rounds=None):
+    """
+    Register a benchmark. The function gets the fixture and returns
+    (setup, call): setup() runs outside the clock and returns the
+    arguments of the timed call(). `hot` regressions fail `compare`.
+    """
+    def register(function):
+        BENCHMARKS.append({'name': name, 'hot': hot, 'rounds': rounds,
+                           'function': function})
+        return function
+    return register
+
+
+class Fixture:
+    """
+    The benchmark data: populated database plus a staff user, a
+    participant and an active competition.
+    """
+    def __init__(self):
+        # Files of the benchmarks (removed after the run)
+        self.directory = tempfile.mkdtemp(prefix='irock-bench-')
+        populate(**FIXTURE)
+        now = timezone.now()
+        competition = Competition.objects.create(
+            name='Benchmark', starts_at=now - timedelta(hours=1),
+            ends_at=now + timedelta(hours=1)
+        )
+        # populate() leaves everything outside any competition and the
+        # participant aggregates at 0
+        Block.objects.update(competition=competition)
+        BlockScore.objects.update(competition=competition)
+        totals = Participant.objects.annotate(
+            points=Sum('block_scores__earned_points'),
+            distance=Sum('block_scores__block__distance')
+        ).values_list('id', 'points', 'distance')
+        for participant_id, points, distance in totals:
+            Participant.objects.filter(id=participant_id).update(
+                score=points or 0, distance_climbed=distance or 0
+            )
+        self.staff = Participant.objects.create_user(
+            'staff@example.com', PASSWORD, username='staff', is_staff=True,
+            is_active=True
+        )
+        self.participant = Participant.objects.filter(
+            is_staff=False, block_scores__isnull=False
+        ).order_by('id').first()
+        self.participant.set_password(PASSWORD)
+        self.participant.save(update_fields=['password'])
+        self.free = self._free_pair()
+        for cache in (phase_cache, catalog, board):
+            cache.invalidate()
+
+    def _free_pair(self):
+        done = set(BlockScore.objects.filter(
+            participant=self.participant
+        ).values_list('block_id', flat=True))
+        block = Block.objects.exclude(id__in=done).order_by('id').first()
+        return block, block.score_options.order_by('order').first()
+
+    def client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+
+# ------------------------------- Models -------------------------------------
+
+@benchmark('model: BlockScore.save() nuevo', hot=True)
+def blockscore_create(fixture):
+    block, option = fixture.free
+    return (lambda: [BlockScore(participant=fixture.participant, block=block,
+                                score_option=option)],
+            BlockScore.save)
+
+
+@benchmark('model: BlockScore.save() editado', hot=True)
+def blockscore_update(fixture):
+    def setup():
+        score = BlockScore.objects.filter(
+            participant=fixture.participant
+        ).select_related('block', 'participant').first()
+        score.score_option = score.block.score_options.exclude(
+            id=score.score_option_id
+        ).first()
+        return [score]
+    return setup, BlockScore.save
+
+
+@benchmark('model: BlockScore.delete()', hot=True)
+def blockscore_delete(fixture):
+    def setup():
+        return [BlockScore.objects.filter(
+            participant=fixture.participant
+        ).select_related('block', 'participant').first()]
+    return setup, BlockScore.delete
+
+
+# ----------------------------- Serializers ----------------------------------
+
+def _serialize(serializer_class, queryset):
+    def setup():
+        return [list(queryset)]
+    return setup, lambda rows: serializer_class(rows, many=True).data
+
+
+@benchmark('serializer: ScoreOptionSerializer')
+def scoreoption_serializer(fixture):
+    return _serialize(serializers.ScoreOptionSerializer,
+                      ScoreOption.objects.all())
+
+
+@benchmark('serializer: BlockSerializer')
+def block_serializer(fixture):
+    return _serialize(serializers.BlockSerializer,
+                      Block.objects.prefetch_related('score_options'))
+
+
+@benchmark('serializer: ParticipantSerializer')
+def participant_serializer(fixture):
+    return _serialize(serializers.ParticipantSerializer,
+                      Participant.objects.all())
+
+
+@benchmark('serializer: BlockScoreSerializer', hot=True)
+def blockscore_serializer(fixture):
+    return _serialize(serializers.BlockScoreSerializer,
+                      BlockScore.objects.select_related(
+                          'participant', 'block', 'score_option'
+                      ))
+
+
+@benchmark('serializer: BlockScoreCreateSerializer')
+def blockscore_create_serializer(fixture):
+    return _serialize(serializers.BlockScoreCreateSerializer,
+                      BlockScore.objects.all())
+
+
+@benchmark('serializer: CompetitionSerializer')
+def competition_serializer(fixture):
+    return _serialize(serializers.CompetitionSerializer,
+                      Competition.objects.all())
+
+
+# ------------------------------- Viewsets -----------------------------------
+
+LISTS = [
+    ('/participants/', False),
+    ('/blocks/', True),
+    ('/blockscores/', True),
+    ('/scoreoptions/', False),
+    ('/leaderboard/', True),
+    ('/me/rank/', True),
+    ('/competition/', True),
+]
+
+
+def _list(url, staff):
+    def bench(fixture):
+        client = fixture.client(fixture.staff if staff
+                                else fixture.participant)
+
+        def call():
+            response = client.get(url)
+            assert response.status_code < 400, (url, response.status_code)
+        return list, call
+    return bench
+
+
+for _url, _hot in LISTS:
+    for _staff in (True, False):
+        if _url == '/me/rank/' and _staff:
+            # Staff isn't ranked
+            continue
+        benchmark(f"view: GET {_url} ({'staff' if _staff else 'participante'})",
+                  hot=_hot)(_list(_url, _staff))
+
+
+@benchmark('view: POST /login/', hot=True)
+def login(fixture):
+    client = APIClient()
+
+    def call():
+        response = client.post('/login/', {
+            'email': fixture.participant.email, 'password': PASSWORD,
+        }, format='json')
+        assert response.status_code == 200, response.status_code
+    return list, call
+
+
+# ------------------------------ load_blocks ---------------------------------
+
+@benchmark('tool: load_blocks.py (100 bloques)', rounds=MIN_ROUNDS)
+def load_blocks(fixture):
+    import load_blocks as tool
+
+    bloques = os.path.join(fixture.directory, 'bloques.csv')
+    puntos = os.path.join(fixture.directory, 'puntos.csv')
+    grades = ['V0', 'V1', 'V2', 'V3', '5.9', '5.10a', '5.11a', '5.12a']
+    with open(puntos, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['grado', 'flash', 'segundo_intento',
+                         'tercer_intento', 'mas'])
+        for level, grade in enumerate(grades):
+            points = 100 + 50 * level
+            writer.writerow([grade, points, points * 0.75, points * 0.5,
+                             points * 0.25])
+    with open(bloques, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['lane', 'grade', 'color', 'wall', 'distance'])
+        for number in range(100):
+            prefix = 'B' if number % 2 else 'R'
+            writer.writerow([f'{prefix}_bench_{number}',
+                             grades[number % len(grades)], 'Rojo',
+                             f'Muro {number % 5}', 4 + number % 12])
+    tool.BLOQUES_CSV, tool.PUNTOS_CSV = bloques, puntos
+
+    def call():
+        with redirect_stdout(io.StringIO()):
+            tool.load_blocks()
+    return list, call
+
+
+# ------------------------------- Harness ------------------------------------
+
+def measure(entry, fixture):
+    """
+    Time one pass of a benchmark, returns the time of every round.
+    """
+    setup, call = entry['function'](fixture)
+    times = []
+    rounds = entry['rounds'] or MAX_ROUNDS
+    spent = 0.0
+    # Round 0 is a warmup (imports, caches), not counted
+    for round_number in range(rounds + 1):
+        with transaction.atomic():
+            args = setup()
+            start = time.perf_counter()
+            call(*args)
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        # In-process caches may hold what was rolled back
+        for cache in (catalog, board):
+            cache.invalidate()
+        if round_number:
+            times.append(elapsed)
+            spent += elapsed
+        if entry['rounds'] is None and len(times) >= MIN_ROUNDS and \
+                spent >= TIME_BUDGET:
+            break
+    return times
+
+
+def summarize(entry, times):
+    return {
+        'hot': entry['hot'],
+        'rounds': len(times),
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'stddev': statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(name_filter=None):
+    selected = [entry for entry in BENCHMARKS
+                if not name_filter or name_filter in entry['name']]
+    results = {}
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    fixture = None
+    try:
+        # Same settings in every run whatever the local ones say
+        with override_settings(IROCK_SLOW_QUERY_MS=None,
+                               IROCK_PROFILE_SAMPLE_RATE=0,
+                               IROCK_THROTTLE_RATES={},
+                               ALLOWED_HOSTS=['testserver']):
+            fixture = Fixture()
+            times = {entry['name']: [] for entry in selected}
+            for _ in range(PASSES):
+                for entry in selected:
+                    times[entry['name']] += measure(entry, fixture)
+            for entry in selected:
+                results[entry['name']] = summarize(entry,
+                                                   times[entry['name']])
+                print_result(entry['name'], results[entry['name']])
+    finally:
+        if fixture is not None:
+            shutil.rmtree(fixture.directory, ignore_errors=True)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return {
+        'revision': git_revision(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'processor': platform.processor(),
+                    'cpus': os.cpu_count()},
+        'fixture': FIXTURE,
+        'passes': PASSES,
+        'benchmarks': results,
+    }
+
+
+def print_result(name, result):
+    mark = '*' if result['hot'] else ' '
+    print(f"{mark} {name:<52}{result['min'] * 1000:>10.3f}"
+          f"{result['median'] * 1000:>10.3f}{result['mean'] * 1000:>10.3f}"
+          f"{result['rounds']:>8}")
+
+
+def print_header():
+    print(f"  {'benchmark (ms)':<52}{'min':>10}{'mediana':>10}{'media':>10}"
+          f"{'rondas':>8}")
+
+
+def save(data, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2)
+    print(f'\nresultados guardados en {path}')
+
+
+def compare(baseline, current, threshold):
+    """
+    Print the change of every benchmark, returns the hot regressions.
+    """
+    print(f"  {'benchmark (mínimo, ms)':<52}{'base':>10}{'actual':>10}"
+          f"{'cambio':>9}")
+    regressions = []
+    for name, result in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            print(f"  {name:<52}{'-':>10}{result['min'] * 1000:>10.3f}"
+                  '    nuevo')
+            continue
+        change = result['min'] / base['min'] - 1
+        flag = ''
+        if change > threshold:
+            flag = ' REGRESIÓN' if result['hot'] else ' más lento'
+            if result['hot']:
+                regressions.append(name)
+        mark = '*' if result['hot'] else ' '
+        print(f"{mark} {name:<52}{base['min'] * 1000:>10.3f}"
+              f"{result['min'] * 1000:>10.3f}{change:>+9.1%}{flag}")
+    if baseline.get('machine') != current.get('machine'):
+        print('\nAtención: la base se midió en otra máquina')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmarks de modelos, serializers y vistas',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='corre la suite')
+    run_parser.add_argument('--filter', help='solo benchmarks con este texto')
+    run_parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE,
+                            help=f'guarda los resultados (por defecto en '
+                                 f'{os.path.relpath(DEFAULT_BASELINE)})')
+    compare_parser = commands.add_parser(
+        'compare', help='compara con una base, falla si un hot path empeora'
+    )
+    compare_parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    compare_parser.add_argument('--current',
+                                help='resultados guardados (si no, corre '
+                                     'la suite)')
+    compare_parser.add_argument('--filter', help='solo benchmarks con este '
+                                                 'texto')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help='empeoramiento tolerado (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        print_header()
+        data = run_suite(args.filter)
+        if args.save:
+            save(data, args.save)
+        return
+
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except (OSError, ValueError) as e:
+        parser.error(f'no se pudo leer la base {args.baseline}: {e} (créala '
+                     'con: bench_suite.py run --save)')
+    if args.current:
+        with open(args.current) as file:
+            current = json.load(file)
+    else:
+        print_header()
+        current = run_suite(args.filter)
+        print()
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} hot path(s) más de '
+              f'{args.threshold:.0%} más lentos que la base')
+        sys.exit(1)
+    print('\nSin regresiones en los hot paths')
+
+
+if __name__ == '__main__':
+    main()
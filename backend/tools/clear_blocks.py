@@ -1,32 +1,44 @@
 #!/usr/bin/env python3
 """
-Script for deleting all blocks, routes, and their scores from the database.
+Script for deleting all blocks, routes, and their scores of the active
+competition. Their points and distances are taken off the participants (see
+`manage.py reset_event`, which this script uses), other competitions are
+not touched.
 WARNING: This action is irreversible.
 """
 import os
 import sys
-import django
-from api.models import Block, BlockScore, ScoreOption
 
 # Setup Django
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
 sys.path.insert(0, BACKEND_DIR)
+
+# Configure Django settings before importing models
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crud.settings')
+
+import django
 django.setup()
 
+# Now import Django models
+from api.maintenance import reset_event
+from api.models import Block, BlockScore, ScoreOption
+from api.phases import scope
+
 def clear_all_blocks():
     """
-    Deletes all blocks, routes, BlockScores, and ScoreOptions.
+    Deletes all blocks, routes, BlockScores, and ScoreOptions of the active
+    competition.
     """
     print("\n" + "="*60)
     print("ADVERTENCIA: ELIMINACIÓN DE TODOS LOS BLOQUES Y SCORES")
     print("="*60)
     
     # Contar registros actuales
-    block_count = Block.objects.count()
-    score_count = BlockScore.objects.count()
-    option_count = ScoreOption.objects.count()
+    block_count = scope(Block.objects.all()).count()
+    score_count = scope(BlockScore.objects.all()).count()
+    option_count = scope(ScoreOption.objects.all(),
+                         'block__competition').count()
     
     print(f"\nRegistros actuales:")
     print(f"  - Bloques/Rutas:  {block_count}")
@@ -37,8 +49,9 @@ def clear_all_blocks():
         print("\n No hay registros para eliminar.")
         return
     
-    print("\n  Esta acción eliminará TODOS los bloques, rutas y scores.")
-    print(" Los puntajes de los participantes se ajustarán automáticamente.")
+    print("\n  Esta acción eliminará TODOS los bloques, rutas y scores de la "
+          "competencia activa.")
+    print(" Sus puntos se descontarán de los participantes.")
     confirmation = input("\n¿Estás seguro? Escribe 'SI' para confirmar: ")
     
     if confirmation.strip().upper() != 'SI':
@@ -47,20 +60,9 @@ def clear_all_blocks():
     
     print("\nEliminando registros...")
     
-    # Delete BlockScores first (will adjust participant scores)
-    if score_count > 0:
-        deleted_scores = BlockScore.objects.all().delete()
-        print(f" BlockScores eliminados: {deleted_scores[0]}")
-    
-    # Delete ScoreOptions
-    if option_count > 0:
-        deleted_options = ScoreOption.objects.all().delete()
-        print(f" ScoreOptions eliminados: {deleted_options[0]}")
-    
-    # Delete Blocks (CASCADE will delete remaining scores and options)
-    if block_count > 0:
-        deleted_blocks = Block.objects.all().delete()
-        print(f" Bloques/Rutas eliminados: {deleted_blocks[0]}")
+    # Set-based deletes + single UPDATE of the aggregates, in one transaction
+    for name, rows, seconds in reset_event():
+        print(f" {name:<14} {rows:>8}  ({seconds:.3f}s)")
     
     print("\n" + "="*60)
     print(" Todos los bloques y scores han sido eliminados")
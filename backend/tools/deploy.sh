@@ -76,13 +76,14 @@ echo ""
 echo "-> Configurando Django..."
 echo "---------------------------------------------"
 
-# static files
-python3 manage.py collectstatic --noinput
+# static files (with the prod settings, the admin process serves the
+# manifest they generate)
+IROCK_SETTINGS=prod python3 manage.py collectstatic --noinput
 
 print_message "Archivos estáticos recolectados"
 
-# migrate
-python3 manage.py migrate
+# migrate (prod settings: every app, API-only ones lack the admin's)
+IROCK_SETTINGS=prod python3 manage.py migrate
 
 print_message "Migraciones aplicadas"
 
@@ -122,15 +123,18 @@ sudo chown -R "$CURRENT_USER":www-data /var/log/gunicorn
 sudo mkdir -p /var/run/gunicorn
 sudo chown -R "$CURRENT_USER":www-data /var/run/gunicorn
 
-# Copy irock.service
+# Copy irock.service (API), irock-admin.service (admin) and
+# irock-jobs.service (background jobs)
 sudo cp "$PROJECT_DIR/irock.service" /etc/systemd/system/
+sudo cp "$PROJECT_DIR/irock-admin.service" /etc/systemd/system/
+sudo cp "$PROJECT_DIR/irock-jobs.service" /etc/systemd/system/
 
 # Rload systemd
 sudo systemctl daemon-reload
 
 # enable and start service
-sudo systemctl enable irock.service
-sudo systemctl restart irock.service
+sudo systemctl enable irock.service irock-admin.service irock-jobs.service
+sudo systemctl restart irock.service irock-admin.service irock-jobs.service
 
 print_message "Servicio Gunicorn configurado y en ejecución"
 
@@ -187,6 +191,22 @@ else
     echo "Ejecuta: sudo systemctl status irock.service para más detalles"
 fi
 
+# Gunicorn (admin)
+if systemctl is-active --quiet irock-admin.service; then
+    print_message "Gunicorn (admin) está en ejecución"
+else
+    print_error "Gunicorn (admin) NO está en ejecución"
+    echo "Ejecuta: sudo systemctl status irock-admin.service para más detalles"
+fi
+
+# Background jobs
+if systemctl is-active --quiet irock-jobs.service; then
+    print_message "Worker de jobs está en ejecución"
+else
+    print_error "Worker de jobs NO está en ejecución"
+    echo "Ejecuta: sudo systemctl status irock-jobs.service para más detalles"
+fi
+
 # Nginx
 if systemctl is-active --quiet nginx; then
     print_message "Nginx está en ejecución"
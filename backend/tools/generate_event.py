@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic competition, for benchmarks and performance work.
+Creates a competition (open: it started --hours ago and ends in one hour)
+with:
+- participants spread over the four cups and the genders, all active and
+  with the same password (--password)
+- blocks and routes of a range of grades, each with the four score
+  options of load_blocks.py, points growing with the grade
+- ascensions with a power-law distribution: a few participants climb a
+  lot and most only a few blocks, easy blocks are climbed far more than
+  hard ones, and harder grades take more attempts
+
+Participant score and distance are computed from their ascensions, and the
+ascension history (AscensionEvent) and leaderboard checkpoints are written
+like the API would, so rankings and time-travel leaderboards work on the
+generated data. Everything is built in memory and written in one
+transaction: bulk_create in chunks, and plain executemany() INSERTs for the
+scores and events (hundreds of thousands of rows). The same --seed gives
+the same event.
+
+Writes to the database of the configured settings: run it on a test
+database (or `manage.py reset_event` afterwards only removes the scores).
+
+Usage:
+    python generate_event.py
+    python generate_event.py --participants 10000 --ascensions 300000
+    python generate_event.py --seed 7 --prefix prueba --yes
+"""
+import os
+import sys
+import time
+import zlib
+import bisect
+import random
+import argparse
+from contextlib import contextmanager
+from datetime import timedelta
+
+# Setup Django
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+# Configure Django settings before importing models
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crud.settings')
+
+import django
+django.setup()
+
+import orjson
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.catalog import catalog
+from api.importing import hash_password
+from api.models import AscensionEvent, Block, BlockScore, Competition, \
+    LeaderboardCheckpoint, Participant, ScoreOption
+from api.phases import phase_cache
+from api.ranking import board
+
+# (grade, block type, difficulty 0..1)
+GRADES = [(f'V{level}', Block.BOULDER, level / 8) for level in range(9)] + [
+    (grade, Block.RUTA, position / 9) for position, grade in enumerate(
+        ['5.9', '5.10a', '5.10c', '5.11a', '5.11c', '5.12a', '5.12c',
+         '5.13a', '5.13c', '5.14a']
+    )
+]
+# key, label, order, share of the grade's points (like load_blocks.py)
+OPTIONS = [('flash', 'Flash (Primer intento)', 1, 1.0),
+           ('segundo', 'Segundo intento', 2, 0.75),
+           ('tercero', 'Tercer intento', 3, 0.5),
+           ('mas', 'Más de tres intentos', 4, 0.25)]
+COLORS = ['Rojo', 'Azul', 'Verde', 'Amarillo', 'Negro', 'Blanco', 'Morado']
+# Share of participants per cup and gender
+CUPS = [(Participant.KIDS, 0.2), (Participant.PRINCIPIANTE, 0.35),
+        (Participant.INTERMEDIO, 0.3), (Participant.AVANZADO, 0.15)]
+GENDERS = [(Participant.MALE, 0.5), (Participant.FEMALE, 0.44),
+           (Participant.OTHER, 0.02), (Participant.PREFER_NOT_TO_SAY, 0.04)]
+# Extra skill per cup (easier flashes)
+SKILL = {Participant.KIDS: 0.0, Participant.PRINCIPIANTE: 0.1,
+         Participant.INTERMEDIO: 0.3, Participant.AVANZADO: 0.5}
+# Rows per INSERT
+CHUNK = 2000
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """
+    Let bulk_create keep the given auto_now_add timestamps (generated
+    history) instead of overwriting them with now.
+    """
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def insert_rows(model, fields, rows):
+    """
+    INSERT `rows` (tuples of database values of `fields`) into the table of
+    `model` with one executemany(). bulk_create prepares every field of
+    every instance, most of the run with hundreds of thousands of rows.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column)
+                        for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+            f'VALUES ({placeholders})', rows
+        )
+
+
+def weighted_sample(rng, items, weights, count):
+    """
+    `count` distinct items, picked with probability proportional to their
+    weight (Efraimidis-Spirakis).
+    """
+    keys = [rng.random() ** (1 / weight) for weight in weights]
+    ranked = sorted(range(len(items)), key=keys.__getitem__, reverse=True)
+    return [items[index] for index in ranked[:count]]
+
+
+def activity(rng, participants, ascensions, blocks):
+    """
+    Ascensions per participant: Pareto distributed, adding up to
+    `ascensions` (at most one per block).
+    """
+    raw = [rng.paretovariate(1.3) for _ in range(participants)]
+    scale = ascensions / sum(raw)
+    counts = [min(blocks, int(value * scale)) for value in raw]
+    # The capped and rounded off ascensions go to whoever has room left
+    missing = min(ascensions, participants * blocks) - sum(counts)
+    while missing > 0:
+        index = rng.randrange(participants)
+        if counts[index] < blocks:
+            counts[index] += 1
+            missing -= 1
+    return counts
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    timings = []
+
+    def step(name, start):
+        timings.append((name, time.perf_counter() - start))
+
+    now = timezone.now()
+    starts_at = now - timedelta(hours=args.hours)
+    competition = Competition.objects.create(
+        name=args.name or f'Competencia sintética {args.seed}',
+        starts_at=starts_at, ends_at=now + timedelta(hours=1)
+    )
+
+    start = time.perf_counter()
+    blocks = []
+    for number in range(args.blocks):
+        grade, block_type, difficulty = rng.choice(GRADES)
+        prefix = 'B' if block_type == Block.BOULDER else 'R'
+        blocks.append(Block(
+            lane=f'{prefix}_{number + 1}', grade=grade,
+            color=rng.choice(COLORS), wall=f'Muro {number % 6 + 1}',
+            distance=rng.randint(3, 5) if block_type == Block.BOULDER
+            else rng.randint(10, 18),
+            block_type=block_type, competition=competition
+        ))
+    Block.objects.bulk_create(blocks, batch_size=CHUNK)
+    difficulties = {grade: difficulty for grade, _, difficulty in GRADES}
+    options = {}
+    rows = []
+    for block in blocks:
+        points = round(100 + 900 * difficulties[block.grade])
+        options[block.id] = [
+            ScoreOption(block=block, key=key, label=label, order=order,
+                        points=round(points * share))
+            for key, label, order, share in OPTIONS
+        ]
+        rows.extend(options[block.id])
+    ScoreOption.objects.bulk_create(rows, batch_size=CHUNK)
+    step('bloques y opciones', start)
+
+    start = time.perf_counter()
+    # One hash shared by everyone
+    password = hash_password(args.password)
+    cups, cup_weights = zip(*CUPS)
+    genders, gender_weights = zip(*GENDERS)
+    participants = []
+    for number in range(args.participants):
+        cup = rng.choices(cups, cup_weights)[0]
+        participants.append(Participant(
+            email=f'{args.prefix}{number}@example.com',
+            username=f'{args.prefix}{number}', first_name='Escalador',
+            last_name=f'Sintético {number}', password=password,
+            cup=cup, gender=rng.choices(genders, gender_weights)[0],
+            age=rng.randint(8, 15) if cup == Participant.KIDS
+            else rng.randint(16, 55),
+            is_active=True,
+            registered_at=starts_at - timedelta(
+                seconds=rng.uniform(0, 7 * 24 * 3600)
+            )
+        ))
+    step('participantes (en memoria)', start)
+
+    start = time.perf_counter()
+    popularity = [(1 - difficulties[block.grade]) ** 2 + 0.05
+                  for block in blocks]
+    counts = activity(rng, len(participants), args.ascensions, len(blocks))
+    span = (now - starts_at).total_seconds()
+    ascensions = []
+    for participant, count in zip(participants, counts):
+        skill = SKILL[participant.cup]
+        for block in weighted_sample(rng, blocks, popularity, count):
+            # Harder blocks (for this cup) take more attempts
+            hardness = max(0.0, difficulties[block.grade] - skill)
+            attempts = min(3, int(rng.expovariate(1 / (1 + 2.5 * hardness))))
+            ascensions.append((now - timedelta(seconds=rng.uniform(0, span)),
+                               participant, block,
+                               options[block.id][attempts]))
+    # Ids in time order, like the API writes them
+    ascensions.sort(key=lambda ascension: ascension[0])
+    for _, participant, block, option in ascensions:
+        participant.score += option.points
+        participant.distance_climbed += block.distance
+    step('ascensos (en memoria)', start)
+
+    start = time.perf_counter()
+    with explicit_timestamps(Participant._meta.get_field('registered_at')):
+        Participant.objects.bulk_create(participants, batch_size=CHUNK)
+    step('participantes', start)
+
+    start = time.perf_counter()
+    adapt = connection.ops.adapt_datetimefield_value
+    timestamps = [adapt(ascension[0]) for ascension in ascensions]
+    insert_rows(
+        BlockScore, ['participant', 'block', 'score_option', 'earned_points',
+                     'competition', 'created_at'],
+        [(participant.id, block.id, option.id, option.points, competition.id,
+          created_at)
+         for created_at, (_, participant, block, option)
+         in zip(timestamps, ascensions)]
+    )
+    step('scores', start)
+
+    start = time.perf_counter()
+    insert_rows(
+        AscensionEvent, ['participant', 'block', 'competition', 'kind',
+                         'points', 'distance', 'created_at'],
+        [(participant.id, block.id, competition.id, AscensionEvent.CREATED,
+          option.points, block.distance, created_at)
+         for created_at, (_, participant, block, option)
+         in zip(timestamps, ascensions)]
+    )
+    # Inserted in order, so their ids come back in the same order
+    event_ids = AscensionEvent.objects.filter(
+        competition=competition
+    ).order_by('id').values_list('id', flat=True)
+    step('historial', start)
+
+    start = time.perf_counter()
+    every = getattr(settings, 'IROCK_CHECKPOINT_EVERY', 500)
+    # The [participant_id, score, distance] rows of
+    # LeaderboardCheckpoint.encode(), kept sorted and updated in place
+    # instead of rebuilt from a dict for every checkpoint
+    checkpoints, rows, totals = [], [], {}
+    for count, (event_id, (created_at, participant, block, option)) in \
+            enumerate(zip(event_ids, ascensions), 1):
+        row = totals.get(participant.id)
+        if row is None:
+            row = totals[participant.id] = [participant.id, 0, 0]
+            bisect.insort(rows, row)
+        row[1] += option.points
+        row[2] += block.distance
+        # Like api.history.maybe_checkpoint: every `every` events of the
+        # competition (a new one, without checkpoints)
+        if every and count % every == 0:
+            checkpoints.append(LeaderboardCheckpoint(
+                competition=competition, last_event_id=event_id,
+                created_at=created_at,
+                # Same bytes as encode(), at the fastest compression:
+                # hundreds of checkpoints of every participant, the default
+                # level takes most of the run
+                data=zlib.compress(orjson.dumps(rows), 1)
+            ))
+    LeaderboardCheckpoint.objects.bulk_create(checkpoints, batch_size=100)
+    step('checkpoints', start)
+
+    return competition, len(ascensions), len(checkpoints), timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Genera una competencia sintética para benchmarks',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--participants', type=int, default=10000)
+    parser.add_argument('--blocks', type=int, default=120)
+    parser.add_argument('--ascensions', type=int, default=300000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--hours', type=float, default=4,
+                        help='horas desde el inicio de la competencia')
+    parser.add_argument('--name', help='nombre de la competencia')
+    parser.add_argument('--prefix', default='sintetico',
+                        help='prefijo de emails y usernames')
+    parser.add_argument('--password', default='escalar-2024')
+    parser.add_argument('--yes', action='store_true',
+                        help='no pedir confirmación')
+    args = parser.parse_args()
+    if len(f'{args.prefix}{args.participants}') > 25:
+        parser.error('el prefijo es muy largo para el username (25)')
+
+    if Participant.objects.filter(
+            email__startswith=args.prefix, email__endswith='@example.com'
+    ).exists():
+        parser.error(f"ya hay participantes '{args.prefix}...', usa otro "
+                     '--prefix')
+    database = connection.settings_dict['NAME']
+    if not args.yes:
+        confirm = input(f'Se agregará una competencia sintética a {database}'
+                        ". Escribe 'SI' para confirmar: ")
+        if confirm.strip().upper() != 'SI':
+            print('Operación cancelada')
+            return
+
+    start = time.perf_counter()
+    with transaction.atomic():
+        competition, ascensions, checkpoints, timings = generate(args)
+    if connection.vendor == 'sqlite':
+        # Fresh statistics for the planner (and the admin's row estimates)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    for name, seconds in timings:
+        print(f'  {name:<28}{seconds:>8.2f}s')
+    print(f'{competition}: {args.participants} participantes, {args.blocks} '
+          f'bloques, {ascensions} ascensos, {checkpoints} checkpoints en '
+          f'{time.perf_counter() - start:.1f}s')
+    # Only this process' caches, workers refresh on their own
+    phase_cache.invalidate()
+    catalog.invalidate()
+    board.invalidate()
+
+
+if __name__ == '__main__':
+    main()
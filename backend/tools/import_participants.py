@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Script for importing participants from the payment provider CSV.
+
+Expected columns (only email and username are required):
+    email,username,first_name,last_name,password,cup,gender,phone,date_of_birth
+
+Usage:
+    python import_participants.py pagos.csv               # Import inactive
+    python import_participants.py pagos.csv --activate    # Import active
+    python import_participants.py pagos.csv --workers 4   # Hashing processes
+
+Examples:
+    python import_participants.py pagos.csv --activate
+    python import_participants.py pagos.csv --errors errores.csv
+"""
+import os
+import sys
+import csv
+import argparse
+
+# Setup Django
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+# Configure Django settings before importing models
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crud.settings')
+
+import django
+django.setup()
+
+# Now import Django models
+from api.importing import BATCH_SIZE, ParticipantImporter
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Importar participantes desde un CSV de pagos',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos:
+  %(prog)s pagos.csv                         # Importa como inactivos
+  %(prog)s pagos.csv --activate              # Importa como activos
+  %(prog)s pagos.csv --errors errores.csv    # Guarda las filas con error
+        """
+    )
+    parser.add_argument('csv_file', help='Archivo CSV a importar')
+    parser.add_argument(
+        '--activate',
+        action='store_true',
+        help='Crear los participantes activos (cuota pagada)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Procesos para hashear contraseñas (default: núm. de CPUs)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=BATCH_SIZE,
+        help=f'Filas por lote (default: {BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--errors',
+        type=str,
+        default=None,
+        help='CSV donde guardar las filas rechazadas'
+    )
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  iRock App - Importación de participantes")
+    print("=" * 60)
+
+    with open(args.csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+        report = ParticipantImporter(
+            activate=args.activate,
+            workers=args.workers,
+            batch_size=args.batch_size,
+        ).run(f)
+
+    for error in report['errors'][:20]:
+        print(f"  Línea {error['line']:>5}: {error['email']:<35} "
+              f"{error['error']}")
+    if len(report['errors']) > 20:
+        print(f"  ... y {len(report['errors']) - 20} errores más")
+
+    if args.errors and report['errors']:
+        with open(args.errors, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['line', 'email', 'error'])
+            writer.writeheader()
+            writer.writerows(report['errors'])
+        print(f"\nErrores guardados en {args.errors}")
+
+    print("-" * 60)
+    print(f"Filas leídas:     {report['rows']}")
+    print(f"Creados:          {report['created']}")
+    print(f"Rechazados:       {len(report['errors'])}")
+    print(f"Tiempo:           {report['seconds']:.2f}s")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"\n Error: Archivo no encontrado - {e}\n")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n Operación cancelada por el usuario.\n")
+        sys.exit(1)
@@ -20,6 +20,7 @@ django.setup()
 
 # Now import Django models
 from api.models import Block, ScoreOption
+from api.phases import phase_cache, scope
 
 # CSV file paths
 BLOQUES_CSV = os.path.join(SCRIPT_DIR, 'bloques.csv')
@@ -123,6 +124,10 @@ def load_blocks():
     """
     # Load score mapping
     puntos_map = load_puntos_mapping()
+
+    # Blocks are loaded into the active competition
+    competition = phase_cache.competition()
+    print(f"Competencia: {competition or 'sin competencia configurada'}")
     
     print(f"\nCargando bloques desde {BLOQUES_CSV}...")
     
@@ -160,7 +165,7 @@ def load_blocks():
                 distance = 0
             
             # Check if the block already exists
-            existing_block = Block.objects.filter(lane=lane).first()
+            existing_block = scope(Block.objects.filter(lane=lane)).first()
             
             if existing_block:
                 # Update existing block
@@ -186,7 +191,8 @@ def load_blocks():
                     wall=wall,
                     distance=distance,
                     block_type=block_type,
-                    active=True
+                    active=True,
+                    competition=competition
                 )
                 
                 # Create score options
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Load test of a competition day, from a scenario file.
+Like bench_server.py, a throwaway SQLite database is created and filled
+(the real one is not touched) and gunicorn is started on it with
+gunicorn_config.py. The scenario's phases are then replayed one after the
+other, each one a mix of traffic running at once:
+
+    register     POST /participants/ with a new participant
+    login        POST /login/ of an existing participant (password hashing)
+    ascension    POST /blockscores/ of a participant on a block not yet done
+    leaderboard  GET /leaderboard/?limit=20
+    activate     POST /participants/bulk-activate/ by staff, of up to 20
+                 participants registered meanwhile
+
+Traffic with `rate` arrives at that many requests per second (Poisson
+arrivals, not slowed down by slow answers, like real phones); traffic with
+`viewers` and `interval` is that many screens polling, each one waiting
+`interval` seconds between answers. Latency counts from the moment the
+request was due, so time spent waiting for a free connection is included.
+Registrations and logins come from random client addresses
+(X-Forwarded-For), like phones on mobile data, so the per address
+throttling doesn't see the whole test as one client.
+
+For every phase and kind of request it reports throughput, p50/p95/p99
+latency, the share of errors (status >= 400 or no answer) and the SQLite
+"database is locked" errors, read from the server's log. With --json the
+results are saved too, to compare releases. The standard scenario is
+scenarios/competition_day.json, keep it unchanged so results stay
+comparable (copy it to try other mixes).
+
+The clients run on the same machine as the server and take CPU from it.
+
+Requires httpx (pip install httpx), only for this script.
+
+Usage:
+    python load_test.py
+    python load_test.py --scale 2 --workers 5 --json results.json
+    python load_test.py --scenario my_scenario.json --mode asgi
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import Counter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_server import PASSWORD, percentile, prepare, \
+    start_server  # noqa: E402
+
+DEFAULT_SCENARIO = os.path.join(SCRIPT_DIR, 'scenarios',
+                                'competition_day.json')
+
+# Server errors (django.request) are logged here, to count lock errors
+SERVER_LOG = 'server-errors.log'
+LOGGING_SETTINGS = """
+LOGGING = {{
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {{'record': {{'format': '@@ %(message)s'}}}},
+    'handlers': {{'file': {{'class': 'logging.FileHandler',
+                          'filename': {filename!r},
+                          'formatter': 'record'}}}},
+    'loggers': {{'django.request': {{'handlers': ['file'],
+                                    'level': 'ERROR'}}}},
+}}
+"""
+LOCKED = 'database is locked'
+
+# kind: path of its requests (lock errors are attributed by path)
+PATHS = {
+    'register': '/participants/',
+    'login': '/login/',
+    'ascension': '/blockscores/',
+    'leaderboard': '/leaderboard/',
+    'activate': '/participants/bulk-activate/',
+}
+
+
+class State:
+    """
+    Data the requests are built from, shared by every kind of traffic.
+    """
+    def __init__(self, tokens, participant_ids, emails, staff_token, free):
+        self.tokens = tokens
+        self.participant_ids = participant_ids
+        self.emails = emails
+        self.staff_token = staff_token
+        # (token, block id, score option id) not scored yet, shuffled
+        self.free = free
+        self.registered = []
+        self.registrations = 0
+        self.skipped = Counter()
+
+    def auth(self, token):
+        return {'Authorization': f'Token {token}'}
+
+    def phone(self):
+        # A new phone's address for the login and registration throttling
+        # (the server trusts X-Forwarded-For, behind nginx in production)
+        return {'X-Forwarded-For': f'10.{random.randrange(256)}.'
+                                   f'{random.randrange(256)}.'
+                                   f'{random.randrange(1, 255)}'}
+
+    def register(self):
+        self.registrations += 1
+        number = f'{os.getpid()}-{self.registrations}'
+        return 'POST', PATHS['register'], {'headers': self.phone(), 'json': {
+            'email': f'nuevo{number}@example.com',
+            'username': f'nuevo{number}',
+            'first_name': 'Nuevo', 'last_name': 'Escalador',
+            'password': PASSWORD, 'cup': 'avanzado',
+        }}
+
+    def registered_one(self, response):
+        if response.status_code == 201:
+            self.registered.append(response.json()['id'])
+
+    def login(self):
+        return 'POST', PATHS['login'], {'headers': self.phone(), 'json': {
+            'email': random.choice(self.emails), 'password': PASSWORD,
+        }}
+
+    def ascension(self):
+        if not self.free:
+            return None
+        token, block_id, option_id = self.free.pop()
+        return 'POST', PATHS['ascension'], {
+            'headers': self.auth(token),
+            'json': {'block': block_id, 'score_option': option_id},
+        }
+
+    def leaderboard(self):
+        return 'GET', f"{PATHS['leaderboard']}?limit=20", {
+            'headers': self.auth(random.choice(self.tokens)),
+        }
+
+    def activate(self):
+        ids, self.registered = self.registered[:20], self.registered[20:]
+        if not ids:
+            # Nobody waiting, re-activate active ones (same queries)
+            ids = random.sample(self.participant_ids, 5)
+        return 'POST', PATHS['activate'], {
+            'headers': self.auth(self.staff_token), 'json': {'ids': ids},
+        }
+
+
+def build_state(token_count):
+    """
+    After prepare(): staff account and the ascensions still possible.
+    """
+    from knox.models import AuthToken
+
+    from api.models import BlockScore, Participant, ScoreOption
+
+    participants = Participant.objects.order_by('id')
+    participant_ids = list(participants.values_list('id', flat=True))
+    emails = list(participants.values_list('email', flat=True))
+    tokens = [AuthToken.objects.create(user)[1]
+              for user in participants[:token_count]]
+    staff = Participant.objects.create_user(
+        'staff@example.com', PASSWORD, username='staff', is_staff=True,
+        is_active=True
+    )
+
+    options = {}
+    for option_id, block_id in ScoreOption.objects.values_list('id',
+                                                                'block_id'):
+        options.setdefault(block_id, []).append(option_id)
+    done = set(BlockScore.objects.values_list('participant_id', 'block_id'))
+    free = [(token, block_id, random.choice(block_options))
+            for participant_id, token in zip(participant_ids, tokens)
+            for block_id, block_options in options.items()
+            if (participant_id, block_id) not in done]
+    random.shuffle(free)
+    return State(tokens, participant_ids, emails,
+                 AuthToken.objects.create(staff)[1], free)
+
+
+async def send(http, state, kind, due, results):
+    import httpx
+
+    request = getattr(state, kind)()
+    if request is None:
+        state.skipped[kind] += 1
+        return
+    method, url, kwargs = request
+    try:
+        response = await http.request(method, url, **kwargs)
+        status = response.status_code
+        if kind == 'register':
+            state.registered_one(response)
+    except httpx.HTTPError:
+        status = None
+    results.setdefault(kind, []).append((time.perf_counter() - due, status))
+
+
+async def arrivals(http, state, kind, rate, until, results, pending):
+    # Poisson arrivals: exponential gaps between requests
+    due = time.perf_counter()
+    while True:
+        due += random.expovariate(rate)
+        if due >= until:
+            return
+        await asyncio.sleep(max(due - time.perf_counter(), 0))
+        task = asyncio.create_task(send(http, state, kind, due, results))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+
+async def viewer(http, state, kind, interval, until, results):
+    # Screens don't start polling in step
+    await asyncio.sleep(random.uniform(0, interval))
+    while time.perf_counter() < until:
+        due = time.perf_counter()
+        await send(http, state, kind, due, results)
+        await asyncio.sleep(max(due + interval - time.perf_counter(), 0))
+
+
+async def run_phase(port, phase, state, scale, connections):
+    import httpx
+
+    # A connection per request, like bench_server.py
+    limits = httpx.Limits(max_connections=connections,
+                          max_keepalive_connections=0)
+    results, pending, tasks = {}, set(), []
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}',
+                                 limits=limits, timeout=120) as http:
+        until = time.perf_counter() + phase['duration']
+        for traffic in phase['traffic']:
+            kind = traffic['kind']
+            if 'rate' in traffic:
+                tasks.append(arrivals(http, state, kind,
+                                      traffic['rate'] * scale, until,
+                                      results, pending))
+            else:
+                tasks.extend(viewer(http, state, kind, traffic['interval'],
+                                    until, results)
+                             for _ in range(round(traffic['viewers'] *
+                                                  scale)))
+        await asyncio.gather(*tasks)
+        # Requests still in flight when the phase ended
+        if pending:
+            await asyncio.gather(*pending)
+    return results
+
+
+def lock_errors(path, offset):
+    """
+    "database is locked" errors logged since `offset`, per kind, and the
+    new offset.
+    """
+    with open(path) as file:
+        file.seek(offset)
+        text = file.read()
+        offset = file.tell()
+    locked = Counter()
+    for record in text.split('@@ ')[1:]:
+        if LOCKED not in record:
+            continue
+        # "Internal Server Error: /blockscores/"
+        request_path = record.split('\n', 1)[0].rpartition(': ')[2]
+        for kind, kind_path in sorted(PATHS.items(),
+                                      key=lambda item: -len(item[1])):
+            if request_path.startswith(kind_path):
+                locked[kind] += 1
+                break
+        else:
+            locked['?'] += 1
+    return locked, offset
+
+
+def summarize(results, locked, duration):
+    rows = {}
+    everything = []
+    for kind, samples in sorted(results.items()):
+        everything.extend(samples)
+        rows[kind] = _row(samples, locked[kind], duration)
+    rows['total'] = _row(everything, sum(locked.values()), duration)
+    return rows
+
+
+def _row(samples, locked, duration):
+    latencies = [latency for latency, _ in samples] or [0]
+    errors = sum(status is None or status >= 400 for _, status in samples)
+    return {
+        'requests': len(samples),
+        'throughput': len(samples) / duration,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'errors': errors,
+        'error_rate': errors / len(samples) if samples else 0,
+        'locked': locked,
+        'statuses': dict(Counter(str(status) for _, status in samples)),
+    }
+
+
+def report(name, rows, skipped):
+    print(f'\n{name}')
+    print(f"  {'':<13}{'n':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'errores':>9}{'bloqueos':>10}")
+    for kind, row in rows.items():
+        print(f"  {kind:<13}{row['requests']:>7}{row['throughput']:>8.1f}"
+              f"{row['p50_ms']:>9.0f}{row['p95_ms']:>9.0f}"
+              f"{row['p99_ms']:>9.0f}{row['error_rate']:>9.1%}"
+              f"{row['locked']:>10}")
+    for kind, count in skipped.items():
+        print(f'  {count} {kind} no enviados (sin datos para armarlos)')
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_scenario(parser, path):
+    try:
+        with open(path) as file:
+            scenario = json.load(file)
+    except (OSError, ValueError) as e:
+        parser.error(f'no se pudo leer el escenario {path}: {e}')
+    for phase in scenario['phases']:
+        for traffic in phase['traffic']:
+            if traffic.get('kind') not in PATHS:
+                parser.error(f"tipo de tráfico desconocido en '{phase['name']}'"
+                             f": {traffic.get('kind')}")
+            if 'rate' not in traffic and not {'viewers', 'interval'} <= \
+                    traffic.keys():
+                parser.error(f"'{traffic['kind']}' en '{phase['name']}' "
+                             f"necesita rate o viewers e interval")
+    return scenario
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Prueba de carga de un día de competencia',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--scenario', default=DEFAULT_SCENARIO)
+    parser.add_argument('--scale', type=float, default=1,
+                        help='multiplica las tasas y pantallas del escenario')
+    parser.add_argument('--mode', default='sync', choices=['sync', 'asgi'])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--connections', type=int, default=500,
+                        help='conexiones simultáneas máximas del cliente')
+    parser.add_argument('--json', help='guarda los resultados en este archivo')
+    args = parser.parse_args()
+
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        parser.error('se necesita httpx: pip install httpx')
+    scenario = load_scenario(parser, args.scenario)
+    data = scenario['data']
+
+    directory = tempfile.mkdtemp(prefix='irock-load-')
+    log_path = os.path.join(directory, SERVER_LOG)
+    try:
+        prepare(directory, data['blocks'], data['participants'],
+                data['scores'], tokens=0,
+                settings=LOGGING_SETTINGS.format(filename=log_path))
+        state = build_state(data['tokens'])
+        open(log_path, 'w').close()
+        server = start_server(args.mode, args.port, args.workers, directory)
+        print(f"escenario {scenario['name']}, {args.mode} con "
+              f'{args.workers} workers, escala {args.scale:g}')
+        phases, offset = [], 0
+        try:
+            for phase in scenario['phases']:
+                state.skipped.clear()
+                results = asyncio.run(run_phase(
+                    args.port, phase, state, args.scale, args.connections
+                ))
+                locked, offset = lock_errors(log_path, offset)
+                rows = summarize(results, locked, phase['duration'])
+                report(phase['name'], rows, state.skipped)
+                phases.append({'name': phase['name'], 'results': rows,
+                               'skipped': dict(state.skipped)})
+        finally:
+            server.terminate()
+            server.wait()
+        if args.json:
+            with open(args.json, 'w') as file:
+                json.dump({
+                    'scenario': scenario['name'],
+                    'revision': git_revision(),
+                    'mode': args.mode,
+                    'workers': args.workers,
+                    'scale': args.scale,
+                    'phases': phases,
+                }, file, indent=2)
+            print(f'\nresultados guardados en {args.json}')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test of the participant score aggregates.
+Participant.score and distance_climbed are denormalized: BlockScore.save()
+and delete() adjust them (and append to the ascension history) on every
+write. This script checks they stay right under concurrent writers.
+
+A throwaway SQLite database (like bench_server.py, the real one is not
+touched) gets a few participants and blocks, then --processes worker
+processes create, edit and delete ascensions at random for --duration
+seconds, through the same model methods the API uses. The participants
+are few on purpose, so writers collide on the same rows.
+Afterwards api.maintenance.audit_scores() checks in one query that every
+participant's score and distance equal the sums of their scores and of
+their history, and that no participant has two scores of a block.
+
+Reports the operations per second and their outcome (duplicate: a second
+score of a block was rejected; check: a database check constraint failed,
+e.g. a drifted distance going negative; locked: SQLite's busy timeout ran
+out) and every participant with drift. Exits with
+status 1 if any invariant is broken.
+
+Usage:
+    python stress_scores.py
+    python stress_scores.py --processes 8 --duration 30 --participants 5
+    python stress_scores.py --atomic
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from collections import Counter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_server import prepare  # noqa: E402
+
+OPERATIONS = [('create', 0.5), ('update', 0.3), ('delete', 0.2)]
+
+
+def operate(kind, participant_ids, options):
+    from api.models import BlockScore
+
+    participant_id = random.choice(participant_ids)
+    if kind == 'create':
+        block_id = random.choice(list(options))
+        BlockScore(participant_id=participant_id, block_id=block_id,
+                   score_option_id=random.choice(options[block_id])).save()
+        return 'ok'
+    score = BlockScore.objects.filter(
+        participant_id=participant_id
+    ).order_by('?').first()
+    if score is None:
+        return 'empty'
+    if kind == 'update':
+        score.score_option_id = random.choice(options[score.block_id])
+        score.save()
+    else:
+        score.delete()
+    return 'ok'
+
+
+def worker(number, participant_ids, options, until, atomic, results):
+    from django.core.exceptions import ObjectDoesNotExist, ValidationError
+    from django.db import IntegrityError, OperationalError, connections, \
+        transaction
+
+    # Own connection, never the parent's
+    connections.close_all()
+    random.seed(number)
+    kinds, weights = zip(*OPERATIONS)
+    outcomes = Counter()
+    while time.monotonic() < until:
+        kind = random.choices(kinds, weights)[0]
+        try:
+            if atomic:
+                with transaction.atomic():
+                    outcome = operate(kind, participant_ids, options)
+            else:
+                outcome = operate(kind, participant_ids, options)
+        except ValidationError:
+            # Second score of the same block, rejected by full_clean()
+            outcome = 'duplicate'
+        except IntegrityError as e:
+            # The unique constraint (a check raced with another writer), or
+            # distance_climbed's >= 0 check when it already drifted
+            outcome = 'duplicate' if 'UNIQUE' in str(e) else 'check'
+        except ObjectDoesNotExist:
+            # Deleted meanwhile by another worker
+            outcome = 'gone'
+        except OperationalError as e:
+            outcome = 'locked' if 'locked' in str(e) else 'error'
+        outcomes[(kind, outcome)] += 1
+    connections.close_all()
+    results.put(outcomes)
+
+
+def setup_event(participants, blocks):
+    """
+    Participants and blocks of the test (on the prepared database), returns
+    the participant ids and the score option ids per block.
+    """
+    from api.models import Block, Participant, ScoreOption
+
+    participant_ids = list(Participant.objects.order_by('id').values_list(
+        'id', flat=True
+    )[:participants])
+    block_ids = list(Block.objects.order_by('id').values_list(
+        'id', flat=True
+    )[:blocks])
+    options = {block_id: [] for block_id in block_ids}
+    for option_id, block_id in ScoreOption.objects.filter(
+            block_id__in=block_ids).values_list('id', 'block_id'):
+        options[block_id].append(option_id)
+    return participant_ids, options
+
+
+def report(outcomes, elapsed):
+    total = sum(outcomes.values())
+    print(f'\n{total} operaciones en {elapsed:.1f} s '
+          f'({total / elapsed:.0f}/s)')
+    names = sorted({outcome for _, outcome in outcomes})
+    print(f"  {'':<10}" + ''.join(f'{name:>11}' for name in names))
+    for kind, _ in OPERATIONS:
+        print(f'  {kind:<10}' + ''.join(
+            f'{outcomes[(kind, name)]:>11}' for name in names
+        ))
+
+
+def audit():
+    from api.maintenance import audit_scores
+    from api.models import BlockScore
+
+    start = time.perf_counter()
+    broken = audit_scores()
+    elapsed = time.perf_counter() - start
+    print(f'\nauditoría ({BlockScore.objects.count()} scores, '
+          f'{elapsed * 1000:.0f} ms): ', end='')
+    if not broken:
+        print('todos los agregados cuadran')
+        return True
+    print(f'{len(broken)} participantes con diferencias')
+    print(f"  {'id':>6}{'score':>9}{'scores':>9}{'historial':>11}"
+          f"{'distancia':>11}{'scores':>9}{'historial':>11}{'bloque dup':>12}")
+    for row in broken:
+        print(f"  {row['id']:>6}{row['score']:>9}{row['scores_points']:>9}"
+              f"{row['history_points']:>11}{row['distance_climbed']:>11}"
+              f"{row['scores_distance']:>9}{row['history_distance']:>11}"
+              f"{row['duplicate_block'] or '':>12}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Prueba de estrés de los puntajes con escritores '
+                    'concurrentes',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=15,
+                        help='segundos de escrituras')
+    parser.add_argument('--participants', type=int, default=10,
+                        help='participantes que reciben las escrituras')
+    parser.add_argument('--blocks', type=int, default=20)
+    parser.add_argument('--atomic', action='store_true',
+                        help='cada operación en su propia transacción')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='irock-stress-')
+    try:
+        prepare(directory, args.blocks, args.participants, scores=0,
+                tokens=0)
+        participant_ids, options = setup_event(args.participants,
+                                               args.blocks)
+        from django.db import connections
+        connections.close_all()
+
+        # Forked workers inherit the configured Django
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        until = time.monotonic() + args.duration
+        start = time.perf_counter()
+        workers = [
+            context.Process(target=worker, args=(
+                number, participant_ids, options, until, args.atomic, results
+            ))
+            for number in range(args.processes)
+        ]
+        for process in workers:
+            process.start()
+        outcomes = Counter()
+        for _ in workers:
+            outcomes.update(results.get())
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        print(f'{args.processes} procesos, {args.participants} '
+              f"participantes, {args.blocks} bloques"
+              f"{', atómico' if args.atomic else ''}")
+        report(outcomes, elapsed)
+        ok = audit()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -49,9 +49,16 @@ print_message "Nginx detenido"
 echo ""
 echo "-> Matando Gunicorn..."
 echo "---------------------------------------------"
-sudo systemctl stop irock.service
+sudo systemctl stop irock.service irock-admin.service
 print_message "Gunicorn detenido"
 
+# Bye background jobs (the job in progress finishes first)
+echo ""
+echo "-> Matando worker de jobs..."
+echo "---------------------------------------------"
+sudo systemctl stop irock-jobs.service
+print_message "Worker de jobs detenido"
+
 # Bye clouflare tunnel (if any)
 echo ""
 echo "-> Matando Cloudflare Tunnel (si existe)..."
@@ -71,6 +78,20 @@ else
     print_message "Gunicorn NO está en ejecución"
 fi
 
+# Gunicorn (admin)
+if systemctl is-active --quiet irock-admin.service; then
+    print_error "Gunicorn (admin) está en ejecución"
+else
+    print_message "Gunicorn (admin) NO está en ejecución"
+fi
+
+# Background jobs
+if systemctl is-active --quiet irock-jobs.service; then
+    print_error "Worker de jobs está en ejecución"
+else
+    print_message "Worker de jobs NO está en ejecución"
+fi
+
 # Nginx
 if systemctl is-active --quiet nginx; then
     print_error "Nginx está en ejecución"
@@ -75,4 +75,14 @@ AxiosObj.interceptors.response.use(
   }
 );
 
+/*
+  Run several requests in one round trip (POST /batch/).
+  requests: [{ method, path, body }], method defaults to GET.
+  Resolves to the sub-responses in the same order ({ status, body }).
+  With atomic the backend runs them in one transaction.
+*/
+export const batch = (requests, atomic = false) => 
+  AxiosObj.post('/batch/', { requests, atomic })
+    .then(response => response.data.responses);
+
 export default AxiosObj;
\ No newline at end of file
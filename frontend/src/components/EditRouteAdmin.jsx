@@ -23,7 +23,7 @@ import {
 import DeleteIcon from '@mui/icons-material/Delete';
 import AddIcon from '@mui/icons-material/Add';
 import CloseIcon from '@mui/icons-material/Close';
-import AxiosObj from './Axios.jsx';
+import AxiosObj, { batch } from './Axios.jsx';
 import CustomSnackbar from './CustomSnackBar.jsx';
 import useSnackBar from './hooks/useSnackBar.jsx';
 
@@ -35,7 +35,6 @@ import useSnackBar from './hooks/useSnackBar.jsx';
 const EditRouteAdmin = ({ open, onClose, blockId, onSuccess }) => {
     const { showSnackbar, snackbarProps } = useSnackBar();
     const [loading, setLoading] = useState(true);
-    const [existingScoreOptions, setExistingScoreOptions] = useState([]);
 
     const validationSchema = useMemo(() => yup.object({
         lane: yup.string()
@@ -89,7 +88,10 @@ const EditRouteAdmin = ({ open, onClose, blockId, onSuccess }) => {
             }
 
             try {
-                // Step 1: Update the block
+                // Update the block and replace its score options in one
+                // request: options with an id are updated, new ones created
+                // and the ones removed from the form deleted (the backend
+                // does it in a single transaction)
                 const blockData = {
                     lane: values.lane,
                     grade: values.grade,
@@ -98,73 +100,18 @@ const EditRouteAdmin = ({ open, onClose, blockId, onSuccess }) => {
                     distance: values.distance,
                     block_type: values.block_type,
                     active: values.active,
-                };
-
-                console.log('Updating block:', blockData);
-                // await the block update, then proceed to score options
-                await AxiosObj.patch(`/blocks/${blockId}/`, blockData);
-                console.log('Block updated');
-
-                // Step 2: Update or create score options
-                const updatePromises = [];
-                
-                for (let i = 0; i < values.score_options.length; i++) {
-                    const option = values.score_options[i];
-                    const scoreOptionData = {
-                        block: blockId,
+                    score_options: values.score_options.map((option) => ({
+                        ...(option.id ? { id: option.id } : {}),
                         key: option.key,
                         label: option.label,
                         points: option.points,
                         order: option.order,
-                    };
-
-                    // If the option has an ID, 
-                    // it's an existing option that we need to update
-                    if (option.id) {
-                        console.log('Updating score option:', 
-                            option.id, scoreOptionData);
-                        updatePromises.push(
-                            AxiosObj.patch(`/scoreoptions/${option.id}/`, 
-                                scoreOptionData)
-                        );
-                    } else {
-                        // If it doesn't have an ID, it's a new 
-                        // option we need to create
-                        console.log('Creating new score option:', 
-                            scoreOptionData);
-                        updatePromises.push(
-                            AxiosObj.post('/scoreoptions/', scoreOptionData)
-                        );
-                    }
-                }
-
-                // Step 3: Delete score options that were removed from the form
-                // (only those NOT being used in BlockScores)
-                const currentOptionIds = values.score_options
-                    .filter(opt => opt.id)
-                    .map(opt => opt.id);
-                
-                const optionsToDelete = existingScoreOptions.filter(
-                    opt => !currentOptionIds.includes(opt.id)
-                );
-
-                for (const option of optionsToDelete) {
-                    try {
-                        console.log(
-                            'Attempting to delete unused score option:', 
-                            option.id);
-                        updatePromises.push(
-                            AxiosObj.delete(`/scoreoptions/${option.id}/`)
-                        );
-                    } catch (deleteError) {
-                        // If deletion fails (because it's in use), just log it
-                        console.warn('Could not delete score option (in use):',
-                             option.id);
-                    }
-                }
+                    })),
+                };
 
-                await Promise.all(updatePromises);
-                console.log('All score options updated successfully');
+                console.log('Updating block:', blockData);
+                await AxiosObj.patch(`/blocks/${blockId}/`, blockData);
+                console.log('Block and score options updated');
 
                 showSnackbar('Bloque actualizado exitosamente', 'success');
                 if (onSuccess) onSuccess();
@@ -201,10 +148,24 @@ const EditRouteAdmin = ({ open, onClose, blockId, onSuccess }) => {
         if (open && blockId) {
             setLoading(true);
             
-            // Load block
-            AxiosObj.get(`/blocks/${blockId}/`)
-                .then(blockResponse => {
-                    const block = blockResponse.data;
+            // Load block and its score options in one round trip
+            batch([
+                { path: `/blocks/${blockId}/` },
+                { path: `/scoreoptions/?block=${blockId}` },
+            ])
+                .then(([blockResponse, scoreResponse]) => {
+                    if (blockResponse.status !== 200 || 
+                        scoreResponse.status !== 200) {
+                        throw new Error('Batch sub-request failed');
+                    }
+                    const block = blockResponse.body;
+                    const options = scoreResponse.body.map(opt => ({
+                        id: opt.id,
+                        key: opt.key,
+                        label: opt.label,
+                        points: opt.points,
+                        order: opt.order,
+                    }));
                     formik.setValues({
                         lane: block.lane || '',
                         grade: block.grade || '',
@@ -214,22 +175,8 @@ const EditRouteAdmin = ({ open, onClose, blockId, onSuccess }) => {
                         block_type: block.block_type || 'ruta',
                         active: block.active !== undefined ? 
                                                  block.active : true,
-                        score_options: [],
+                        score_options: options,
                     });
-
-                    // Load score options for the block     
-                    return AxiosObj.get(`/scoreoptions/?block=${blockId}`);
-                })
-                .then(scoreResponse => {
-                    const options = scoreResponse.data.map(opt => ({
-                        id: opt.id,
-                        key: opt.key,
-                        label: opt.label,
-                        points: opt.points,
-                        order: opt.order,
-                    }));
-                    setExistingScoreOptions(options);
-                    formik.setFieldValue('score_options', options);
                     setLoading(false);
                 })
                 .catch(error => {
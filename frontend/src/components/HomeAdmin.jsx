@@ -57,20 +57,10 @@ const HomeAdmin = () => {
     ).length;
     
 
-    // console.log(participantsInfo)
-    // Count total and active users
+    // Total and active users, counted by the API
     // Dmins does not count towards total users nor active users
-    const admins = participantsInfo.filter(participant => 
-      participant.is_staff === true
-    ).length;
-    const totalUsers = participantsInfo.length - admins;
-    const activeUsers = participantsInfo.filter(participant => 
-      participant.is_active === true && participant.is_staff !== true
-    ).length;
-    
-    // console.log("Admins count:", admins);
-    // console.log("Total users (excluding admins):", totalUsers);
-    // console.log("Active users (excluding admins):", activeUsers);
+    const totalUsers = participantsInfo.totals.total;
+    const activeUsers = participantsInfo.totals.active;
 
     return { rutasCount, bouldersCount, totalUsers, activeUsers };
   };
@@ -147,7 +137,7 @@ const HomeAdmin = () => {
 
   // Calculate league statistics (users by category)
   const getLeagueStats = () => {
-    if (!participantsInfo || participantsInfo.length === 0) {
+    if (!participantsInfo) {
       return {
         kids: 0,
         principiante: 0,
@@ -156,15 +146,12 @@ const HomeAdmin = () => {
       };
     }
 
+    const { cups } = participantsInfo;
     return {
-      kids: participantsInfo.filter(
-        p => p.cup === 'kids' && !p.is_staff).length,
-      principiante: participantsInfo.filter(
-        p => p.cup === 'principiante' && !p.is_staff).length,
-      intermedio: participantsInfo.filter(
-        p => p.cup === 'intermedio' && !p.is_staff).length,
-      avanzado: participantsInfo.filter(
-        p => p.cup === 'avanzado' && !p.is_staff).length
+      kids: cups.kids.total,
+      principiante: cups.principiante.total,
+      intermedio: cups.intermedio.total,
+      avanzado: cups.avanzado.total
     };
   };
 
@@ -202,11 +189,11 @@ const HomeAdmin = () => {
         console.error('Error fetching blocks info:', error);
       });
 
-    // Fetch all participants info
-    AxiosObj.get('/participants/')
+    // Fetch participant counts (the list itself isn't needed here)
+    AxiosObj.get('/participants/stats/')
       .then(response => {
         setParticipantsInfo(response.data);
-        console.log("Fetched participants info:", response.data);
+        console.log("Fetched participants stats:", response.data);
       })
       .catch(error => {
         console.error('Error fetching participants info:', error);
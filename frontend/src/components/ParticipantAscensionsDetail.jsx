@@ -18,7 +18,7 @@ import {
     CircularProgress,
 } from '@mui/material';
 import CloseIcon from '@mui/icons-material/Close';
-import AxiosObj from './Axios.jsx';
+import { batch } from './Axios.jsx';
 import CustomSnackbar from './CustomSnackBar.jsx';
 import useSnackBar from './hooks/useSnackBar.jsx';
 
@@ -44,25 +44,18 @@ const ParticipantAscensionsDetail = (props) => {
         if (open && participantId) {
             setLoading(true);
 
-            // Fetch routes info
-            AxiosObj.get('/blocks/')
-                .then(response => {
-                    setRoutesInfo(response.data);
-                })
-                .catch(error => {
-                    console.error('Error fetching routes info:', error);
-                    showSnackbar('Error al cargar la información de rutas', 
-                        'error');
-                });
-
-            // Fetch ascensions info for this participant
-            AxiosObj.get('/blockscores/')
-                .then(response => {
-                    // Filter ascensions for this participant
-                    const participantAscensions = response.data.filter(
-                        ascension => ascension.participant === participantId
-                    );
-                    setAscensionsInfo(participantAscensions);
+            // Routes and this participant's ascensions in one round trip
+            // (same snapshot)
+            batch([
+                { path: '/blocks/' },
+                { path: `/blockscores/?participant=${participantId}` },
+            ], true)
+                .then(([routes, ascensions]) => {
+                    if (routes.status !== 200 || ascensions.status !== 200) {
+                        throw new Error('Batch sub-request failed');
+                    }
+                    setRoutesInfo(routes.body);
+                    setAscensionsInfo(ascensions.body);
                     setLoading(false);
                 })
                 .catch(error => {
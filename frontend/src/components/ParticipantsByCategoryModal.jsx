@@ -1,4 +1,4 @@
-import React, { useMemo, useState } from 'react';
+import React, { useEffect, useMemo, useState } from 'react';
 import {
     Dialog,
     DialogTitle,
@@ -14,9 +14,24 @@ import {
     Divider,
 } from '@mui/material';
 import { Close as CloseIcon } from '@mui/icons-material';
+import AxiosObj from './Axios.jsx';
 
-const ParticipantsByCategoryModal = ({ open, onClose, category, participants }) => {
+const ParticipantsByCategoryModal = ({ open, onClose, category }) => {
     const [genderFilter, setGenderFilter] = useState('all');
+    const [participants, setParticipants] = useState([]);
+
+    // Only the participants of the category, sorted by the API
+    useEffect(() => {
+        if (!open || !category) return;
+        AxiosObj.get('/participants/', {
+            params: { cup: category, is_staff: false, ordering: 'first_name' }
+        })
+            .then(response => setParticipants(response.data))
+            .catch(error => {
+                console.error('Error fetching participants:', error);
+                setParticipants([]);
+            });
+    }, [open, category]);
 
     const categoryColors = {
         kids: '#FF6B6B',
@@ -36,18 +51,12 @@ const ParticipantsByCategoryModal = ({ open, onClose, category, participants })
     const filteredParticipants = useMemo(() => {
         if (!category || !participants) return [];
 
-        let filtered = participants.filter(p => p.cup === category);
-
         if (genderFilter === 'male') {
-            filtered = filtered.filter(p => p.gender === 'M');
+            return participants.filter(p => p.gender === 'M');
         } else if (genderFilter === 'female') {
-            filtered = filtered.filter(p => p.gender === 'F');
+            return participants.filter(p => p.gender === 'F');
         }
-
-        // Sort alphabetically by first name
-        return filtered.sort((a, b) => 
-            a.first_name.localeCompare(b.first_name)
-        );
+        return participants;
     }, [category, participants, genderFilter]);
 
     if (!category) return null;
@@ -29,16 +29,37 @@ const ParticipantsPage = () => {
     const [selectedCategory, setSelectedCategory] = useState(null);
     const { showSnackbar, snackbarProps } = useSnackBar();
 
-    // Fetch participants
+    // Server-side table state: the API filters, sorts and pages, so only
+    // the visible page is downloaded
+    const [rowCount, setRowCount] = useState(0);
+    const [pagination, setPagination] = useState({ pageIndex: 0, pageSize: 10 });
+    const [sorting, setSorting] = useState([{ id: 'id', desc: false }]);
+    const [globalFilter, setGlobalFilter] = useState('');
+    const [statistics, setStatistics] = useState({
+        kids: { total: 0, male: 0, female: 0 },
+        principiante: { total: 0, male: 0, female: 0 },
+        intermedio: { total: 0, male: 0, female: 0 },
+        avanzado: { total: 0, male: 0, female: 0 },
+        totals: { total: 0, male: 0, female: 0 }
+    });
+
+    // Fetch the current page of participants (non staff)
     const fetchParticipants = () => {
         setLoading(true);
-        AxiosObj.get('/participants/')
+        const params = {
+            is_staff: false,
+            page: pagination.pageIndex + 1,
+            page_size: pagination.pageSize,
+            ordering: sorting.map(sort => 
+                `${sort.desc ? '-' : ''}${sort.id}`).join(','),
+        };
+        if (globalFilter) {
+            params.q = globalFilter;
+        }
+        AxiosObj.get('/participants/', { params })
             .then(response => {
-                // Select non stadff
-                const nonAdminUsers = response.data.filter(user => 
-                    !user.is_staff && !user.is_superuser
-                );
-                setParticipants(nonAdminUsers);
+                setParticipants(response.data.results);
+                setRowCount(response.data.count);
                 setLoading(false);
             })
             .catch(error => {
@@ -48,37 +69,38 @@ const ParticipantsPage = () => {
             });
     };
 
-    useEffect(() => {
+    // Counts per category and gender
+    const fetchStatistics = () => {
+        AxiosObj.get('/participants/stats/')
+            .then(response => {
+                setStatistics({ 
+                    ...response.data.cups, 
+                    totals: response.data.totals 
+                });
+            })
+            .catch(error => {
+                console.error('Error fetching statistics:', error);
+            });
+    };
+
+    const refresh = () => {
         fetchParticipants();
-    }, []);
+        fetchStatistics();
+    };
 
-    // Calculate statistics
-    const statistics = useMemo(() => {
-        const stats = {
-            kids: { total: 0, male: 0, female: 0 },
-            principiante: { total: 0, male: 0, female: 0 },
-            intermedio: { total: 0, male: 0, female: 0 },
-            avanzado: { total: 0, male: 0, female: 0 },
-            totals: { total: 0, male: 0, female: 0 }
-        };
+    useEffect(() => {
+        fetchStatistics();
+    }, []);
 
-        participants.forEach(participant => {
-            if (participant.cup && stats[participant.cup]) {
-                stats[participant.cup].total++;
-                stats.totals.total++;
-                
-                if (participant.gender === 'M') {
-                    stats[participant.cup].male++;
-                    stats.totals.male++;
-                } else if (participant.gender === 'F') {
-                    stats[participant.cup].female++;
-                    stats.totals.female++;
-                }
-            }
-        });
+    useEffect(() => {
+        fetchParticipants();
+    }, [pagination.pageIndex, pagination.pageSize, sorting, globalFilter]);
 
-        return stats;
-    }, [participants]);
+    // A new search starts from the first page
+    const handleGlobalFilterChange = (value) => {
+        setGlobalFilter(value ?? '');
+        setPagination(prev => ({ ...prev, pageIndex: 0 }));
+    };
 
     // Handle toggle active status
     const handleToggleActive = (row) => {
@@ -94,7 +116,7 @@ const ParticipantsPage = () => {
                         'desactivado'} correctamente`,
                 'success'
             );
-            fetchParticipants(); // Refresh
+            refresh();
         })
         .catch(error => {
             console.error('Error updating active status:', error);
@@ -109,7 +131,7 @@ const ParticipantsPage = () => {
             AxiosObj.delete(`/participants/${row.original.id}/`)
                 .then(response => {
                     showSnackbar('Usuario eliminado correctamente', 'success');
-                    fetchParticipants(); // Refresh
+                    refresh();
                 })
                 .catch(error => {
                     console.error('Error deleting participant:', error);
@@ -135,7 +157,7 @@ const ParticipantsPage = () => {
     };
 
     const handleEditSuccess = () => {
-        fetchParticipants();
+        refresh();
     };
 
     const handleOpenCategory = (category) => {
@@ -461,7 +483,20 @@ const ParticipantsPage = () => {
                 <MaterialReactTable
                     columns={columns}
                     data={participants}
-                    state={{ isLoading: loading }}
+                    manualPagination
+                    manualSorting
+                    manualFiltering
+                    enableColumnFilters={false}
+                    rowCount={rowCount}
+                    onPaginationChange={setPagination}
+                    onSortingChange={setSorting}
+                    onGlobalFilterChange={handleGlobalFilterChange}
+                    state={{ 
+                        isLoading: loading, 
+                        pagination, 
+                        sorting, 
+                        globalFilter 
+                    }}
                     enableRowActions
                     positionActionsColumn="last"
                     renderRowActions={({ row }) => (
@@ -514,10 +549,6 @@ const ParticipantsPage = () => {
                             fontWeight: 'bold',
                         },
                     }}
-                    initialState={{
-                        pagination: { pageSize: 10, pageIndex: 0 },
-                        sorting: [{ id: 'id', desc: false }],
-                    }}
                 />
             </Box>
             <EditParticipantAdmin
@@ -536,7 +567,6 @@ const ParticipantsPage = () => {
                 open={categoryModalOpen}
                 onClose={() => setCategoryModalOpen(false)}
                 category={selectedCategory}
-                participants={participants}
             />
             <CustomSnackbar {...snackbarProps} />
         </Box>
@@ -85,7 +85,8 @@ const RegisterRouteAdmin = () => {
             }
 
             try {
-                // Step 1: Create the block
+                // Create the block and its score options in one request
+                // (the backend saves both in a single transaction)
                 const blockData = {
                     lane: values.lane,
                     grade: values.grade,
@@ -94,6 +95,12 @@ const RegisterRouteAdmin = () => {
                     distance: values.distance,
                     block_type: values.block_type,
                     active: values.active,
+                    score_options: values.score_options.map((option) => ({
+                        key: option.key,
+                        label: option.label,
+                        points: option.points,
+                        order: option.order,
+                    })),
                 };
 
                 console.log('Creating block:', blockData);
@@ -101,25 +108,6 @@ const RegisterRouteAdmin = () => {
                     blockData);
                 console.log('Block created:', blockResponse.data);
 
-                const blockId = blockResponse.data.id;
-
-                // Step 2: Create the score options
-                const scoreOptionsPromises = 
-                    values.score_options.map((option) => {
-                    const scoreOptionData = {
-                        block: blockId,
-                        key: option.key,
-                        label: option.label,
-                        points: option.points,
-                        order: option.order,
-                    };
-                    console.log('Creating score option:', scoreOptionData);
-                    return AxiosObj.post('/scoreoptions/', scoreOptionData);
-                });
-
-                await Promise.all(scoreOptionsPromises);
-                console.log('All score options created successfully');
-
                 showSnackbar(
                     'Bloque y opciones de puntuación creados exitosamente', 
                     'success');